@@ -0,0 +1,132 @@
+"""
+Shared pytest fixtures: small random terrain grids and road graphs, and
+a plain Dijkstra over them that shares no code with main.py, as the
+reference every search mode is checked against
+"""
+
+import heapq
+import math
+import random
+
+import pytest
+
+OBSTACLE = 1
+DEFAULT_COSTS = {0: 1, 2: 2, 3: 5}   # AdvancedAStarSearch's defaults
+
+
+def make_grid(rng, rows, cols, terrains=(0, 0, 0, 0, 1, 2, 3)):
+    """rows x cols list-of-lists grid of terrain codes drawn from terrains"""
+    return [[rng.choice(terrains) for _ in range(cols)] for _ in range(rows)]
+
+
+def entry_cost(grid, cell, terrain_costs=None):
+    """Cost of stepping into cell (unknown terrain costs 1), None if blocked"""
+    terrain = grid[cell[0]][cell[1]]
+    if terrain == OBSTACLE:
+        return None
+    return (terrain_costs or DEFAULT_COSTS).get(terrain, 1)
+
+
+def neighbors(grid, cell):
+    row, col = cell
+    for d_row, d_col in ((0, 1), (1, 0), (0, -1), (-1, 0)):
+        n_row, n_col = row + d_row, col + d_col
+        if 0 <= n_row < len(grid) and 0 <= n_col < len(grid[0]):
+            yield n_row, n_col
+
+
+def dijkstra(grid, source, terrain_costs=None):
+    """{cell: cheapest cost from source} over every reachable cell"""
+    costs = {source: 0}
+    heap = [(0, source)]
+    while heap:
+        cost, cell = heapq.heappop(heap)
+        if cost > costs[cell]:
+            continue
+        for neighbor in neighbors(grid, cell):
+            step = entry_cost(grid, neighbor, terrain_costs)
+            if step is not None and cost + step < costs.get(neighbor, math.inf):
+                costs[neighbor] = cost + step
+                heapq.heappush(heap, (cost + step, neighbor))
+    return costs
+
+
+def path_cost(grid, path, terrain_costs=None):
+    """
+    Cost of a path of (row, col) cells, checking that every step is
+    between adjacent cells and enters a passable one
+    """
+    total = 0
+    for a, b in zip(path, path[1:]):
+        assert abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1, f"{a} -> {b} is not a move"
+        step = entry_cost(grid, b, terrain_costs)
+        assert step is not None, f"path enters obstacle {b}"
+        total += step
+    return total
+
+
+def make_graph(rng, node_count, edge_count):
+    """
+    (coordinates, edges) for a random directed graph with integer
+    coordinates and weights, so every route cost sums exactly; edges are
+    (source, target, weight) and may repeat or loop
+    """
+    coordinates = [(rng.randrange(20), rng.randrange(20)) for _ in range(node_count)]
+    edges = [(rng.randrange(node_count), rng.randrange(node_count), rng.randint(0, 30))
+             for _ in range(edge_count)]
+    return coordinates, edges
+
+
+def graph_dijkstra(edges, source, reverse=False):
+    """{node: cheapest cost from source} over (source, target, weight) edges"""
+    adjacency = {}
+    for a, b, weight in edges:
+        if reverse:
+            a, b = b, a
+        adjacency.setdefault(a, []).append((b, weight))
+    costs = {source: 0}
+    heap = [(0, source)]
+    while heap:
+        cost, node = heapq.heappop(heap)
+        if cost > costs[node]:
+            continue
+        for neighbor, weight in adjacency.get(node, ()):
+            if cost + weight < costs.get(neighbor, math.inf):
+                costs[neighbor] = cost + weight
+                heapq.heappush(heap, (cost + weight, neighbor))
+    return costs
+
+
+def graph_path_cost(edges, path):
+    """Cost of a node path, using the cheapest edge for each hop"""
+    total = 0
+    for a, b in zip(path, path[1:]):
+        weights = [weight for source, target, weight in edges if (source, target) == (a, b)]
+        assert weights, f"no edge {a} -> {b}"
+        total += min(weights)
+    return total
+
+
+class Reference:
+    """The helpers above, handed to tests through the `reference` fixture"""
+    make_grid = staticmethod(make_grid)
+    dijkstra = staticmethod(dijkstra)
+    path_cost = staticmethod(path_cost)
+    neighbors = staticmethod(neighbors)
+    entry_cost = staticmethod(entry_cost)
+    make_graph = staticmethod(make_graph)
+    graph_dijkstra = staticmethod(graph_dijkstra)
+    graph_path_cost = staticmethod(graph_path_cost)
+    DEFAULT_COSTS = DEFAULT_COSTS
+    OBSTACLE = OBSTACLE
+
+
+@pytest.fixture
+def reference():
+    return Reference
+
+
+@pytest.fixture
+def rng(request):
+    """A random.Random seeded from the test's name, so failures reproduce"""
+    return random.Random(request.node.name)
@@ -30,12 +30,22 @@ Complexity Analysis:
 =============================================================================
 """
 
+import base64
+import os
 import sys
-from queue import PriorityQueue
+import tempfile
+import hashlib
+import json
+import struct
+import time
+import heapq
+from array import array
 from typing import List, Tuple, Dict, Set, Optional
 import random
 import math
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+
+import numpy as np
 
 
 # =============================================================================
@@ -61,6 +71,843 @@ class Node:
         return hash(self.position)
 
 
+# Terrain code for impassable cells
+OBSTACLE = 1
+
+# Neighbor-mask bits, in expansion order: right, down, left, up
+RIGHT, DOWN, LEFT, UP = 1, 2, 4, 8
+
+
+class _BudgetExceeded(Exception):
+    """The 'bounded' search frontier outgrew node_budget (IDA* takes over)"""
+
+
+class TerrainCostTable(dict):
+    """
+    terrain_costs mapping that keeps its search's cost array in sync.
+    Any edit recompiles the per-cell move costs of the owning search.
+    """
+    def __init__(self, owner, costs):
+        super().__init__(costs)
+        self._owner = owner
+    
+    def __setitem__(self, terrain, cost):
+        super().__setitem__(terrain, cost)
+        self._owner._on_terrain_costs_changed()
+    
+    def __delitem__(self, terrain):
+        super().__delitem__(terrain)
+        self._owner._on_terrain_costs_changed()
+    
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._owner._on_terrain_costs_changed()
+    
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._owner._on_terrain_costs_changed()
+        return value
+    
+    def clear(self):
+        super().clear()
+        self._owner._on_terrain_costs_changed()
+
+
+def as_terrain_array(grid):
+    """Convert a list-of-lists (or array) terrain grid to a 2-D uint8 array"""
+    terrain = np.asarray(grid)
+    if terrain.ndim != 2 or terrain.size == 0:
+        raise ValueError("grid must be a non-empty 2-D terrain grid")
+    if terrain.dtype != np.uint8:
+        if terrain.min() < 0 or terrain.max() > 255:
+            raise ValueError("terrain codes must be in the range 0-255")
+        terrain = terrain.astype(np.uint8)
+    return terrain
+
+
+# Default color -> terrain table for hunters_point_map.png; colors are
+# matched to their nearest entry, so a handful of samples cover the map
+MAP_COLOR_TERRAIN = {
+    (212, 218, 176): 0,   # Paths and roads
+    (121, 162, 72): 2,    # Lawns (slower)
+    (83, 140, 75): 2,     # Hillside grass
+    (93, 121, 135): 2,    # Parking lots and asphalt
+    (184, 154, 113): 3,   # Shoreline sand (dangerous)
+    (62, 120, 69): 1,     # Trees
+    (18, 67, 32): 1,      # Tree shadows
+    (30, 103, 135): 1,    # Water
+    (171, 80, 53): 1,     # Roofs
+    (255, 255, 255): 1,   # Walls
+    (131, 193, 205): 1,   # Sky
+}
+
+
+def terrain_from_rgb(pixels, color_table=None):
+    """
+    Map an (H, W, 3) RGB array to a uint8 terrain grid, giving every pixel
+    the terrain of the nearest color in color_table (Euclidean in RGB).
+    Only the image's distinct colors are matched, then broadcast back.
+    """
+    if color_table is None:
+        color_table = MAP_COLOR_TERRAIN
+    pixels = np.asarray(pixels, dtype=np.uint8)
+    if pixels.ndim != 3 or pixels.shape[2] != 3:
+        raise ValueError("pixels must be an (H, W, 3) RGB array")
+    palette = np.array(list(color_table.keys()), dtype=np.int32).reshape(-1, 3)
+    codes = np.array(list(color_table.values()), dtype=np.uint8)
+    if not len(codes):
+        raise ValueError("color_table is empty")
+    
+    packed = (pixels[..., 0].astype(np.uint32) << 16
+              | pixels[..., 1].astype(np.uint32) << 8 | pixels[..., 2])
+    colors, inverse = np.unique(packed.reshape(-1), return_inverse=True)
+    rgb = np.stack([colors >> 16, (colors >> 8) & 0xFF, colors & 0xFF], axis=1).astype(np.int32)
+    nearest = ((rgb[:, None, :] - palette[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    return codes[nearest][inverse].reshape(pixels.shape[:2])
+
+
+def terrain_cache_path(image_path, color_table=None):
+    """Default .npy cache next to the image, keyed by the color table"""
+    if color_table is None:
+        color_table = MAP_COLOR_TERRAIN
+    digest = hashlib.blake2b(repr(sorted(color_table.items())).encode(),
+                             digest_size=4).hexdigest()
+    return f"{os.path.splitext(image_path)[0]}.terrain-{digest}.npy"
+
+
+def load_map_image(image_path, color_table=None, cache_path=None):
+    """
+    Terrain grid for a map image, decoded once and cached as .npy
+    
+    The first call decodes the image (this needs Pillow) and saves the
+    terrain grid to cache_path (terrain_cache_path() by default). Later
+    calls, as long as the cache is newer than the image, open it with
+    copy-on-write memory mapping: nothing is decoded or read up front,
+    and set_cell() edits stay in memory without touching the file.
+    """
+    if cache_path is None:
+        cache_path = terrain_cache_path(image_path, color_table)
+    if (not os.path.exists(cache_path)
+            or os.path.getmtime(cache_path) < os.path.getmtime(image_path)):
+        try:
+            from PIL import Image
+        except ImportError:
+            raise ImportError("Decoding map images needs Pillow (pip install Pillow); "
+                              "cached .npy grids load without it") from None
+        with Image.open(image_path) as image:
+            pixels = np.asarray(image.convert('RGB'))
+        terrain = terrain_from_rgb(pixels, color_table)
+        
+        # Write then rename, so a concurrent reader never sees half a file
+        partial = f"{cache_path}.{os.getpid()}.tmp"
+        with open(partial, 'wb') as handle:
+            np.save(handle, terrain)
+        os.replace(partial, cache_path)
+    return np.load(cache_path, mmap_mode='c')
+
+
+class RouteCache:
+    """
+    Bounded LRU cache of search results
+    
+    Keys are (grid_version, heuristic_type, algorithm, start, goal).
+    When the grid changes, migrate() carries entries over to the new
+    version if the change cannot affect them (only costs went up, and
+    not on their cells); otherwise clear() drops everything.
+    """
+    
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()   # key -> (path, cost, explored, cells)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key):
+        """Cached (path, cost, explored_count) or None; refreshes recency"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[:3]
+    
+    def put(self, key, path, cost, explored, cells):
+        """Store a result; cells are the path's flat indices (or None)"""
+        cells = np.array(cells if cells is not None else (), dtype=np.int64)
+        self._entries[key] = (tuple(path) if path is not None else None,
+                              cost, explored, cells)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def migrate(self, version, still_valid):
+        """Re-key surviving entries to a new grid version, drop the rest"""
+        survivors = OrderedDict()
+        for key, entry in self._entries.items():
+            if still_valid(entry[3]):
+                survivors[(version,) + key[1:]] = entry
+        self.invalidations += len(self._entries) - len(survivors)
+        self._entries = survivors
+    
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+    
+    def stats(self):
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+class ExplorationTrace:
+    """
+    Compact record of the cells a search expanded
+    
+    Cell indices go into an int32 array in expansion order. With a
+    capacity, the array is a ring buffer holding only the most recent
+    `capacity` expansions, which bounds memory on long searches while
+    still sampling where the search went.
+    
+    Without a capacity, frontier pushes are kept too: `pushes` holds each
+    pushed cell and `marks[i]` how many pushes came before expansion i,
+    so expansion i pushed pushes[marks[i]:marks[i + 1]].
+    
+    status is None for a real search, or 'unreachable' / 'cached' for an
+    empty trace left by a query answered without searching.
+    """
+    
+    STATUSES = (None, 'unreachable', 'cached')
+    
+    def __init__(self, capacity=None, status=None):
+        if status not in self.STATUSES:
+            raise ValueError(f"Unknown trace status {status!r}, expected one of {self.STATUSES}")
+        self.capacity = capacity
+        self.status = status
+        self._written = [0]   # Expansions recorded (ring mode)
+        self.pushes = array('i')
+        self.marks = array('I')
+        if capacity is None:
+            self.cells = array('i')
+        else:
+            self.cells = array('i', [0]) * capacity
+    
+    def recorder(self):
+        """Callable that records one expanded cell index"""
+        if self.capacity is None:
+            append_cell, append_mark, pushes = self.cells.append, self.marks.append, self.pushes
+            def record(cell):
+                append_cell(cell)
+                append_mark(len(pushes))
+            return record
+        cells, capacity, written = self.cells, self.capacity, self._written
+        def record(cell):
+            count = written[0]
+            cells[count % capacity] = cell
+            written[0] = count + 1
+        return record
+    
+    @property
+    def count(self):
+        """Total expansions recorded, including any overwritten ones"""
+        return len(self.cells) if self.capacity is None else self._written[0]
+    
+    def __len__(self):
+        return min(self.count, len(self.cells))
+    
+    def indices(self):
+        """Retained cell indices, oldest first, as an int32 array"""
+        cells = np.frombuffer(self.cells, dtype=np.int32)
+        if self.capacity is None or self.count <= self.capacity:
+            return cells[:len(self)].copy()
+        start = self.count % self.capacity
+        return np.concatenate([cells[start:], cells[:start]])
+    
+    def orders(self):
+        """Expansion order (0-based) of each retained cell"""
+        return np.arange(self.count - len(self), self.count, dtype=np.int64)
+    
+    def push_recorder(self):
+        """Callable that records one frontier push, or None in ring mode"""
+        return self.pushes.append if self.capacity is None else None
+    
+    @property
+    def has_pushes(self):
+        return self.capacity is None
+    
+    def push_counts(self):
+        """Frontier pushes made by each expansion, as a uint8 array"""
+        marks = np.frombuffer(self.marks, dtype=np.uint32).astype(np.int64)
+        ends = np.append(marks[1:], len(self.pushes))
+        return (ends - marks).astype(np.uint8)
+
+
+# Compact search-trace files: header, then zigzag-varint streams
+TRACE_MAGIC = b'ASTR'
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct('<4sBBHIIIIIIdIII')
+TRACE_HAS_GRID, TRACE_HAS_PUSHES, TRACE_UNREACHABLE, TRACE_CACHED = 1, 2, 4, 8
+TRACE_STATUS_FLAGS = {'unreachable': TRACE_UNREACHABLE, 'cached': TRACE_CACHED}
+
+
+def encode_varints(values):
+    """
+    Signed integers as zigzag LEB128 varints: small magnitudes, like
+    deltas between neighboring cells, take one byte
+    Returns: uint8 array
+    """
+    values = np.asarray(values, dtype=np.int64)
+    zigzag = ((values << 1) ^ (values >> 63)).astype(np.uint64)
+    lengths = np.ones(len(zigzag), dtype=np.int64)
+    for width in range(1, 10):
+        lengths += zigzag >= np.uint64(1 << (7 * width))
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    encoded = np.empty(int(ends[-1]) if len(ends) else 0, dtype=np.uint8)
+    for position in range(int(lengths.max()) if len(lengths) else 0):
+        selected = lengths > position
+        chunk = (zigzag[selected] >> np.uint64(7 * position)) & np.uint64(0x7F)
+        more = (lengths[selected] > position + 1).astype(np.uint64) << np.uint64(7)
+        encoded[starts[selected] + position] = chunk | more
+    return encoded
+
+
+def decode_varints(encoded):
+    """Inverse of encode_varints; returns an int64 array"""
+    encoded = np.asarray(encoded, dtype=np.uint8)
+    if not len(encoded):
+        return np.zeros(0, dtype=np.int64)
+    last = (encoded & 0x80) == 0
+    group = np.concatenate([[0], np.cumsum(last)[:-1]])
+    first = np.concatenate([[0], np.flatnonzero(last)[:-1] + 1])
+    shift = (np.arange(len(encoded)) - first[group]).astype(np.uint64) * np.uint64(7)
+    zigzag = np.zeros(int(last.sum()), dtype=np.uint64)
+    np.add.at(zigzag, group, (encoded & 0x7F).astype(np.uint64) << shift)
+    return ((zigzag >> np.uint64(1)).astype(np.int64)
+            ^ -(zigzag & np.uint64(1)).astype(np.int64))
+
+
+def _deltas(values):
+    values = np.asarray(values, dtype=np.int64)
+    return np.diff(values, prepend=0)
+
+
+def write_search_trace(file_path, trace, rows, cols, path_indices=None, cost=math.inf,
+                       grid=None, fmt=None):
+    """
+    Write a search run for replay in the browser (astar_game.html)
+    
+    Streams, all flat cell indices (row * cols + col):
+    - expanded: expansion order, as deltas from the previous cell
+    - push_counts: frontier pushes made by each expansion
+    - pushes: each pushed cell minus the cell being expanded
+    - path: the final path, as deltas
+    A trace kept in a ring buffer has no pushes and starts at expansion
+    first_order. A query answered without searching (unreachable, or
+    from the route cache) writes empty streams and its trace's status.
+    
+    fmt='binary' (default; '.json' files default to 'json'):
+        header TRACE_HEADER (little-endian): magic 'ASTR', version,
+        flags (1 = grid, 2 = pushes, 4 = unreachable, 8 = cached), rows, cols, first_order, counts of
+        expansions / pushes / path cells, cost, byte sizes of the
+        expanded / pushes / path streams; then the grid as uint8 (if
+        flagged), expanded varints, push_counts as uint8, pushes
+        varints and path varints. Varints are zigzag LEB128.
+    fmt='json': the same streams as plain delta-encoded integer lists,
+        with the grid as base64 of its uint8 bytes.
+    """
+    if fmt is None:
+        fmt = 'json' if str(file_path).endswith('.json') else 'binary'
+    if fmt not in ('binary', 'json'):
+        raise ValueError(f"Unknown trace format {fmt!r}, expected 'binary' or 'json'")
+    expanded = trace.indices().astype(np.int64)
+    first_order = trace.count - len(trace)
+    has_pushes = trace.has_pushes
+    if has_pushes:
+        push_counts = trace.push_counts()
+        pushes = np.frombuffer(trace.pushes, dtype=np.int32).astype(np.int64)
+        pushes = pushes - np.repeat(expanded, push_counts)
+    else:
+        push_counts = np.zeros(0, dtype=np.uint8)
+        pushes = np.zeros(0, dtype=np.int64)
+    path = np.asarray(path_indices if path_indices is not None else [], dtype=np.int64)
+    
+    if fmt == 'json':
+        document = {
+            'format': 'astar-trace', 'version': TRACE_VERSION,
+            'rows': rows, 'cols': cols, 'first_order': first_order,
+            'status': trace.status,
+            'cost': cost if math.isfinite(cost) else None,
+            'expanded': _deltas(expanded).tolist(),
+            'push_counts': push_counts.tolist() if has_pushes else None,
+            'pushes': pushes.tolist() if has_pushes else None,
+            'path': _deltas(path).tolist(),
+        }
+        if grid is not None:
+            document['grid'] = base64.b64encode(
+                np.ascontiguousarray(grid, dtype=np.uint8).tobytes()).decode('ascii')
+        with open(file_path, 'w') as handle:
+            json.dump(document, handle, separators=(',', ':'))
+        return
+    
+    streams = [encode_varints(_deltas(expanded)), encode_varints(pushes),
+               encode_varints(_deltas(path))]
+    flags = ((TRACE_HAS_GRID if grid is not None else 0) | (TRACE_HAS_PUSHES if has_pushes else 0)
+             | TRACE_STATUS_FLAGS.get(trace.status, 0))
+    header = TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, flags, 0, rows, cols, first_order,
+                               len(expanded), len(pushes), len(path), cost,
+                               *(len(stream) for stream in streams))
+    with open(file_path, 'wb') as handle:
+        handle.write(header)
+        if grid is not None:
+            handle.write(np.ascontiguousarray(grid, dtype=np.uint8).tobytes())
+        handle.write(streams[0].tobytes())
+        handle.write(push_counts.tobytes())
+        handle.write(streams[1].tobytes())
+        handle.write(streams[2].tobytes())
+
+
+def read_search_trace(file_path):
+    """
+    Load a file written by write_search_trace (either format)
+    Returns: dict with rows, cols, first_order, status, cost, and int64 arrays
+    expanded, push_counts, pushes (absolute cell indices) and path,
+    plus grid (uint8, rows x cols) when it was saved
+    """
+    with open(file_path, 'rb') as handle:
+        data = handle.read()
+    
+    if data[:4] != TRACE_MAGIC:
+        document = json.loads(data)
+        if document.get('format') != 'astar-trace':
+            raise ValueError(f"{file_path} is not a search trace")
+        rows, cols = document['rows'], document['cols']
+        run = {
+            'rows': rows, 'cols': cols, 'first_order': document['first_order'],
+            'status': document.get('status'),
+            'cost': document['cost'] if document['cost'] is not None else math.inf,
+            'expanded': np.cumsum(np.array(document['expanded'], dtype=np.int64)),
+            'push_counts': np.array(document['push_counts'] or [], dtype=np.int64),
+            'path': np.cumsum(np.array(document['path'], dtype=np.int64)),
+        }
+        offsets = np.array(document['pushes'] or [], dtype=np.int64)
+        if 'grid' in document:
+            run['grid'] = np.frombuffer(base64.b64decode(document['grid']),
+                                        dtype=np.uint8).reshape(rows, cols).copy()
+    else:
+        (_, version, flags, _, rows, cols, first_order, expansions, push_total, path_length,
+         cost, expanded_bytes, push_bytes, path_bytes) = TRACE_HEADER.unpack_from(data)
+        if version != TRACE_VERSION:
+            raise ValueError(f"Unsupported search trace version {version}")
+        status = next((name for name, flag in TRACE_STATUS_FLAGS.items() if flags & flag), None)
+        run = {'rows': rows, 'cols': cols, 'first_order': first_order, 'status': status,
+               'cost': cost}
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        offset = TRACE_HEADER.size
+        if flags & TRACE_HAS_GRID:
+            run['grid'] = buffer[offset:offset + rows * cols].reshape(rows, cols).copy()
+            offset += rows * cols
+        run['expanded'] = np.cumsum(decode_varints(buffer[offset:offset + expanded_bytes]))
+        offset += expanded_bytes
+        count_bytes = expansions if flags & TRACE_HAS_PUSHES else 0
+        run['push_counts'] = buffer[offset:offset + count_bytes].astype(np.int64)
+        offset += count_bytes
+        offsets = decode_varints(buffer[offset:offset + push_bytes])
+        offset += push_bytes
+        run['path'] = np.cumsum(decode_varints(buffer[offset:offset + path_bytes]))
+    
+    run['pushes'] = offsets + np.repeat(run['expanded'], run['push_counts']) if len(offsets) else offsets
+    return run
+
+
+class LandmarkTables:
+    """
+    Precomputed landmark distances for the ALT heuristic
+    (A*, Landmarks, Triangle inequality; Goldberg & Harrelson, 2005)
+    
+    For each landmark L, from_landmark[k] holds the exact cost L -> v and
+    to_landmark[k] the cost v -> L for every cell v, as float32. By the
+    triangle inequality, for goal t:
+        d(v, t) >= d(L, t) - d(L, v)   and   d(v, t) >= d(v, L) - d(t, L)
+    so the max over landmarks is an admissible, consistent heuristic that,
+    unlike Manhattan distance, sees busy and dangerous terrain.
+    """
+    
+    def __init__(self, landmarks, from_landmark, to_landmark, fingerprint):
+        self.landmarks = list(landmarks)       # Flat cell indices
+        self.from_landmark = from_landmark     # (K, cells) float32
+        self.to_landmark = to_landmark         # (K, cells) float32
+        self.fingerprint = fingerprint
+        self._from_views = [memoryview(row) for row in from_landmark]
+        self._to_views = [memoryview(row) for row in to_landmark]
+    
+    @classmethod
+    def build(cls, astar, count=8):
+        """
+        Pick landmarks by farthest-point selection and run two Dijkstras
+        (forward and reverse) from each
+        """
+        cell_count = astar.rows * astar.cols
+        passable = np.flatnonzero(astar.passable.reshape(-1))
+        if passable.size == 0:
+            empty = np.zeros((0, cell_count), dtype=np.float32)
+            return cls([], empty, empty.copy(), astar.grid_fingerprint())
+        
+        # Seed from the cell farthest from an arbitrary passable cell
+        seed_costs, _, _ = astar.dijkstra(int(passable[0]))
+        nearest = np.frombuffer(seed_costs, dtype=np.float64).copy()
+        nearest[~np.isfinite(nearest)] = -1
+        
+        landmarks, from_rows, to_rows = [], [], []
+        for _ in range(min(count, passable.size)):
+            landmark = int(np.argmax(nearest))
+            if landmarks and nearest[landmark] <= 0:
+                break   # Every reachable cell already is a landmark
+            forward, _, _ = astar.dijkstra(landmark)
+            reverse, _, _ = astar.dijkstra(landmark, reverse=True)
+            forward = np.frombuffer(forward, dtype=np.float64)
+            landmarks.append(landmark)
+            from_rows.append(forward.astype(np.float32))
+            to_rows.append(np.frombuffer(reverse, dtype=np.float64).astype(np.float32))
+            
+            # Next landmark: the reachable cell farthest from all chosen ones
+            if len(landmarks) == 1:
+                nearest = np.where(np.isfinite(forward), forward, -1)
+            else:
+                nearest = np.minimum(nearest, np.where(np.isfinite(forward), forward, -1))
+        
+        return cls(landmarks,
+                   np.vstack(from_rows).reshape(len(landmarks), cell_count),
+                   np.vstack(to_rows).reshape(len(landmarks), cell_count),
+                   astar.grid_fingerprint())
+    
+    @staticmethod
+    def default_path(grid_path):
+        """Where the tables for a grid file live: next to it, as .alt.npz"""
+        return os.path.splitext(grid_path)[0] + '.alt.npz'
+    
+    def save(self, path):
+        # Write then rename, so a concurrent reader never sees half a file
+        path = str(path)
+        if not path.endswith('.npz'):
+            path += '.npz'   # As np.savez would name it
+        partial = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(partial,
+                 landmarks=np.array(self.landmarks, dtype=np.int64),
+                 from_landmark=self.from_landmark,
+                 to_landmark=self.to_landmark,
+                 fingerprint=np.array(self.fingerprint))
+        os.replace(partial, path)
+    
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['landmarks'].tolist(), data['from_landmark'],
+                       data['to_landmark'], str(data['fingerprint']))
+    
+    def heuristic(self, goal):
+        """h(index) toward a fixed goal index"""
+        terms = []
+        for from_view, to_view in zip(self._from_views, self._to_views):
+            landmark_to_goal, goal_to_landmark = from_view[goal], to_view[goal]
+            terms.append((from_view, to_view, landmark_to_goal, goal_to_landmark))
+        inf = math.inf
+        
+        def h(index):
+            best = 0.0
+            for from_view, to_view, landmark_to_goal, goal_to_landmark in terms:
+                from_landmark = from_view[index]
+                if landmark_to_goal != inf and from_landmark != inf:
+                    bound = landmark_to_goal - from_landmark
+                    if bound > best:
+                        best = bound
+                to_landmark = to_view[index]
+                if to_landmark != inf and goal_to_landmark != inf:
+                    bound = to_landmark - goal_to_landmark
+                    if bound > best:
+                        best = bound
+            return best
+        return h
+
+
+class ComponentIndex:
+    """
+    Connected-component labels for passable cells
+    
+    labels[i] is a raw label for cell i (-1 for obstacles); labels are
+    merged with union-find, so two cells are connected iff their labels
+    share a root. Removing an obstacle unions the labels around it.
+    Adding one may split a component: a round-robin flood fill from the
+    cell's neighbors stops as soon as they all meet, and only pieces that
+    run dry (the cut-off ones) are relabeled.
+    """
+    
+    def __init__(self, astar):
+        self.astar = astar
+        self.splits = 0
+        self.merges = 0
+        self.build()
+    
+    def build(self):
+        """Label every passable cell (vectorized hook-and-shortcut)"""
+        astar = self.astar
+        passable = astar.passable
+        cell_count = astar.rows * astar.cols
+        flat_ids = np.arange(cell_count, dtype=np.int64).reshape(passable.shape)
+        
+        # Edges between 4-adjacent passable cells
+        horizontal = passable[:, :-1] & passable[:, 1:]
+        vertical = passable[:-1, :] & passable[1:, :]
+        u = np.concatenate([flat_ids[:, :-1][horizontal], flat_ids[:-1, :][vertical]])
+        v = np.concatenate([flat_ids[:, 1:][horizontal], flat_ids[1:, :][vertical]])
+        
+        # Hook each root onto the smaller neighboring label, then pointer-jump
+        labels = np.arange(cell_count, dtype=np.int64)
+        while True:
+            lowest = np.minimum(labels[u], labels[v])
+            before = labels.copy()
+            np.minimum.at(labels, labels[u], lowest)
+            np.minimum.at(labels, labels[v], lowest)
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+            if np.array_equal(labels, before):
+                break
+        
+        # Compact to 0..k-1, obstacles -1
+        flat_passable = passable.reshape(-1)
+        roots, compact = np.unique(labels[flat_passable], return_inverse=True)
+        self.labels = np.full(cell_count, -1, dtype=np.int32)
+        self.labels[flat_passable] = compact
+        self._labels_view = memoryview(self.labels)
+        self._parent = list(range(len(roots)))
+    
+    def _find(self, label):
+        parent = self._parent
+        root = label
+        while parent[root] != root:
+            root = parent[root]
+        while parent[label] != root:   # Path compression
+            parent[label], label = root, parent[label]
+        return root
+    
+    def component_of(self, index):
+        """Component id of a cell, or -1 for obstacles"""
+        label = self._labels_view[index]
+        return self._find(label) if label >= 0 else -1
+    
+    def component_count(self):
+        # Only labels still held by a cell: closing a lone cell or
+        # splitting pieces off can leave a root with no cells behind
+        live = np.unique(self.labels[self.labels >= 0])
+        return len({self._find(label) for label in live.tolist()})
+    
+    def _neighbors(self, index):
+        mask = self.astar._mask_view[index]
+        return [index + step for bit, step in self.astar._neighbor_steps() if mask & bit]
+    
+    def reachable(self, start, goal):
+        """
+        O(1) check whether search(start, goal) can find a path.
+        An obstacle start may still step out onto its passable neighbors.
+        """
+        if start == goal:
+            return True
+        goal_component = self.component_of(goal)
+        if goal_component < 0:
+            return False
+        if self._labels_view[start] >= 0:
+            return self.component_of(start) == goal_component
+        return any(self.component_of(n) == goal_component for n in self._neighbors(start))
+    
+    def cell_opened(self, index):
+        """index just became passable: join the components around it"""
+        roots = {self.component_of(n) for n in self._neighbors(index)}
+        if not roots:
+            self._parent.append(len(self._parent))
+            self.labels[index] = len(self._parent) - 1
+            return
+        keep = roots.pop()
+        for root in roots:
+            self._parent[root] = keep
+            self.merges += 1
+        self.labels[index] = keep
+    
+    def cell_closed(self, index):
+        """index just became an obstacle: relabel any cut-off pieces"""
+        self.labels[index] = -1
+        starts = self._neighbors(index)
+        if len(starts) < 2:
+            return
+        
+        labels_view, neighbors = self._labels_view, self._neighbors
+        owner = {}               # cell -> group id (merged via group_parent)
+        group_parent = list(range(len(starts)))
+        frontiers, cells = [], []
+        for group, cell in enumerate(starts):
+            owner[cell] = group
+            frontiers.append([cell])
+            cells.append([cell])
+        active = set(range(len(starts)))
+        
+        def group_root(group):
+            while group_parent[group] != group:
+                group = group_parent[group]
+            return group
+        
+        # Grow the groups in turn until at most one is left growing; a
+        # flood fill that big is better off as a full vectorized rebuild
+        budget = max(1024, len(self.labels) // 8)
+        while len(active) > 1:
+            if len(owner) > budget:
+                self.build()
+                return
+            for group in list(active):
+                if group not in active or len(active) == 1:
+                    continue
+                frontier = frontiers[group]
+                if not frontier:
+                    # Ran dry without meeting the rest: a separate component
+                    active.discard(group)
+                    self._parent.append(len(self._parent))
+                    new_label = len(self._parent) - 1
+                    for cell in cells[group]:
+                        labels_view[cell] = new_label
+                    self.splits += 1
+                    continue
+                current = frontier.pop()
+                for neighbor in neighbors(current):
+                    other = owner.get(neighbor)
+                    if other is None:
+                        owner[neighbor] = group
+                        frontier.append(neighbor)
+                        cells[group].append(neighbor)
+                        continue
+                    other = group_root(other)
+                    if other != group:
+                        # Met another group: fold it into this one
+                        group_parent[other] = group
+                        frontier.extend(frontiers[other])
+                        cells[group].extend(cells[other])
+                        frontiers[other], cells[other] = [], []
+                        active.discard(other)
+
+
+class FlowField:
+    """
+    Distance field toward one goal, from a single reverse Dijkstra
+    
+    distances[i] is the cheapest cost from cell i to the goal (inf when it
+    cannot get there) and directions[i] the RIGHT/DOWN/LEFT/UP bit of the
+    next step (0 at the goal and at unreached cells). Any start's route is
+    then read off by following directions, in O(path length).
+    """
+    
+    def __init__(self, astar, goal):
+        self.goal = goal
+        self.cols = astar.cols
+        self._steps = dict(astar._neighbor_steps())
+        self._mask_view = astar._mask_view
+        self._cost_view = astar._cost_view
+        
+        costs, parents, self.expanded = astar.dijkstra(goal, reverse=True)
+        self.distances = np.frombuffer(costs, dtype=np.float64)
+        
+        # Parent offsets -> direction bits (vertical first: cols may be 1)
+        parents = np.frombuffer(parents, dtype=np.int32)
+        offsets = parents - np.arange(len(parents), dtype=np.int32)
+        reached = parents >= 0
+        directions = np.select(
+            [reached & (offsets == self.cols), reached & (offsets == -self.cols),
+             reached & (offsets == 1), reached & (offsets == -1)],
+            [DOWN, UP, RIGHT, LEFT], 0).astype(np.uint8)
+        self.directions = directions
+        self._distance_view = memoryview(costs)
+        self._direction_view = memoryview(directions)
+    
+    def _entry(self, start):
+        """
+        (first cell on the field, cost to reach it) for a start index.
+        An obstacle start is not on the field but may step off onto a
+        passable neighbor, so the best such neighbor is used.
+        """
+        if start == self.goal or self._distance_view[start] != math.inf:
+            return start, 0.0
+        best, best_total = None, math.inf
+        mask = self._mask_view[start]
+        for bit, offset in self._steps.items():
+            if mask & bit:
+                neighbor = start + offset
+                total = self._cost_view[neighbor] + self._distance_view[neighbor]
+                if total < best_total:
+                    best, best_total = neighbor, total
+        if best is None:
+            return None, math.inf
+        return best, self._cost_view[best]
+    
+    def leads_into(self, index):
+        """Whether index is the goal or some cell's next step enters it"""
+        if index == self.goal:
+            return True
+        direction_view = self._direction_view
+        for bit, offset in self._steps.items():
+            neighbor = index - offset
+            if 0 <= neighbor < len(direction_view) and direction_view[neighbor] == bit:
+                return True
+        return False
+    
+    def leads_into_any(self, cells):
+        """leads_into for a boolean mask over cell indices"""
+        offsets = np.zeros(max(self._steps) + 1, dtype=np.int64)
+        for bit, offset in self._steps.items():
+            offsets[bit] = offset
+        moving = np.flatnonzero(self.directions)
+        return bool(cells[self.goal] or
+                    cells[moving + offsets[self.directions[moving]]].any())
+    
+    def cell_closed(self, index):
+        """Take a cell that no route enters off the field once it is blocked"""
+        self.distances[index] = math.inf
+        self.directions[index] = 0
+    
+    def cost_from(self, start):
+        """Cheapest cost from a start index to the goal (inf if none)"""
+        entry, entry_cost = self._entry(start)
+        if entry is None:
+            return math.inf
+        return entry_cost + self._distance_view[entry]
+    
+    def path_from(self, start):
+        """Cell indices from start to the goal, or None"""
+        entry, _ = self._entry(start)
+        if entry is None:
+            return None
+        path = [start] if entry != start else []
+        direction_view, steps = self._direction_view, self._steps
+        current = entry
+        path.append(current)
+        while current != self.goal:
+            current += steps[direction_view[current]]
+            path.append(current)
+        return path
+
+
 class AdvancedAStarSearch:
     """
     Advanced A* Search with:
@@ -68,22 +915,357 @@ class AdvancedAStarSearch:
     - Dynamic obstacle costs
     - Safety factor for community service
     - Path reconstruction with cost analysis
+    
+    The grid is held as a NumPy uint8 terrain array. A per-cell move-cost
+    array, a passability mask and a per-cell neighbor bitmask are compiled
+    from it, so neighbor generation is array lookups instead of dict and
+    bounds logic. Use set_cell() (or assign a new grid) to change terrain.
+    
+    cache_size > 0 keeps a RouteCache of recent results; every grid or
+    terrain_costs change bumps grid_version and invalidates it.
+    
+    heuristic_type='alt' uses LandmarkTables (built on first search, or
+    loaded with load_landmarks(); from_map_image() also keeps them in a
+    .alt.npz next to the image) and stays optimal on weighted terrain.
+    
+    search() consults a ComponentIndex first, so start/goal pairs in
+    different connected components return (None, inf, 0) without searching.
+    
+    algorithm='bounded' is memory-bounded: divide-and-conquer frontier A*
+    that keeps at most node_budget open cells (falling back to IDA* if
+    the frontier outgrows it). It stays optimal, and keeps no
+    explored_nodes list.
+    
+    Exploration tracing is opt-in. trace_level='off' records nothing but
+    the explored count, 'counters' (the default) also fills
+    search_stats, and 'full' keeps an ExplorationTrace of expanded cells
+    (a ring buffer of trace_capacity entries if given) and the frontier
+    pushes. explored_nodes is read off that trace, and export_trace()
+    writes it compactly for replay in astar_game.html.
     """
     
-    def __init__(self, grid, heuristic_type='manhattan_safe'):
+    ALGORITHMS = ('astar', 'jps', 'bidirectional', 'bounded')
+    TRACE_LEVELS = ('off', 'counters', 'full')
+    FLOW_FIELD_CACHE = 16   # Goals whose flow fields are kept
+    
+    def __init__(self, grid, heuristic_type='manhattan_safe', algorithm='astar',
+                 cache_size=0, node_budget=100_000, trace_level='counters',
+                 trace_capacity=None):
+        self._init_settings(heuristic_type, algorithm, cache_size=cache_size,
+                            node_budget=node_budget, trace_level=trace_level,
+                            trace_capacity=trace_capacity)
         self.grid = grid
-        self.rows = len(grid)
-        self.cols = len(grid[0])
+    
+    def _init_settings(self, heuristic_type, algorithm='astar', terrain_costs=None,
+                       cache_size=0, node_budget=100_000, trace_level='counters',
+                       trace_capacity=None):
+        """Set everything except the grid and its compiled arrays"""
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Unknown algorithm {algorithm!r}, expected one of {self.ALGORITHMS}")
+        if trace_level not in self.TRACE_LEVELS:
+            raise ValueError(f"Unknown trace_level {trace_level!r}, expected one of {self.TRACE_LEVELS}")
         self.heuristic_type = heuristic_type
-        self.explored_nodes = []
+        self.algorithm = algorithm
+        self.node_budget = node_budget   # Memory cap, in cells, for 'bounded'
+        self.trace_level = trace_level
+        self.trace_capacity = trace_capacity   # Ring-buffer size for 'full'
+        self.trace = None                      # Last search's ExplorationTrace
         self.path_cost_breakdown = []
+        self.search_stats = {}
         
         # Dynamic costs for different terrain types
-        self.terrain_costs = {
-            0: 1,    # Normal road
-            2: 2,    # Busy street (slower)
-            3: 5,    # Dangerous area (avoid if possible)
+        if terrain_costs is None:
+            terrain_costs = {
+                0: 1,    # Normal road
+                2: 2,    # Busy street (slower)
+                3: 5,    # Dangerous area (avoid if possible)
+            }
+        self._terrain_costs = TerrainCostTable(self, terrain_costs)
+        self._cost_lut = self._cost_lookup_table()
+        self._integer_costs = self._costs_are_integers()
+        
+        # ALT landmark tables, built or loaded on demand for 'alt'; with
+        # a landmark_path they are also kept on disk (see from_map_image)
+        self.landmarks = None
+        self.landmark_path = None
+        
+        # Connected components; updated in place by set_cell()
+        self._components = None
+        
+        # goal index -> FlowField, most recently used last
+        self._flow_fields = OrderedDict()
+        
+        # Resumable k-shortest-paths state for the last (start, goal)
+        self._alternatives = None
+        
+        # Bumped on every grid or terrain_costs change
+        self.grid_version = 0
+        self.route_cache = RouteCache(cache_size) if cache_size > 0 else None
+    
+    @property
+    def grid(self):
+        """uint8 terrain array: 0=road, 1=obstacle, 2=busy, 3=dangerous"""
+        return self._grid
+    
+    @grid.setter
+    def grid(self, grid):
+        self._grid = as_terrain_array(grid)
+        self.rows, self.cols = self._grid.shape
+        self._compile_grid()
+    
+    @property
+    def terrain_costs(self):
+        return self._terrain_costs
+    
+    @terrain_costs.setter
+    def terrain_costs(self, costs):
+        self._terrain_costs = TerrainCostTable(self, costs)
+        self._on_terrain_costs_changed()
+    
+    def _cost_lookup_table(self):
+        """256-entry terrain -> move cost table (unknown terrain costs 1)"""
+        lookup = np.ones(256, dtype=np.float64)
+        for terrain, cost in self._terrain_costs.items():
+            if 0 <= terrain < 256:
+                lookup[terrain] = cost
+        lookup[OBSTACLE] = math.inf
+        return lookup
+    
+    def _costs_are_integers(self):
+        """Whether every finite move cost in the lookup table is a whole number"""
+        finite = self._cost_lut[np.isfinite(self._cost_lut)]
+        return bool((finite == np.floor(finite)).all())
+    
+    def _path_cost(self, cost):
+        """
+        A route cost as returned to callers: an int when every terrain
+        cost is a whole number (the float sum is then exact), else float.
+        Every public cost on this grid goes through here.
+        """
+        if self._integer_costs and math.isfinite(cost) and float(cost).is_integer():
+            return int(cost)
+        return cost
+    
+    def _compile_grid(self):
+        """Precompute move costs, passability and neighbor bitmasks"""
+        terrain = self._grid
+        passable = terrain != OBSTACLE
+        masks = np.zeros(terrain.shape, dtype=np.uint8)
+        masks[:, :-1] |= passable[:, 1:] * np.uint8(RIGHT)
+        masks[:-1, :] |= passable[1:, :] * np.uint8(DOWN)
+        masks[:, 1:] |= passable[:, :-1] * np.uint8(LEFT)
+        masks[1:, :] |= passable[:-1, :] * np.uint8(UP)
+        self._attach_compiled(self._cost_lut[terrain], passable, masks)
+    
+    def _attach_compiled(self, move_costs, passable, neighbor_masks):
+        """Install compiled arrays (possibly shared-memory views)"""
+        self.move_costs = move_costs
+        self.passable = passable
+        self.neighbor_masks = neighbor_masks
+        
+        # Flat zero-copy views for the scalar inner loops
+        self._cost_view = memoryview(move_costs.reshape(-1))
+        self._mask_view = memoryview(neighbor_masks.reshape(-1))
+        self._passable_view = memoryview(passable.reshape(-1))
+        self._components = None
+        self._grid_changed()
+    
+    def compiled_arrays(self):
+        """Name -> array for the grid and everything compiled from it"""
+        arrays = {
+            'grid': self._grid,
+            'move_costs': self.move_costs,
+            'passable': self.passable,
+            'neighbor_masks': self.neighbor_masks,
         }
+        if self.heuristic_type == 'manhattan_safe':
+            arrays['safety_penalty'] = self.safety_penalty
+        if self.landmarks is not None:
+            arrays['landmarks'] = np.array(self.landmarks.landmarks, dtype=np.int64)
+            arrays['from_landmark'] = self.landmarks.from_landmark
+            arrays['to_landmark'] = self.landmarks.to_landmark
+        return arrays
+    
+    def grid_fingerprint(self):
+        """Stable hash of the terrain and its move costs, for on-disk caches"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.array(self._grid.shape, dtype=np.int64).tobytes())
+        digest.update(np.ascontiguousarray(self._grid).tobytes())
+        digest.update(np.ascontiguousarray(self.move_costs).tobytes())
+        return digest.hexdigest()
+    
+    @classmethod
+    def from_map_image(cls, image_path, color_table=None, **settings):
+        """
+        Search over a map image's terrain (see load_map_image). ALT
+        tables are kept next to the image (LandmarkTables.default_path):
+        loaded on first use while they match the grid, saved when built.
+        """
+        astar = cls(load_map_image(image_path, color_table), **settings)
+        astar.landmark_path = LandmarkTables.default_path(image_path)
+        return astar
+    
+    @classmethod
+    def from_compiled(cls, arrays, heuristic_type='manhattan_safe', algorithm='astar',
+                      terrain_costs=None, node_budget=100_000):
+        """Build a search directly on compiled arrays without recompiling"""
+        astar = cls.__new__(cls)
+        astar._init_settings(heuristic_type, algorithm, terrain_costs,
+                             node_budget=node_budget)
+        astar._grid = arrays['grid']
+        astar.rows, astar.cols = astar._grid.shape
+        astar._attach_compiled(arrays['move_costs'], arrays['passable'],
+                               arrays['neighbor_masks'])
+        if 'safety_penalty' in arrays:
+            astar._safety_penalty = arrays['safety_penalty']
+            astar._safety_penalty_view = memoryview(astar._safety_penalty.reshape(-1))
+        if 'landmarks' in arrays:
+            astar.landmarks = LandmarkTables(
+                arrays['landmarks'].tolist(), arrays['from_landmark'],
+                arrays['to_landmark'], None)
+        return astar
+    
+    def _invalidate_grid_caches(self):
+        """Drop every cache derived from the terrain grid"""
+        self._safety_penalty = None
+        self._jps_region = None
+        self._jump_tables = None
+        self.landmarks = None
+        self._flow_fields.clear()
+        self._alternatives = None
+    
+    def _patch_cell_caches(self, index, old_cost, was_passable):
+        """
+        Bring grid caches up to date after set_cell changed one cell.
+        The safety field, JPS region and jump tables are patched around
+        the cell. If its cost went up (blocking counts), landmark tables
+        stay admissible and a flow field stays exact unless its routes
+        enter the cell; a cost decrease drops both.
+        """
+        row, col = divmod(index, self.cols)
+        is_passable = bool(self._passable_view[index])
+        raised = self._cost_view[index] >= old_cost
+        self._alternatives = None
+        
+        if self._safety_penalty is not None and was_passable != is_passable:
+            window = self._safety_penalty[max(row - 1, 0):row + 2, max(col - 1, 0):col + 2]
+            window += -0.5 if is_passable else 0.5
+        
+        if self._jps_region is not None:
+            cost, base = self._cost_view[index], self._jps_base
+            if cost < base or (old_cost == base and not (self.move_costs == base).any()):
+                self._jps_region = self._jump_tables = None
+            elif self._patch_jps_region(row, col) or was_passable != is_passable:
+                if self._jump_tables is not None:
+                    self._patch_jump_tables(row, col)
+        
+        if not raised:
+            self.landmarks = None
+            self._flow_fields.clear()
+        else:
+            for goal, field in list(self._flow_fields.items()):
+                if field.leads_into(index):
+                    del self._flow_fields[goal]
+                elif not is_passable:
+                    field.cell_closed(index)
+    
+    def _patch_terrain_caches(self, old_lut):
+        """
+        Keep grid caches that survive a terrain_costs edit: the safety
+        field always (it depends on obstacles only), the JPS region and
+        jump tables if no terrain crossed the base cost, and - when costs
+        only went up - landmark tables plus the flow fields whose routes
+        avoid the raised terrains.
+        """
+        self._alternatives = None
+        if self._jps_region is not None:
+            kept = np.ones(256, dtype=bool)
+            kept[OBSTACLE] = False
+            if (self.base_move_cost != self._jps_base or
+                    ((old_lut != self._jps_base) != (self._cost_lut != self._jps_base))[kept].any()):
+                self._jps_region = self._jump_tables = None
+        
+        if (self._cost_lut < old_lut).any():
+            self.landmarks = None
+            self._flow_fields.clear()
+            return
+        raised = np.isin(self._grid.reshape(-1), np.flatnonzero(self._cost_lut > old_lut))
+        if raised.any():
+            for goal, field in list(self._flow_fields.items()):
+                if field.leads_into_any(raised):
+                    del self._flow_fields[goal]
+    
+    def _grid_changed(self, still_valid=None, invalidate=True):
+        """
+        Bump grid_version and drop stale derived data
+        still_valid(cells) says whether a cached route over those cell
+        indices survives the change; None drops every cached route.
+        invalidate=False leaves the derived caches to the caller, which
+        has patched them.
+        """
+        self.grid_version += 1
+        if invalidate:
+            self._invalidate_grid_caches()
+        if self.route_cache is not None:
+            if still_valid is None:
+                self.route_cache.clear()
+            else:
+                self.route_cache.migrate(self.grid_version, still_valid)
+    
+    def _on_terrain_costs_changed(self):
+        """Recompile move costs after terrain_costs was edited"""
+        old_lut, self._cost_lut = self._cost_lut, self._cost_lookup_table()
+        self._integer_costs = self._costs_are_integers()
+        self.move_costs[...] = self._cost_lut[self._grid]
+        
+        # Only raised costs: routes avoiding those terrains stay optimal
+        still_valid = None
+        if not (self._cost_lut < old_lut).any():
+            raised = np.flatnonzero(self._cost_lut > old_lut)
+            terrain = self._grid.reshape(-1)
+            def still_valid(cells):
+                return not np.isin(terrain[cells], raised).any()
+        self._patch_terrain_caches(old_lut)
+        self._grid_changed(still_valid, invalidate=False)
+    
+    def set_cell(self, position, terrain):
+        """Change one cell's terrain and patch the compiled arrays locally"""
+        row, col = position
+        old_cost = self.move_costs[row, col]
+        was_passable = self.passable[row, col]
+        self._grid[row, col] = terrain
+        self.move_costs[row, col] = self._cost_lut[terrain]
+        is_passable = terrain != OBSTACLE
+        self.passable[row, col] = is_passable
+        
+        # Neighbors' bits that point at this cell
+        masks = self.neighbor_masks
+        for d_row, d_col, bit in ((0, -1, RIGHT), (-1, 0, DOWN),
+                                  (0, 1, LEFT), (1, 0, UP)):
+            n_row, n_col = row + d_row, col + d_col
+            if 0 <= n_row < self.rows and 0 <= n_col < self.cols:
+                if is_passable:
+                    masks[n_row, n_col] |= bit
+                else:
+                    masks[n_row, n_col] &= ~bit & 0xFF
+        
+        if self._components is not None and was_passable != is_passable:
+            if is_passable:
+                self._components.cell_opened(self.to_index(position))
+            else:
+                self._components.cell_closed(self.to_index(position))
+        
+        # A cost increase only hurts routes through this cell (or, for
+        # manhattan_safe, near it, where the safety penalty moved too)
+        still_valid = None
+        if self.move_costs[row, col] >= old_cost:
+            index = self.to_index(position)
+            nearby = np.array([index + d_row * self.cols + d_col
+                               for d_row in (-1, 0, 1) for d_col in (-1, 0, 1)])
+            def still_valid(cells):
+                return not np.isin(cells, nearby).any()
+        self._patch_cell_caches(self.to_index(position), old_cost, was_passable)
+        self._grid_changed(still_valid, invalidate=False)
     
     def manhattan_distance(self, pos1, pos2):
         """Standard Manhattan distance"""
@@ -101,17 +1283,34 @@ class AdvancedAStarSearch:
         base_dist = self.manhattan_distance(pos1, pos2)
         
         # Add safety penalty for cells near obstacles
-        safety_penalty = 0
-        for dr in [-1, 0, 1]:
-            for dc in [-1, 0, 1]:
-                check_row = pos1[0] + dr
-                check_col = pos1[1] + dc
-                if (0 <= check_row < self.rows and 
-                    0 <= check_col < self.cols and
-                    self.grid[check_row][check_col] == 1):
-                    safety_penalty += 0.5
-        
-        return base_dist + safety_penalty
+        return base_dist + self.safety_penalty[pos1[0], pos1[1]]
+    
+    @property
+    def components(self):
+        """ComponentIndex over passable cells, built on first use"""
+        if self._components is None:
+            self._components = ComponentIndex(self)
+        return self._components
+    
+    @property
+    def safety_penalty(self):
+        """
+        Safety-penalty field: 0.5 per obstacle in each cell's 3x3
+        neighborhood (the cell itself included). Computed once per grid
+        as a vectorized 3x3 box sum over the obstacle mask; set_cell
+        patches it in place.
+        """
+        if self._safety_penalty is None:
+            rows, cols = self.rows, self.cols
+            padded = np.pad(~self.passable, 1).astype(np.float64)
+            penalty = np.zeros((rows, cols), dtype=np.float64)
+            for dr in range(3):
+                for dc in range(3):
+                    penalty += padded[dr:dr + rows, dc:dc + cols]
+            penalty *= 0.5
+            self._safety_penalty = penalty
+            self._safety_penalty_view = memoryview(penalty.reshape(-1))
+        return self._safety_penalty
     
     def get_heuristic(self, pos1, pos2):
         """Select heuristic based on configuration"""
@@ -119,99 +1318,1420 @@ class AdvancedAStarSearch:
             return self.manhattan_distance(pos1, pos2)
         elif self.heuristic_type == 'euclidean':
             return self.euclidean_distance(pos1, pos2)
+        elif self.heuristic_type == 'alt':
+            return self._index_heuristic(self.to_index(pos2))(self.to_index(pos1))
         else:  # manhattan_safe
             return self.manhattan_with_safety(pos1, pos2)
     
+    def build_landmarks(self, count=8):
+        """Precompute ALT landmark tables for the current grid (saved to landmark_path if set)"""
+        self.landmarks = LandmarkTables.build(self, count)
+        if self.landmark_path is not None:
+            self.landmarks.save(self.landmark_path)
+        return self.landmarks
+    
+    def _ensure_landmarks(self):
+        """Landmark tables for 'alt': loaded from landmark_path while fresh, else built"""
+        if self.landmarks is None:
+            path = self.landmark_path
+            if path is not None and os.path.exists(path):
+                tables = LandmarkTables.load(path)
+                if tables.fingerprint == self.grid_fingerprint():
+                    self.landmarks = tables
+                    return tables
+            self.build_landmarks()
+        return self.landmarks
+    
+    def load_landmarks(self, path):
+        """Load ALT tables saved for this exact grid and terrain costs"""
+        tables = LandmarkTables.load(path)
+        if tables.fingerprint != self.grid_fingerprint():
+            raise ValueError(f"Landmark tables in {path} were built for a different grid")
+        self.landmarks = tables
+        return tables
+    
     def get_neighbors(self, position):
         """Get valid neighbor cells with movement costs"""
-        row, col = position
+        index = self.to_index(position)
+        mask = self._mask_view[index]
         neighbors = []
         
         # Four directions: right, down, left, up
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-        
-        for dr, dc in directions:
-            new_row, new_col = row + dr, col + dc
-            
-            # Check bounds and obstacles
-            if (0 <= new_row < self.rows and 
-                0 <= new_col < self.cols and 
-                self.grid[new_row][new_col] != 1):  # Not obstacle
-                
-                # Get terrain cost
-                terrain = self.grid[new_row][new_col]
-                cost = self.terrain_costs.get(terrain, 1)
-                
-                neighbors.append(((new_row, new_col), cost))
+        for bit, offset in self._neighbor_steps():
+            if mask & bit:
+                neighbor = index + offset
+                neighbors.append((self.to_position(neighbor), self._cost_view[neighbor]))
         
         return neighbors
     
+    def _neighbor_steps(self):
+        """(mask bit, flat index offset) for right, down, left, up"""
+        cols = self.cols
+        return ((RIGHT, 1), (DOWN, cols), (LEFT, -1), (UP, -cols))
+    
+    def to_index(self, position):
+        """Flatten (row, col) into a cell index: row * cols + col"""
+        return position[0] * self.cols + position[1]
+    
+    def to_position(self, index):
+        """Expand a flat cell index back into (row, col)"""
+        return divmod(index, self.cols)
+    
+    def _index_heuristic(self, goal):
+        """Build h(index) for a fixed goal index, matching get_heuristic"""
+        cols = self.cols
+        goal_row, goal_col = divmod(goal, cols)
+        
+        if self.heuristic_type == 'manhattan':
+            def h(index):
+                row, col = divmod(index, cols)
+                return abs(row - goal_row) + abs(col - goal_col)
+        elif self.heuristic_type == 'euclidean':
+            sqrt = math.sqrt
+            def h(index):
+                row, col = divmod(index, cols)
+                return sqrt((row - goal_row)**2 + (col - goal_col)**2)
+        elif self.heuristic_type == 'alt':
+            h = self._ensure_landmarks().heuristic(goal)
+        else:  # manhattan_safe
+            self.safety_penalty  # Make sure the cached field is built
+            penalty = self._safety_penalty_view
+            def h(index):
+                row, col = divmod(index, cols)
+                return abs(row - goal_row) + abs(col - goal_col) + penalty[index]
+        return h
+    
+    @property
+    def explored_nodes(self):
+        """Expanded positions of the last search (trace_level='full' only)"""
+        if self.trace is None:
+            return []
+        cols = self.cols
+        return [divmod(int(index), cols) for index in self.trace.indices()]
+    
+    def export_trace(self, file_path, path=None, cost=None, include_grid=True, fmt=None):
+        """
+        Write the last search's trace (trace_level='full') with its
+        path and the terrain, for replay in the browser; see
+        write_search_trace for the binary and JSON layouts. A query
+        answered without searching exports an empty trace flagged
+        'unreachable' or 'cached'.
+        """
+        if self.trace is None:
+            raise ValueError("No trace to export: search with trace_level='full' first")
+        path_indices = [self.to_index(tuple(position)) for position in path] if path else None
+        if cost is None:
+            cost = (sum(self._cost_view[index] for index in path_indices[1:])
+                    if path_indices else math.inf)
+        write_search_trace(file_path, self.trace, self.rows, self.cols, path_indices, cost,
+                           self._grid if include_grid else None, fmt)
+    
+    def _new_recorder(self):
+        """Start a fresh trace for a search; None unless trace_level is 'full'"""
+        if self.trace_level != 'full':
+            self.trace = None
+            return None
+        self.trace = ExplorationTrace(self.trace_capacity)
+        return self.trace.recorder()
+    
+    def _answered_trace(self, status):
+        """Leave an empty, flagged trace for a query answered without searching"""
+        self.trace = (ExplorationTrace(self.trace_capacity, status)
+                      if self.trace_level == 'full' else None)
+    
     def search(self, start, goal):
         """
         Execute A* Search with detailed tracking
-        Returns: (path, cost, explored_count)
+        Returns: (path, cost, explored_count) - cost is an int when all
+        terrain costs are whole numbers, a float otherwise
         """
-        # Priority queue: stores (f_cost, counter, node)
-        counter = 0
-        open_set = PriorityQueue()
-        start_node = Node(start, 0, self.get_heuristic(start, goal))
-        open_set.put((start_node.f_cost, counter, start_node))
-        counter += 1
+        start, goal = tuple(start), tuple(goal)
+        counting = self.trace_level != 'off'
+        self.search_stats = {'algorithm': self.algorithm} if counting else {}
+        self.trace = None
         
-        # Track visited nodes and costs
-        closed_set = set()
-        came_from = {start: None}
-        g_scores = {start: 0}
+        if self.route_cache is not None:
+            cache_key = (self.grid_version, self.heuristic_type, self.algorithm, start, goal)
+            cached = self.route_cache.get(cache_key)
+            if cached is not None:
+                path, cost, explored = cached
+                if counting:
+                    self.search_stats['cache_hit'] = True
+                self._answered_trace('cached')
+                return (list(path) if path is not None else None), cost, explored
         
-        self.explored_nodes = []
+        start_index = self.to_index(start)
+        goal_index = self.to_index(goal)
         
-        while not open_set.empty():
-            _, _, current = open_set.get()
-            
-            # Track exploration
-            self.explored_nodes.append(current.position)
-            
-            # Goal reached
-            if current.position == goal:
-                path = self.reconstruct_path(came_from, current.position)
-                total_cost = g_scores[goal]
-                return path, total_cost, len(self.explored_nodes)
-            
-            # Skip if already processed
-            if current.position in closed_set:
-                continue
-            
-            closed_set.add(current.position)
-            
-            # Explore neighbors
-            for neighbor_pos, move_cost in self.get_neighbors(current.position):
-                if neighbor_pos in closed_set:
-                    continue
-                
-                # Calculate tentative g score
-                tentative_g = g_scores[current.position] + move_cost
-                
-                # Update if better path found
-                if neighbor_pos not in g_scores or tentative_g < g_scores[neighbor_pos]:
-                    g_scores[neighbor_pos] = tentative_g
-                    h_cost = self.get_heuristic(neighbor_pos, goal)
-                    neighbor_node = Node(neighbor_pos, tentative_g, h_cost, current)
-                    came_from[neighbor_pos] = current.position
-                    
-                    open_set.put((neighbor_node.f_cost, counter, neighbor_node))
-                    counter += 1
+        # Different components: no search needed
+        if not self.components.reachable(start_index, goal_index):
+            if counting:
+                self.search_stats.update(expanded=0, unreachable=True)
+            self._answered_trace('unreachable')
+            return None, float('inf'), 0
         
-        return None, float('inf'), len(self.explored_nodes)  # No path found
-    
-    def reconstruct_path(self, came_from, current):
-        """Reconstruct path from start to goal"""
-        path = [current]
-        while current in came_from and came_from[current] is not None:
-            current = came_from[current]
-            path.append(current)
-        return path[::-1]
+        record = self._new_recorder()
+        path_indices, cost, explored = self._run_search(
+            start_index, goal_index, record,
+            self.trace.push_recorder() if self.trace is not None else None)
+        if counting:
+            self.search_stats['expanded'] = explored
+        
+        if path_indices is None:
+            path, cost = None, float('inf')  # No path found
+        else:
+            path = [self.to_position(index) for index in path_indices]
+            cost = self._path_cost(cost)
+        
+        if self.route_cache is not None:
+            self.route_cache.put(cache_key, path, cost, explored, path_indices)
+        return path, cost, explored
     
-    def print_algorithm_details(self):
+    def _run_search(self, start, goal, record=None, record_push=None):
+        """
+        Dispatch to the configured search core
+        record(index), if given, is called for each expanded cell and
+        record_push(index) for each frontier push ('bounded' never
+        traces, to stay memory-bounded).
+        Returns: (path_indices or None, cost, expanded_count)
+        """
+        if self.algorithm == 'bidirectional':
+            return self._search_bidirectional(start, goal, record, record_push)
+        if self.algorithm == 'bounded':
+            return self._search_bounded(start, goal)
+        
+        if self.algorithm == 'jps':
+            parents, g_scores, expanded = self._search_jps(start, goal, record, record_push)
+        else:
+            parents, g_scores, expanded = self._search_indexed(
+                start, goal, record=record, record_push=record_push)
+        if parents is None:
+            return None, math.inf, expanded
+        
+        path_indices = self.reconstruct_indexed_path(parents, goal)
+        if self.algorithm == 'jps':
+            path_indices = self._fill_jumps(path_indices)
+        return path_indices, g_scores[goal], expanded
+    
+    def _bounded_heuristic(self, goal):
+        """Consistent heuristic for the memory-bounded searches"""
+        if self.heuristic_type == 'alt':
+            return self._index_heuristic(goal)
+        return self._admissible_heuristic(goal, self._bounded_base)
+    
+    def _search_bounded(self, start, goal):
+        """
+        Memory-bounded optimal search
+        
+        Runs divide-and-conquer frontier A* (Korf & Zhang, 2000): the
+        search keeps only its open list, with no closed set or parents, so
+        on a grid memory follows the frontier's perimeter rather than the
+        explored area. Each open cell carries the cell at the middle depth
+        of its best path; once the goal is reached, start->middle and
+        middle->goal are solved the same way to rebuild the path. If the
+        frontier still outgrows node_budget, it falls back to IDA*.
+        
+        Stats: re_expansions (expansions repeated by the sub-searches or
+        by IDA* passes), peak_nodes (most cells held at once),
+        peak_bytes (estimated size of those structures) and fallback.
+        
+        Returns: (path_indices or None, cost, expansions)
+        """
+        self._bounded_stats = {'re_expansions': 0, 'peak_nodes': 0,
+                               'peak_bytes': 0, 'fallback': None}
+        self._bounded_expansions = 0
+        self._bounded_base = self.base_move_cost
+        try:
+            cost, middle = self._frontier_search(start, goal)
+            first_pass = self._bounded_expansions
+            path = None
+            if cost < math.inf:
+                path = self._frontier_path(start, goal, middle)
+        except _BudgetExceeded:
+            path, cost, expansions = self._search_ida(start, goal)
+            if self.trace_level != 'off':
+                self.search_stats['fallback'] = 'ida'
+                self.search_stats['peak_nodes'] = max(self.search_stats['peak_nodes'],
+                                                      self._bounded_stats['peak_nodes'])
+            return path, cost, expansions + self._bounded_expansions
+        
+        self._bounded_stats['re_expansions'] = self._bounded_expansions - first_pass
+        if self.trace_level != 'off':
+            self.search_stats.update(self._bounded_stats)
+        return path, cost, self._bounded_expansions
+    
+    def _frontier_path(self, start, goal, middle):
+        """Cell indices of an optimal start->goal path through middle"""
+        if middle is None:
+            return [start] if start == goal else [start, goal]
+        _, before = self._frontier_search(start, middle)
+        _, after = self._frontier_search(middle, goal)
+        head = self._frontier_path(start, middle, before)
+        tail = self._frontier_path(middle, goal, after)
+        return head + tail[1:]
+    
+    def _frontier_search(self, start, goal):
+        """
+        Frontier A* from start to goal
+        
+        Open cells remember which of their neighbors already expanded
+        into them (used-operator bits), so they never generate those
+        again; with a consistent heuristic no closed set is needed.
+        
+        Returns: (cost, middle) - middle is the cell at depth
+        manhattan(start, goal) // 2 on the found path, or None when start
+        and goal are equal or adjacent (cost is inf when unreachable)
+        """
+        mask_view, cost_view = self._mask_view, self._cost_view
+        neighbor_steps = self._neighbor_steps()
+        opposite = {RIGHT: LEFT, LEFT: RIGHT, DOWN: UP, UP: DOWN}
+        h = self._bounded_heuristic(goal)
+        heappush, heappop = heapq.heappush, heapq.heappop
+        stats, budget = self._bounded_stats, self.node_budget
+        entry_bytes = (sys.getsizeof([0.5, 0, 0, 0]) + sys.getsizeof((0.5, 1, 0.5, 1))
+                       + 2 * sys.getsizeof(0.5))
+        
+        start_row, start_col = divmod(start, self.cols)
+        goal_row, goal_col = divmod(goal, self.cols)
+        middle_depth = (abs(start_row - goal_row) + abs(start_col - goal_col)) // 2
+        
+        # cell -> [g, used-operator bits, depth, middle cell or None]
+        open_cells = {start: [0.0, 0, 0, None]}
+        open_heap = [(h(start), 0, 0.0, start)]
+        counter = 1
+        
+        while open_heap:
+            _, _, g, current = heappop(open_heap)
+            entry = open_cells.get(current)
+            if entry is None or entry[0] != g:
+                continue   # Stale heap entry
+            del open_cells[current]
+            self._bounded_expansions += 1
+            if current == goal:
+                return g, (entry[3] if middle_depth > 0 else None)
+            
+            _, used, depth, middle = entry
+            depth += 1
+            mask = mask_view[current]
+            for bit, offset in neighbor_steps:
+                if not mask & bit or used & bit:
+                    continue
+                neighbor = current + offset
+                new_g = g + cost_view[neighbor]
+                neighbor_middle = neighbor if depth == middle_depth else middle
+                known = open_cells.get(neighbor)
+                if known is None:
+                    open_cells[neighbor] = [new_g, opposite[bit], depth, neighbor_middle]
+                elif new_g < known[0]:
+                    known[0], known[2], known[3] = new_g, depth, neighbor_middle
+                    known[1] |= opposite[bit]
+                else:
+                    known[1] |= opposite[bit]
+                    continue
+                heappush(open_heap, (new_g + h(neighbor), counter, new_g, neighbor))
+                counter += 1
+            
+            # Drop stale heap entries before they count against the budget
+            if len(open_heap) > 2 * len(open_cells) + 16:
+                open_heap = [(entry[0] + h(cell), i, entry[0], cell)
+                             for i, (cell, entry) in enumerate(open_cells.items())]
+                heapq.heapify(open_heap)
+            held = len(open_cells) + len(open_heap)
+            if held > stats['peak_nodes']:
+                stats['peak_nodes'] = held
+                stats['peak_bytes'] = (sys.getsizeof(open_cells) + sys.getsizeof(open_heap)
+                                       + len(open_cells) * entry_bytes)
+            if held > budget:
+                raise _BudgetExceeded(f"Frontier exceeded node_budget={budget}")
+        return math.inf, None
+    
+    def _search_ida(self, start, goal):
+        """
+        Memory-bounded IDA* (Korf, 1985) with a transposition table
+        
+        Depth-first passes under an f-cost threshold that rises to the
+        smallest f that overflowed the previous pass. A transposition
+        table of at most node_budget cells remembers the best g seen per
+        cell and prunes dominated revisits; once it is full, the entry
+        with the largest g makes room for a shallower cell (those prune
+        bigger subtrees). Forgetting cells costs re-expansions, never
+        optimality. Memory is O(node_budget + path depth), independent
+        of the grid size.
+        
+        Stats: iterations, re_expansions (expansions of a cell already in
+        the table), peak_nodes (table entries + DFS depth) and peak_bytes
+        (estimated size of the table and the DFS stack at their peaks).
+        
+        Returns: (path_indices or None, cost, expansions)
+        """
+        mask_view, cost_view = self._mask_view, self._cost_view
+        neighbor_steps = self._neighbor_steps()
+        h = self._bounded_heuristic(goal)
+        budget = self.node_budget
+        inf = math.inf
+        
+        table = {}   # cell -> (best g, iteration it was recorded in)
+        deepest = []  # Max-heap of (-g, cell) over table entries, lazily cleaned
+        heappush, heappop = heapq.heappush, heapq.heappop
+        entry_bytes = sys.getsizeof((0.5, 1)) + sys.getsizeof(0.5)
+        frame_bytes = sys.getsizeof([]) + 4 * sys.getsizeof((0.5, 0.5, 1))
+        stats = {'iterations': 0, 're_expansions': 0, 'peak_nodes': 1, 'peak_bytes': 0}
+        expansions = 0
+        max_depth = 1
+        next_threshold = inf
+        
+        def children(cell, g, threshold):
+            """Children under the threshold, best f last; tracks overflow"""
+            nonlocal next_threshold
+            result = []
+            mask = mask_view[cell]
+            for bit, offset in neighbor_steps:
+                if mask & bit:
+                    neighbor = cell + offset
+                    child_g = g + cost_view[neighbor]
+                    f = child_g + h(neighbor)
+                    if f > threshold:
+                        if f < next_threshold:
+                            next_threshold = f
+                    else:
+                        result.append((f, child_g, neighbor))
+            result.sort(reverse=True)
+            return result
+        
+        threshold = h(start)
+        found = ([start], 0.0) if start == goal else None
+        while found is None and threshold < inf:
+            stats['iterations'] += 1
+            iteration = stats['iterations']
+            next_threshold = inf
+            path, on_path = [start], {start}
+            frames = [children(start, 0.0, threshold)]
+            expansions += 1
+            while frames:
+                pending = frames[-1]
+                if not pending:
+                    frames.pop()
+                    on_path.discard(path.pop())
+                    continue
+                _, g, cell = pending.pop()
+                if cell in on_path:
+                    continue
+                seen = table.get(cell)
+                if seen is not None:
+                    if seen[0] < g or (seen[0] == g and seen[1] == iteration):
+                        continue
+                    stats['re_expansions'] += 1
+                    table[cell] = (g, iteration)
+                    heappush(deepest, (-g, cell))
+                elif len(table) < budget:
+                    table[cell] = (g, iteration)
+                    heappush(deepest, (-g, cell))
+                else:
+                    # Full: a shallow entry prunes more than a deep one
+                    while deepest and table.get(deepest[0][1], (None,))[0] != -deepest[0][0]:
+                        heappop(deepest)
+                    if deepest and -deepest[0][0] > g:
+                        del table[heappop(deepest)[1]]
+                        table[cell] = (g, iteration)
+                        heappush(deepest, (-g, cell))
+                if len(deepest) > 2 * budget + 16:
+                    deepest = [(-entry[0], c) for c, entry in table.items()]
+                    heapq.heapify(deepest)
+                
+                expansions += 1
+                path.append(cell)
+                on_path.add(cell)
+                if cell == goal:
+                    found = path, g
+                    break
+                frames.append(children(cell, g, threshold))
+                if len(path) > max_depth:
+                    max_depth = len(path)
+            threshold = next_threshold
+        
+        stats['peak_nodes'] = len(table) + max_depth
+        stats['peak_bytes'] = (sys.getsizeof(table) + len(table) * entry_bytes
+                               + max_depth * frame_bytes)
+        if self.trace_level != 'off':
+            self.search_stats.update(stats)
+        if found is None:
+            return None, math.inf, expansions
+        return found[0], found[1], expansions
+    
+    def _search_indexed(self, start, goal, h=None, record=None, record_push=None):
+        """
+        Lock-free A* core over flat cell indices (row * cols + col).
+        
+        g-scores and parents live in preallocated arrays instead of dicts,
+        and the open list is a plain heapq of (f_cost, counter, index)
+        tuples. Improved entries are pushed again and stale ones are
+        skipped when popped (lazy deletion), so no decrease-key is needed.
+        h defaults to the configured heuristic_type; record(index), if
+        given, is called for each expanded cell, and record_push(index)
+        for each cell pushed onto the open list.
+        
+        Returns: (parents, g_scores, expanded) - parents is None when the
+        goal is unreachable; expanded is the number of cells expanded.
+        """
+        mask_view, cost_view = self._mask_view, self._cost_view
+        neighbor_steps = self._neighbor_steps()
+        if h is None:
+            h = self._index_heuristic(goal)
+        heappush, heappop = heapq.heappush, heapq.heappop
+        
+        cell_count = self.rows * self.cols
+        g_scores = array('d', [math.inf]) * cell_count
+        parents = array('i', [-1]) * cell_count
+        closed = bytearray(cell_count)
+        expanded = 0
+        
+        g_scores[start] = 0
+        open_heap = [(h(start), 0, start)]
+        counter = 1
+        
+        while open_heap:
+            _, _, current = heappop(open_heap)
+            
+            # Lazy deletion: a closed cell means this entry is stale
+            if closed[current]:
+                continue
+            closed[current] = 1
+            expanded += 1
+            if record is not None:
+                record(current)
+            
+            # Goal reached
+            if current == goal:
+                return parents, g_scores, expanded
+            
+            current_g = g_scores[current]
+            mask = mask_view[current]
+            
+            # Mask bits already encode bounds and obstacles
+            for bit, offset in neighbor_steps:
+                if not mask & bit:
+                    continue
+                neighbor = current + offset
+                if closed[neighbor]:
+                    continue
+                
+                tentative_g = current_g + cost_view[neighbor]
+                if tentative_g < g_scores[neighbor]:
+                    g_scores[neighbor] = tentative_g
+                    parents[neighbor] = current
+                    heappush(open_heap, (tentative_g + h(neighbor), counter, neighbor))
+                    counter += 1
+                    if record_push is not None:
+                        record_push(neighbor)
+        
+        return None, g_scores, expanded
+    
+    @property
+    def base_move_cost(self):
+        """Cheapest cost of entering any passable cell"""
+        costs = self.move_costs[self.passable]
+        return float(costs.min()) if costs.size else 1.0
+    
+    def _admissible_heuristic(self, goal, base=None):
+        """Consistent h(index): Manhattan distance times the cheapest move cost"""
+        cols = self.cols
+        goal_row, goal_col = divmod(goal, cols)
+        if base is None:
+            base = self.base_move_cost
+        def h(index):
+            row, col = divmod(index, cols)
+            return (abs(row - goal_row) + abs(col - goal_col)) * base
+        return h
+    
+    @property
+    def jps_region(self):
+        """
+        Cells where Jump Point Search may prune: every passable cell in
+        the 3x3 neighborhood costs base_move_cost. Cached per grid and
+        patched by set_cell.
+        """
+        if self._jps_region is None:
+            rows, cols = self.rows, self.cols
+            self._jps_base = self.base_move_cost
+            costly = self.passable & (self.move_costs != self._jps_base)
+            padded = np.pad(costly, 1)
+            near_costly = np.zeros((rows, cols), dtype=bool)
+            for dr in range(3):
+                for dc in range(3):
+                    near_costly |= padded[dr:dr + rows, dc:dc + cols]
+            self._jps_region = ~near_costly & self.passable
+        return self._jps_region
+    
+    def _patch_jps_region(self, row, col):
+        """Recompute jps_region around one changed cell; True if it moved"""
+        region, passable, costs = self._jps_region, self.passable, self.move_costs
+        changed = False
+        for r in range(max(row - 1, 0), min(row + 2, self.rows)):
+            for c in range(max(col - 1, 0), min(col + 2, self.cols)):
+                window = (slice(max(r - 1, 0), r + 2), slice(max(c - 1, 0), c + 2))
+                costly = passable[window] & (costs[window] != self._jps_base)
+                value = bool(passable[r, c]) and not costly.any()
+                if value != region[r, c]:
+                    region[r, c] = value
+                    changed = True
+        return changed
+    
+    @property
+    def jump_tables(self):
+        """
+        Goal-independent jump distances for Jump Point Search, keyed by
+        'down', 'up', 'right', 'left'. For each cell, a value k > 0 means
+        the jump stops at a jump point k steps away; k <= 0 means -k clear
+        cells and then a wall, with no jump point. Cached per grid and
+        rescanned around cells changed by set_cell.
+        """
+        if self._jump_tables is None:
+            region = self.jps_region
+            walkable = np.pad(self.passable, 1)  # Out of bounds is blocked
+            inner = walkable[1:-1, 1:-1]
+            tables = {}
+            
+            # Moving vertically, a cell is a jump point if it leaves the
+            # uniform region or has a forced horizontal neighbor
+            for name, d_row in (('down', 1), ('up', -1)):
+                stops = self._vertical_stops(walkable, region, d_row)
+                tables[name] = self._scan_jumps(stops, inner, d_row)
+            
+            # Moving horizontally, a cell is a jump point if it leaves the
+            # uniform region or a vertical jump from it finds one
+            has_vertical = (tables['down'] > 0) | (tables['up'] > 0)
+            stops = (inner & (~region | has_vertical)).T
+            for name, d_col in (('right', 1), ('left', -1)):
+                tables[name] = np.ascontiguousarray(
+                    self._scan_jumps(stops, inner.T, d_col).T)
+            
+            self._jump_tables = tables
+            self._jump_views = {name: memoryview(table.reshape(-1))
+                                for name, table in tables.items()}
+        return self._jump_tables
+    
+    def _patch_jump_tables(self, row, col):
+        """
+        Rescan jump_tables after jps_region or passability changed around
+        one cell: the vertical tables of its own and adjacent columns, then
+        the horizontal tables of every row whose stops may have moved
+        """
+        tables, region = self._jump_tables, self._jps_region
+        rows, cols = self.rows, self.cols
+        first, last = max(col - 1, 0), min(col + 2, cols)
+        walkable = np.pad(self.passable, 1)[:, first:last + 2]
+        inner = walkable[1:-1, 1:-1]
+        
+        had_vertical = (tables['down'][:, first:last] > 0) | (tables['up'][:, first:last] > 0)
+        for name, d_row in (('down', 1), ('up', -1)):
+            stops = self._vertical_stops(walkable, region[:, first:last], d_row)
+            tables[name][:, first:last] = self._scan_jumps(stops, inner, d_row)
+        has_vertical = (tables['down'][:, first:last] > 0) | (tables['up'][:, first:last] > 0)
+        
+        changed = (had_vertical != has_vertical).any(axis=1)
+        changed[max(row - 1, 0):row + 2] = True
+        changed = np.flatnonzero(changed)
+        inner = self.passable[changed]
+        has_vertical = (tables['down'][changed] > 0) | (tables['up'][changed] > 0)
+        stops = (inner & (~region[changed] | has_vertical)).T
+        for name, d_col in (('right', 1), ('left', -1)):
+            tables[name][changed] = self._scan_jumps(stops, inner.T, d_col).T
+    
+    @staticmethod
+    def _vertical_stops(walkable, region, d_row):
+        """
+        Jump points of a vertical jump: cells leaving the uniform region
+        or with a forced horizontal neighbor. walkable is padded by one
+        cell all round relative to region.
+        """
+        inner = walkable[1:-1, 1:-1]
+        behind = walkable[1 - d_row:walkable.shape[0] - 1 - d_row]
+        forced = ((walkable[1:-1, :-2] & ~behind[:, :-2]) |
+                  (walkable[1:-1, 2:] & ~behind[:, 2:]))
+        return inner & (~region | forced)
+    
+    @staticmethod
+    def _scan_jumps(stops, walkable, step):
+        """
+        Jump distances along axis 0 of a stop mask: for each cell, the
+        first stop or wall ahead, found with a running minimum over the
+        row numbers of those cells (the grid edge counts as a wall)
+        """
+        if step == -1:
+            return np.ascontiguousarray(
+                AdvancedAStarSearch._scan_jumps(stops[::-1], walkable[::-1], 1)[::-1])
+        # Marks are 2 * row at a stop, 2 * row + 1 at a wall; the grid edge
+        # is a wall at row `rows`, which also marks cells that are neither
+        rows = stops.shape[0]
+        row_numbers = np.arange(rows, dtype=np.int32)[:, None]
+        marks = np.where(stops, 2 * row_numbers,
+                         np.where(walkable, np.int32(2 * rows + 1), 2 * row_numbers + 1))
+        ahead = np.full(stops.shape, 2 * rows + 1, dtype=np.int32)
+        np.minimum.accumulate(marks[:0:-1], axis=0, out=ahead[-2::-1])
+        steps = (ahead >> 1) - row_numbers
+        return np.where(ahead & 1, 1 - steps, steps)
+    
+    def _search_jps(self, start, goal, record=None, record_push=None):
+        """
+        Jump Point Search for 4-connected grids with terrain costs
+        
+        Canonical ordering is horizontal-first: a path may always turn
+        from horizontal to vertical, but may only turn from vertical to
+        horizontal at a forced neighbor (the cell diagonally behind is
+        blocked). Inside uniform-cost regions straight runs are jumped
+        over using the precomputed jump_tables; at terrain-cost boundaries
+        (any non-base cost in the 3x3 neighborhood) cells fall back to
+        normal 4-neighbor expansion. Uses the consistent Manhattan * base
+        cost heuristic, so the result is optimal whatever heuristic_type
+        is set.
+        
+        Returns: (parents, g_scores, expanded) like _search_indexed, with
+        parents linking jump points (see _fill_jumps)
+        """
+        rows, cols = self.rows, self.cols
+        self.jump_tables  # Make sure the cached tables are built
+        down, up = self._jump_views['down'], self._jump_views['up']
+        right, left = self._jump_views['right'], self._jump_views['left']
+        region = memoryview(self._jps_region.reshape(-1))
+        mask_view, cost_view = self._mask_view, self._cost_view
+        neighbor_steps = self._neighbor_steps()
+        base = self.base_move_cost
+        goal_row, goal_col = divmod(goal, cols)
+        h = self._admissible_heuristic(goal)
+        heappush, heappop = heapq.heappush, heapq.heappop
+        
+        def jump_vertical(index, row, col, d_row):
+            distance = (down if d_row == 1 else up)[index]
+            if col == goal_col:
+                steps = (goal_row - row) * d_row
+                if 0 < steps <= abs(distance):
+                    return goal, steps
+            if distance > 0:
+                return index + distance * d_row * cols, distance
+            return None
+        
+        def jump_horizontal(index, row, col, d_col):
+            distance = (right if d_col == 1 else left)[index]
+            reach = abs(distance)
+            best = distance if distance > 0 else None
+            steps = (goal_col - col) * d_col
+            if 0 < steps <= reach and (best is None or steps < best):
+                if row == goal_row:
+                    best = steps
+                else:
+                    # The goal column is crossed: can a vertical jump reach it?
+                    vertical = (down if goal_row > row else up)[index + steps * d_col]
+                    if abs(goal_row - row) <= -vertical:
+                        best = steps
+            if best is None:
+                return None
+            return index + best * d_col, best
+        
+        cell_count = rows * cols
+        g_scores = array('d', [math.inf]) * cell_count
+        parents = array('i', [-1]) * cell_count
+        closed = bytearray(cell_count)
+        expanded = 0
+        
+        g_scores[start] = 0
+        open_heap = [(h(start), 0, start)]
+        counter = 1
+        
+        while open_heap:
+            _, _, current = heappop(open_heap)
+            if closed[current]:
+                continue
+            closed[current] = 1
+            expanded += 1
+            if record is not None:
+                record(current)
+            
+            if current == goal:
+                return parents, g_scores, expanded
+            
+            row, col = divmod(current, cols)
+            current_g = g_scores[current]
+            parent = parents[current]
+            
+            if not region[current]:
+                # Cost boundary: plain one-step expansion
+                mask = mask_view[current]
+                successors = [(current + offset, 1) for bit, offset in neighbor_steps
+                              if mask & bit]
+            else:
+                if parent == -1:
+                    jumps = [jump_horizontal(current, row, col, 1),
+                             jump_vertical(current, row, col, 1),
+                             jump_horizontal(current, row, col, -1),
+                             jump_vertical(current, row, col, -1)]
+                elif parent // cols == row:
+                    d_col = 1 if current > parent else -1
+                    jumps = [jump_horizontal(current, row, col, d_col),
+                             jump_vertical(current, row, col, 1),
+                             jump_vertical(current, row, col, -1)]
+                else:
+                    d_row = 1 if current > parent else -1
+                    jumps = [jump_vertical(current, row, col, d_row)]
+                    # Forced neighbors: the cell diagonally behind is blocked
+                    mask = mask_view[current]
+                    behind = mask_view[current - d_row * cols]
+                    if mask & RIGHT and not behind & RIGHT:
+                        jumps.append(jump_horizontal(current, row, col, 1))
+                    if mask & LEFT and not behind & LEFT:
+                        jumps.append(jump_horizontal(current, row, col, -1))
+                successors = [jump for jump in jumps if jump is not None]
+            
+            for neighbor, steps in successors:
+                if closed[neighbor]:
+                    continue
+                # Cells jumped over are uniform, so they cost base each
+                tentative_g = current_g + (steps - 1) * base + cost_view[neighbor]
+                if tentative_g < g_scores[neighbor]:
+                    g_scores[neighbor] = tentative_g
+                    parents[neighbor] = current
+                    heappush(open_heap, (tentative_g + h(neighbor), counter, neighbor))
+                    counter += 1
+                    if record_push is not None:
+                        record_push(neighbor)
+        
+        return None, g_scores, expanded
+    
+    def _fill_jumps(self, jump_points):
+        """Expand a path of jump points into every cell along the straight runs"""
+        cols = self.cols
+        path = jump_points[:1]
+        for target in jump_points[1:]:
+            current = path[-1]
+            if current // cols == target // cols:
+                step = 1 if target > current else -1
+            else:
+                step = cols if target > current else -cols
+            path.extend(range(current + step, target + step, step))
+        return path
+    
+    def _search_bidirectional(self, start, goal, record=None, record_push=None):
+        """
+        Bidirectional A* from start and goal at the same time
+        
+        Both directions use the average potential
+        p(v) = (h_goal(v) - h_start(v)) / 2 built from the consistent
+        Manhattan * base cost heuristics, so each side is a Dijkstra on
+        non-negative reduced costs. The search stops once
+        top_forward + top_backward >= mu, the best start-goal cost seen
+        through a cell touched by both sides, which makes mu optimal.
+        Each step expands the side with the smaller open list.
+        
+        Returns: (path_indices or None, cost, expanded)
+        """
+        cols = self.cols
+        mask_view, cost_view = self._mask_view, self._cost_view
+        neighbor_steps = self._neighbor_steps()
+        h_goal = self._admissible_heuristic(goal)
+        h_start = self._admissible_heuristic(start)
+        heappush, heappop = heapq.heappush, heapq.heappop
+        
+        def potential(index):
+            return (h_goal(index) - h_start(index)) / 2
+        
+        cell_count = self.rows * cols
+        g_forward = array('d', [math.inf]) * cell_count
+        g_backward = array('d', [math.inf]) * cell_count
+        parents_forward = array('i', [-1]) * cell_count
+        parents_backward = array('i', [-1]) * cell_count   # Next cell toward goal
+        closed_forward = bytearray(cell_count)
+        closed_backward = bytearray(cell_count)
+        expanded_forward = expanded_backward = meeting_updates = 0
+        
+        g_forward[start] = 0
+        g_backward[goal] = 0
+        forward_heap = [(potential(start), 0, start)]
+        backward_heap = [(-potential(goal), 0, goal)]
+        counter = 1
+        best_cost, meeting = (0, start) if start == goal else (math.inf, -1)
+        
+        # Nothing can step into an obstacle goal
+        if start != goal and not self._passable_view[goal]:
+            backward_heap = []
+        
+        while forward_heap and backward_heap:
+            if forward_heap[0][0] + backward_heap[0][0] >= best_cost:
+                break
+            
+            if len(forward_heap) <= len(backward_heap):
+                _, _, current = heappop(forward_heap)
+                if closed_forward[current]:
+                    continue
+                closed_forward[current] = 1
+                expanded_forward += 1
+                if record is not None:
+                    record(current)
+                
+                current_g = g_forward[current]
+                mask = mask_view[current]
+                for bit, offset in neighbor_steps:
+                    if not mask & bit:
+                        continue
+                    neighbor = current + offset
+                    if closed_forward[neighbor]:
+                        continue
+                    tentative_g = current_g + cost_view[neighbor]
+                    if tentative_g < g_forward[neighbor]:
+                        g_forward[neighbor] = tentative_g
+                        parents_forward[neighbor] = current
+                        heappush(forward_heap,
+                                 (tentative_g + potential(neighbor), counter, neighbor))
+                        counter += 1
+                        if record_push is not None:
+                            record_push(neighbor)
+                        through = tentative_g + g_backward[neighbor]
+                        if through < best_cost:
+                            best_cost, meeting = through, neighbor
+                            meeting_updates += 1
+            else:
+                _, _, current = heappop(backward_heap)
+                if closed_backward[current]:
+                    continue
+                closed_backward[current] = 1
+                expanded_backward += 1
+                if record is not None:
+                    record(current)
+                
+                # Every passable neighbor can step into current at its cost
+                tentative_g = g_backward[current] + cost_view[current]
+                mask = mask_view[current]
+                for bit, offset in neighbor_steps:
+                    if not mask & bit:
+                        continue
+                    neighbor = current + offset
+                    if closed_backward[neighbor]:
+                        continue
+                    if tentative_g < g_backward[neighbor]:
+                        g_backward[neighbor] = tentative_g
+                        parents_backward[neighbor] = current
+                        heappush(backward_heap,
+                                 (tentative_g - potential(neighbor), counter, neighbor))
+                        counter += 1
+                        if record_push is not None:
+                            record_push(neighbor)
+                        through = tentative_g + g_forward[neighbor]
+                        if through < best_cost:
+                            best_cost, meeting = through, neighbor
+                            meeting_updates += 1
+        
+        counting = self.trace_level != 'off'
+        if counting:
+            self.search_stats.update({
+                'expanded_forward': expanded_forward,
+                'expanded_backward': expanded_backward,
+                'meeting_updates': meeting_updates,
+            })
+        expanded = expanded_forward + expanded_backward
+        if meeting == -1:
+            return None, math.inf, expanded
+        
+        if counting:
+            self.search_stats.update({
+                'meeting_point': self.to_position(meeting),
+                'meeting_cost_forward': g_forward[meeting],
+                'meeting_cost_backward': g_backward[meeting],
+            })
+        path = self.reconstruct_indexed_path(parents_forward, meeting)
+        current = meeting
+        while parents_backward[current] != -1:
+            current = parents_backward[current]
+            path.append(current)
+        return path, best_cost, expanded
+    
+    def flow_field(self, goal):
+        """FlowField toward a goal index, cached until an edit reaches its routes"""
+        field = self._flow_fields.get(goal)
+        if field is None:
+            field = FlowField(self, goal)
+            self._flow_fields[goal] = field
+            while len(self._flow_fields) > self.FLOW_FIELD_CACHE:
+                self._flow_fields.popitem(last=False)
+        else:
+            self._flow_fields.move_to_end(goal)
+        return field
+    
+    def field_search(self, start, goal):
+        """
+        Route from start to goal read off the goal's flow field.
+        The first query toward a goal builds the field (one reverse
+        Dijkstra); later ones for any start only walk it.
+        Returns: (path, cost, explored_count) - explored_count is the
+        field build's expansions, or 0 when the field was cached
+        """
+        start, goal = tuple(start), tuple(goal)
+        goal_index = self.to_index(goal)
+        built = goal_index not in self._flow_fields
+        field = self.flow_field(goal_index)
+        explored = field.expanded if built else 0
+        self.search_stats = {'algorithm': 'flow_field', 'field_built': built,
+                             'expanded': explored}
+        self.trace = None
+        
+        start_index = self.to_index(start)
+        path_indices = field.path_from(start_index)
+        if path_indices is None:
+            return None, float('inf'), explored
+        return ([self.to_position(index) for index in path_indices],
+                self._path_cost(field.cost_from(start_index)), explored)
+    
+    def cost_breakdown(self, path_indices):
+        """Cells entered and cost paid per terrain code along a path"""
+        grid = self._grid.reshape(-1)
+        cost_view = self._cost_view
+        breakdown = {}
+        for index in path_indices[1:]:
+            entry = breakdown.setdefault(int(grid[index]), {'cells': 0, 'cost': 0.0})
+            entry['cells'] += 1
+            entry['cost'] += cost_view[index]
+        for entry in breakdown.values():
+            entry['cost'] = self._path_cost(entry['cost'])
+        return breakdown
+    
+    def k_shortest_paths(self, start, goal, k=3):
+        """
+        Up to k cheapest loopless routes, cheapest first (Yen, 1971)
+        
+        Each new route deviates from an earlier one at some "spur" cell:
+        the earlier route's prefix up to it is kept, and a spur search
+        finds the best way on that avoids the prefix and the next steps
+        already taken by routes sharing it. Lawler's refinement only
+        spurs from where a route left its parent, since earlier
+        prefixes were already tried.
+        
+        Spurs are searched lazily. A spur first enters the candidate
+        heap keyed by a lower bound: the prefix cost plus the cheapest
+        allowed first step and that cell's exact distance to the goal,
+        read off the goal's flow field. Only when that bound reaches the
+        top of the heap is the spur searched, and its real candidate
+        pushed back. Bounds can only be too low, so routes still come
+        out cheapest first, while most spurs of a long route are never
+        searched at all. A spur search is A* with the same flow field as
+        its heuristic (see _spur_search), so it rarely expands more than
+        a few cells. Candidates keep only their parent route, spur
+        position and detour; a full route is built when it is chosen.
+        Routes found and queued candidates are kept, so asking again
+        with a larger k for the same pair only continues the enumeration
+        (until the grid changes).
+        
+        Returns: list of {'path', 'cost', 'breakdown'}; breakdown maps a
+        terrain code to the cells entered and cost paid on it
+        """
+        start, goal = tuple(start), tuple(goal)
+        start_index, goal_index = self.to_index(start), self.to_index(goal)
+        field = self.flow_field(goal_index)
+        state = self._alternatives
+        resumed = state is not None and state['pair'] == (start_index, goal_index)
+        if not resumed:
+            # Heap entries: (key, counter, parent route, spur position,
+            # prefix cost, detour or None if not searched yet, blocked steps)
+            state = {'pair': (start_index, goal_index), 'found': [], 'candidates': [],
+                     'seen': set(), 'counter': 1, 'spurred': 0, 'deferred': 0,
+                     'spur_searches': 1, 'expanded': 0}
+            self._alternatives = state
+            detour, cost, expanded = self._spur_search(start_index, goal_index, set(), set())
+            state['expanded'] += expanded
+            if detour is not None:
+                state['candidates'].append((cost, 0, (), 0, 0.0, detour, None))
+        
+        found, candidates, seen = state['found'], state['candidates'], state['seen']
+        distances = field._distance_view
+        mask_view, cost_view = self._mask_view, self._cost_view
+        neighbor_steps = self._neighbor_steps()
+        while len(found) < k:
+            if found and state['spurred'] != len(found):
+                # Queue the newest route's spurs, from where it left its parent
+                _, last, deviation = found[-1]
+                state['spurred'] = len(found)
+                prefix_cost = sum(cost_view[index] for index in last[1:deviation + 1])
+                blocked_cells = set(last[:deviation])
+                sharing = [path for _, path, _ in found if path[:deviation] == last[:deviation]]
+                for position in range(deviation, len(last) - 1):
+                    spur = last[position]
+                    sharing = [path for path in sharing
+                               if len(path) > position + 1 and path[position] == spur]
+                    blocked_steps = frozenset(path[position + 1] for path in sharing)
+                    mask = mask_view[spur]
+                    bound = math.inf
+                    for bit, offset in neighbor_steps:
+                        neighbor = spur + offset
+                        if (mask & bit and neighbor not in blocked_steps
+                                and neighbor not in blocked_cells):
+                            bound = min(bound, cost_view[neighbor] + distances[neighbor])
+                    if bound < math.inf:
+                        heapq.heappush(candidates, (prefix_cost + bound, state['counter'], last,
+                                                    position, prefix_cost, None, blocked_steps))
+                        state['counter'] += 1
+                        state['deferred'] += 1
+                    blocked_cells.add(spur)
+                    prefix_cost += cost_view[last[position + 1]]
+            
+            # Cheapest candidate not already found by another spur
+            route = None
+            while candidates:
+                (cost, _, parent, position, prefix_cost,
+                 detour, blocked_steps) = heapq.heappop(candidates)
+                if detour is None:
+                    spur = parent[position]
+                    detour, spur_cost, expanded = self._spur_search(
+                        spur, goal_index, set(parent[:position]),
+                        {(spur, step) for step in blocked_steps})
+                    state['spur_searches'] += 1
+                    state['expanded'] += expanded
+                    if detour is not None:
+                        heapq.heappush(candidates, (prefix_cost + spur_cost, state['counter'],
+                                                    parent, position, prefix_cost, detour, None))
+                        state['counter'] += 1
+                    continue
+                route = parent[:position] + tuple(detour) + tuple(field.path_from(detour[-1])[1:])
+                if route not in seen:
+                    break
+                route = None
+            if route is None:
+                break
+            seen.add(route)
+            found.append((cost, route, position))
+        
+        self.search_stats = {'algorithm': 'yen', 'resumed': resumed,
+                             'spurs_queued': state['deferred'],
+                             'spur_searches': state['spur_searches'],
+                             'expanded': state['expanded']}
+        return [{'path': [self.to_position(index) for index in route],
+                 'cost': self._path_cost(cost),
+                 'breakdown': self.cost_breakdown(route)}
+                for cost, route, _ in found[:k]]
+    
+    def _spur_search(self, source, goal, blocked_cells, blocked_steps):
+        """
+        A* from source toward goal avoiding blocked_cells and blocked
+        (from, to) steps, with the goal's flow-field distances as h
+        
+        h is exact until a route meets a blocked cell, so as soon as a
+        popped cell's field route to the goal is clear, following it
+        finishes an optimal path and the search stops there.
+        Returns: (cells from source to that cell, full cost, expanded),
+        or (None, inf, expanded)
+        """
+        field = self.flow_field(goal)
+        distances = field._distance_view
+        directions, field_steps = field._direction_view, field._steps
+        mask_view, cost_view = self._mask_view, self._cost_view
+        neighbor_steps = self._neighbor_steps()
+        heappush, heappop = heapq.heappush, heapq.heappop
+        
+        clear = {goal: True}
+        if blocked_steps:
+            clear[source] = False   # Its field route may take a blocked step
+        
+        def field_route_clear(cell):
+            """Whether the field route from cell avoids blocked cells (memoized)"""
+            walked = []
+            while cell not in clear:
+                if cell in blocked_cells or not directions[cell]:
+                    clear[cell] = False
+                    break
+                walked.append(cell)
+                cell = cell + field_steps[directions[cell]]
+            verdict = clear[cell]
+            for cell in walked:
+                clear[cell] = verdict
+            return verdict
+        
+        g_scores = {source: 0.0}
+        parents = {source: -1}
+        closed = set()
+        # Ties go to the deeper cell, which walks straight down the field
+        open_heap = [(distances[source], 0.0, source)]
+        expanded = 0
+        while open_heap:
+            _, negative_g, current = heappop(open_heap)
+            if current in closed:
+                continue
+            closed.add(current)
+            expanded += 1
+            if field_route_clear(current):
+                path = [current]
+                while parents[path[-1]] != -1:
+                    path.append(parents[path[-1]])
+                path.reverse()
+                return path, -negative_g + distances[current], expanded
+            current_g = -negative_g
+            mask = mask_view[current]
+            for bit, offset in neighbor_steps:
+                if not mask & bit:
+                    continue
+                neighbor = current + offset
+                if (neighbor in closed or neighbor in blocked_cells
+                        or distances[neighbor] == math.inf
+                        or (current, neighbor) in blocked_steps):
+                    continue
+                new_g = current_g + cost_view[neighbor]
+                if new_g < g_scores.get(neighbor, math.inf):
+                    g_scores[neighbor] = new_g
+                    parents[neighbor] = current
+                    heappush(open_heap, (new_g + distances[neighbor], -new_g, neighbor))
+        return None, math.inf, expanded
+    
+    def search_anytime(self, start, goal, time_budget_ms=50.0, initial_weight=3.0,
+                       weight_step=0.5, on_improve=None):
+        """
+        Anytime Repairing A* (ARA*, Likhachev et al., 2003)
+        
+        Finds a first path fast with the heuristic inflated by
+        initial_weight, then lowers the weight by weight_step and repairs
+        the search (reusing g-values and the INCONS list) until the path
+        is provably optimal or time_budget_ms runs out. The first path is
+        always completed, even if that takes longer than the budget.
+        
+        Each improvement is recorded in search_stats['improvements'] as
+        {'cost', 'bound', 'weight', 'elapsed_ms', 'expanded'}, where bound
+        is the suboptimality factor: cost <= bound * optimal cost.
+        on_improve(path, cost, bound) is called for each one as it lands.
+        
+        Returns: (path, cost, explored_count) for the best path found
+        """
+        start, goal = tuple(start), tuple(goal)
+        began = time.perf_counter()
+        deadline = began + time_budget_ms / 1000.0
+        self.search_stats = {'algorithm': 'anytime', 'improvements': [],
+                             'bound': math.inf}
+        record = self._new_recorder()
+        start_index, goal_index = self.to_index(start), self.to_index(goal)
+        if not self.components.reachable(start_index, goal_index):
+            self.search_stats.update(expanded=0, unreachable=True)
+            self._answered_trace('unreachable')
+            return None, float('inf'), 0
+        
+        mask_view, cost_view = self._mask_view, self._cost_view
+        neighbor_steps = self._neighbor_steps()
+        h = (self._index_heuristic(goal_index) if self.heuristic_type == 'alt'
+             else self._admissible_heuristic(goal_index))
+        heappush, heappop = heapq.heappush, heapq.heappop
+        
+        cell_count = self.rows * self.cols
+        g_scores = array('d', [math.inf]) * cell_count
+        parents = array('i', [-1]) * cell_count
+        closed = bytearray(cell_count)
+        open_cells, incons = {start_index}, set()
+        
+        weight = max(1.0, initial_weight)
+        g_scores[start_index] = 0
+        open_heap = [(weight * h(start_index), 0, start_index)]
+        counter = 1
+        expanded = 0
+        best_path, best_cost = None, math.inf
+        
+        while True:
+            # ImprovePath: expand while some open key beats the goal's g
+            timed_out = False
+            while open_heap:
+                f, _, current = open_heap[0]
+                if current not in open_cells or closed[current]:
+                    heappop(open_heap)   # Stale entry
+                    continue
+                if g_scores[goal_index] <= f:
+                    break
+                if best_path is not None and expanded & 255 == 0 \
+                        and time.perf_counter() > deadline:
+                    timed_out = True
+                    break
+                heappop(open_heap)
+                open_cells.discard(current)
+                closed[current] = 1
+                expanded += 1
+                if record is not None:
+                    record(current)
+                
+                current_g = g_scores[current]
+                mask = mask_view[current]
+                for bit, offset in neighbor_steps:
+                    if not mask & bit:
+                        continue
+                    neighbor = current + offset
+                    new_g = current_g + cost_view[neighbor]
+                    if new_g < g_scores[neighbor]:
+                        g_scores[neighbor] = new_g
+                        parents[neighbor] = current
+                        if closed[neighbor]:
+                            incons.add(neighbor)
+                        else:
+                            open_cells.add(neighbor)
+                            heappush(open_heap, (new_g + weight * h(neighbor), counter, neighbor))
+                            counter += 1
+            if timed_out:
+                break
+            
+            # Publish: bound from the best f-value still pending anywhere
+            pending = [g_scores[index] + h(index) for index in open_cells | incons]
+            lower = min(pending) if pending else g_scores[goal_index]
+            bound = (min(weight, g_scores[goal_index] / lower)
+                     if lower > 0 else 1.0)
+            bound = max(bound, 1.0)
+            if g_scores[goal_index] < best_cost:
+                best_path = self.reconstruct_indexed_path(parents, goal_index)
+                best_cost = self._path_cost(g_scores[goal_index])
+                elapsed_ms = (time.perf_counter() - began) * 1000
+                self.search_stats['improvements'].append({
+                    'cost': best_cost, 'bound': bound, 'weight': weight,
+                    'elapsed_ms': elapsed_ms, 'expanded': expanded})
+                if on_improve is not None:
+                    on_improve([self.to_position(index) for index in best_path],
+                               best_cost, bound)
+            self.search_stats['bound'] = bound
+            if best_path is None or bound <= 1.0 or time.perf_counter() > deadline:
+                break
+            
+            # Tighten the weight and resume from OPEN + INCONS
+            weight = max(1.0, weight - weight_step)
+            open_cells |= incons
+            incons = set()
+            closed = bytearray(cell_count)
+            open_heap = [(g_scores[index] + weight * h(index), i, index)
+                         for i, index in enumerate(open_cells)]
+            heapq.heapify(open_heap)
+            counter = len(open_heap)
+        
+        self.search_stats['expanded'] = expanded
+        self.search_stats['weight'] = weight
+        if best_path is None:
+            return None, float('inf'), expanded
+        return [self.to_position(index) for index in best_path], best_cost, expanded
+    
+    def optimal_path(self, start, goal):
+        """
+        Cheapest path between two cell indices, whatever heuristic_type is
+        Returns: (path_indices or None, cost, expanded)
+        """
+        parents, g_scores, expanded = self._search_indexed(
+            start, goal, self._admissible_heuristic(goal))
+        if parents is None:
+            return None, math.inf, expanded
+        return (self.reconstruct_indexed_path(parents, goal),
+                self._path_cost(g_scores[goal]), expanded)
+    
+    def dijkstra(self, source, targets=None, reverse=False):
+        """
+        Dijkstra from one cell index over the terrain-cost grid
+        
+        With targets, stops as soon as every target is settled. With
+        reverse=True, costs are measured from each cell *to* source and
+        parents point at the next cell toward it.
+        
+        Returns: (costs, parents, expanded) - costs and parents are flat
+        arrays over all cells (inf / -1 where not reached)
+        """
+        mask_view, cost_view = self._mask_view, self._cost_view
+        neighbor_steps = self._neighbor_steps()
+        heappush, heappop = heapq.heappush, heapq.heappop
+        
+        cell_count = self.rows * self.cols
+        costs = array('d', [math.inf]) * cell_count
+        parents = array('i', [-1]) * cell_count
+        closed = bytearray(cell_count)
+        remaining = set(targets) if targets is not None else None
+        expanded = 0
+        
+        # Nothing can step into an obstacle, so a reverse search from one is empty
+        costs[source] = 0
+        open_heap = [] if reverse and not self._passable_view[source] else [(0, source)]
+        
+        while open_heap:
+            current_cost, current = heappop(open_heap)
+            if closed[current]:
+                continue
+            closed[current] = 1
+            expanded += 1
+            if remaining is not None:
+                remaining.discard(current)
+                if not remaining:
+                    break
+            
+            mask = mask_view[current]
+            for bit, offset in neighbor_steps:
+                if not mask & bit:
+                    continue
+                neighbor = current + offset
+                if closed[neighbor]:
+                    continue
+                new_cost = current_cost + (cost_view[current] if reverse
+                                           else cost_view[neighbor])
+                if new_cost < costs[neighbor]:
+                    costs[neighbor] = new_cost
+                    parents[neighbor] = current
+                    heappush(open_heap, (new_cost, neighbor))
+        
+        return costs, parents, expanded
+    
+    def reconstruct_path(self, came_from, current):
+        """Reconstruct path from start to goal"""
+        path = [current]
+        while current in came_from and came_from[current] is not None:
+            current = came_from[current]
+            path.append(current)
+        return path[::-1]
+    
+    def reconstruct_indexed_path(self, parents, current):
+        """Reconstruct a path of cell indices from a parents array"""
+        path = [current]
+        while parents[current] != -1:
+            current = parents[current]
+            path.append(current)
+        return path[::-1]
+    
+    def timed_search(self, start, goal):
+        """Run one search and return it as a per-query stats dict"""
+        began = time.perf_counter()
+        path, cost, explored = self.search(start, goal)
+        return {
+            'start': start,
+            'goal': goal,
+            'path': path,
+            'cost': cost,
+            'explored': explored,
+            'time_ms': (time.perf_counter() - began) * 1000,
+        }
+    
+    def search_batch(self, queries, max_workers=None, chunksize=None):
+        """
+        Answer many (start, goal) queries against this grid
+        
+        The compiled grid is copied once into a shared-memory block; each
+        worker process attaches to it in its initializer, so tasks only
+        carry the (start, goal) pair. max_workers=1 runs in-process, as
+        does any batch where worker processes are unavailable (Pyodide).
+        
+        Returns: list of per-query stats dicts, in input order
+        """
+        queries = [(tuple(start), tuple(goal)) for start, goal in queries]
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = max(1, min(max_workers, len(queries)))
+        
+        if max_workers == 1 or not _worker_processes_available():
+            return [self.timed_search(start, goal) for start, goal in queries]
+        
+        if chunksize is None:
+            chunksize = max(1, len(queries) // (max_workers * 4))
+        
+        from concurrent.futures import ProcessPoolExecutor
+        block, layout = _share_arrays(self.compiled_arrays())
+        try:
+            with ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    initializer=_batch_worker_init,
+                    initargs=(block.name, layout, dict(self._terrain_costs),
+                              self.heuristic_type, self.algorithm,
+                              self.node_budget)) as executor:
+                return list(executor.map(_batch_worker_search, queries,
+                                         chunksize=chunksize))
+        finally:
+            block.close()
+            block.unlink()
+    
+    def print_algorithm_details(self):
         """Print algorithm complexity and properties"""
         print("\n" + "="*70)
         print("A* ALGORITHM ANALYSIS")
@@ -225,6 +2745,2356 @@ class AdvancedAStarSearch:
         print("="*70 + "\n")
 
 
+def _worker_processes_available():
+    """
+    Whether process pools and shared memory can be used here. Both are
+    imported lazily: multiprocessing.shared_memory does not exist under
+    Pyodide, and main.py must still import there.
+    """
+    try:
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import shared_memory
+    except ImportError:
+        return False
+    return True
+
+
+def _share_arrays(arrays):
+    """
+    Pack named arrays into one shared-memory block
+    Returns: (block, layout) where layout is [(name, dtype, shape, offset)]
+    """
+    from multiprocessing import shared_memory
+    layout = []
+    size = 0
+    for name, values in arrays.items():
+        size = (size + 7) // 8 * 8  # Keep every array 8-byte aligned
+        layout.append((name, values.dtype.str, values.shape, size))
+        size += values.nbytes
+    
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for (name, dtype, shape, offset), values in zip(layout, arrays.values()):
+        np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset)[...] = values
+    return block, layout
+
+
+def _attach_arrays(block, layout):
+    """Read-only views over a block packed by _share_arrays"""
+    arrays = {}
+    for name, dtype, shape, offset in layout:
+        view = np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset)
+        view.flags.writeable = False
+        arrays[name] = view
+    return arrays
+
+
+# Per-process state for search_batch workers
+_batch_worker = {}
+
+
+def _batch_worker_init(block_name, layout, terrain_costs, heuristic_type, algorithm,
+                       node_budget):
+    """Attach a worker process to the shared compiled grid"""
+    from multiprocessing import shared_memory
+    block = shared_memory.SharedMemory(name=block_name)
+    _batch_worker['block'] = block  # Keep the mapping alive
+    _batch_worker['astar'] = AdvancedAStarSearch.from_compiled(
+        _attach_arrays(block, layout), heuristic_type, algorithm, terrain_costs,
+        node_budget)
+
+
+def _batch_worker_search(query):
+    """Answer one (start, goal) query inside a batch worker"""
+    start, goal = query
+    return _batch_worker['astar'].timed_search(start, goal)
+
+
+def _batch_worker_distance_rows(task):
+    """Fill some rows of a distance-matrix file inside a batch worker"""
+    matrix_path, rows, indices = task
+    matrix = np.lib.format.open_memmap(matrix_path, mode='r+')
+    expanded = fill_distance_rows(_batch_worker['astar'], matrix, rows, indices)
+    matrix.flush()
+    del matrix
+    return expanded
+
+
+def fill_distance_rows(astar, matrix, rows, indices):
+    """
+    One multi-target Dijkstra per row of matrix (an array or memmap):
+    matrix[row][j] is the cost indices[row] -> indices[j]
+    Returns: cells expanded
+    """
+    expanded = 0
+    for row in rows:
+        costs, _, source_expanded = astar.dijkstra(indices[row], targets=indices)
+        expanded += source_expanded
+        matrix[row] = [costs[index] for index in indices]
+    return expanded
+
+
+class DistanceMatrixBuilder:
+    """
+    All-pairs travel costs between points of interest
+    
+    Each source row is one Dijkstra that stops once every target is
+    settled, instead of N^2 point-to-point searches. Small inputs (fewer
+    than parallel_threshold points) are filled in-process and in memory.
+    Larger ones are spread over a process pool sharing the compiled grid
+    (as in search_batch), and workers write rows straight into a float32
+    .npy file. The file is named after the grid fingerprint and the
+    points, so it is reused (memory-mapped) until the terrain or its
+    costs change; within a process, a matrix is also kept until
+    grid_version moves on.
+    
+    Files go to cache_dir if given, where they persist across runs;
+    otherwise to a private temporary directory that close() (or leaving
+    a with block) removes.
+    """
+    
+    def __init__(self, astar, cache_dir=None, max_workers=None, parallel_threshold=64):
+        self.astar = astar
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.parallel_threshold = parallel_threshold
+        self.search_stats = {}
+        self._memo = {}   # point indices -> (grid_version, matrix)
+        self._scratch = None   # TemporaryDirectory when no cache_dir is given
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        """Forget cached matrices and remove the private temporary directory"""
+        self._memo.clear()
+        if self._scratch is not None:
+            self._scratch.cleanup()
+            self._scratch = None
+    
+    def _directory(self):
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            return self.cache_dir
+        if self._scratch is None:
+            self._scratch = tempfile.TemporaryDirectory(prefix='distances-')
+        return self._scratch.name
+    
+    def cache_path(self, indices):
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(self.astar.grid_fingerprint().encode())
+        digest.update(np.array(indices, dtype=np.int64).tobytes())
+        return os.path.join(self._directory(), f"distances-{digest.hexdigest()}.npy")
+    
+    def build(self, points):
+        """
+        Travel-cost matrix over points: matrix[i][j] is the cost i -> j
+        (inf where unreachable)
+        Returns: float32 array of shape (N, N), a read-only memmap when
+        it was computed in parallel or read from cache_dir
+        """
+        astar = self.astar
+        began = time.perf_counter()
+        indices = [astar.to_index(tuple(point)) for point in points]
+        key = tuple(indices)
+        
+        cached = self._memo.get(key)
+        if cached is not None and cached[0] == astar.grid_version:
+            self.search_stats = {'source': 'memory', 'expanded': 0,
+                                 'time_ms': (time.perf_counter() - began) * 1000}
+            return cached[1]
+        
+        count = len(indices)
+        max_workers = max(1, min(self.max_workers or os.cpu_count() or 1, count))
+        expanded = 0
+        path = None
+        if count < self.parallel_threshold and self.cache_dir is None:
+            source = 'serial'
+            matrix = np.empty((count, count), dtype=np.float32)
+            expanded = fill_distance_rows(astar, matrix, range(count), indices)
+        else:
+            path = self.cache_path(indices)
+            source = 'disk'
+            if not os.path.exists(path):
+                source = 'built'
+                workers = (max_workers if count >= self.parallel_threshold
+                           and _worker_processes_available() else 1)
+                expanded = self._compute(path, indices, workers)
+            matrix = np.load(path, mmap_mode='r')
+        self._memo[key] = (astar.grid_version, matrix)
+        self.search_stats = {'source': source, 'expanded': expanded, 'path': path,
+                             'time_ms': (time.perf_counter() - began) * 1000}
+        return matrix
+    
+    def _compute(self, path, indices, max_workers):
+        """Write the matrix for indices to path (atomically); returns cells expanded"""
+        astar = self.astar
+        count = len(indices)
+        partial = f"{path}.{os.getpid()}.tmp"
+        matrix = np.lib.format.open_memmap(partial, mode='w+', dtype=np.float32,
+                                           shape=(count, count))
+        try:
+            if max_workers == 1:
+                expanded = fill_distance_rows(astar, matrix, range(count), indices)
+                matrix.flush()
+                del matrix
+            else:
+                del matrix
+                chunk = max(1, count // (max_workers * 4))
+                tasks = [(partial, range(first, min(first + chunk, count)), indices)
+                         for first in range(0, count, chunk)]
+                from concurrent.futures import ProcessPoolExecutor
+                block, layout = _share_arrays(astar.compiled_arrays())
+                try:
+                    with ProcessPoolExecutor(
+                            max_workers=max_workers,
+                            initializer=_batch_worker_init,
+                            initargs=(block.name, layout, dict(astar._terrain_costs),
+                                      astar.heuristic_type, astar.algorithm,
+                                      astar.node_budget)) as executor:
+                        expanded = sum(executor.map(_batch_worker_distance_rows, tasks))
+                finally:
+                    block.close()
+                    block.unlink()
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return expanded
+
+
+class RoadGraph:
+    """
+    Directed road graph in compressed sparse row (CSR) form
+    
+    Node i's outgoing edges are targets[offsets[i]:offsets[i + 1]] with
+    the matching weights; coordinates[i] is its (x, y) position. Every
+    structure is a flat NumPy array, so a million-edge graph costs a few
+    tens of MB and no per-node Python objects.
+    """
+    
+    def __init__(self, coordinates, offsets, targets, weights):
+        self.coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        if len(self.offsets) != len(self.coordinates) + 1:
+            raise ValueError("offsets needs one entry per node plus one")
+        if len(self.targets) != len(self.weights) or self.offsets[-1] != len(self.targets):
+            raise ValueError("targets and weights must both hold offsets[-1] edges")
+    
+    @property
+    def node_count(self):
+        return len(self.coordinates)
+    
+    @property
+    def edge_count(self):
+        return len(self.targets)
+    
+    @classmethod
+    def from_edges(cls, coordinates, sources, targets, weights, undirected=False):
+        """Build the CSR arrays from parallel edge arrays (a counting sort)"""
+        coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        node_count = len(coordinates)
+        if not (len(sources) == len(targets) == len(weights)):
+            raise ValueError("sources, targets and weights must have the same length")
+        if len(sources) and (min(sources.min(), targets.min()) < 0
+                             or max(sources.max(), targets.max()) >= node_count):
+            raise ValueError("edge endpoints must be node ids in 0..node_count-1")
+        if len(weights) and not (weights >= 0).all():
+            raise ValueError("edge weights must be non-negative")
+        if undirected:
+            sources, targets = np.concatenate([sources, targets]), np.concatenate([targets, sources])
+            weights = np.concatenate([weights, weights])
+        
+        order = np.argsort(sources, kind='stable')
+        offsets = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=node_count), out=offsets[1:])
+        return cls(coordinates, offsets, targets[order], weights[order])
+    
+    @classmethod
+    def load_edge_list(cls, edges_path, nodes_path, undirected=False, chunk_lines=1 << 18):
+        """
+        Stream a graph from text files, chunk_lines lines at a time
+        
+        nodes_path holds "id x y" lines and edges_path "source target
+        weight" lines (whitespace separated, '#' starts a comment line).
+        Each chunk is parsed straight into NumPy arrays, so memory stays
+        at the size of the final CSR arrays.
+        """
+        node_rows = cls._read_columns(nodes_path, 3, chunk_lines)
+        node_ids = node_rows[:, 0].astype(np.int64)
+        coordinates = np.zeros((int(node_ids.max()) + 1 if len(node_ids) else 0, 2))
+        coordinates[node_ids] = node_rows[:, 1:]
+        
+        edge_rows = cls._read_columns(edges_path, 3, chunk_lines)
+        return cls.from_edges(coordinates, edge_rows[:, 0].astype(np.int64),
+                              edge_rows[:, 1].astype(np.int64), edge_rows[:, 2],
+                              undirected)
+    
+    @staticmethod
+    def _read_columns(path, columns, chunk_lines):
+        """Numeric text file -> (rows, columns) float64 array, read in chunks"""
+        chunks = []
+        with open(path) as handle:
+            while True:
+                lines = handle.readlines(chunk_lines * 32)   # Size hint in bytes
+                if not lines:
+                    break
+                text = ' '.join(line for line in lines if not line.lstrip().startswith('#'))
+                values = np.fromstring(text, dtype=np.float64, sep=' ')
+                if len(values) % columns:
+                    raise ValueError(f"{path}: every line needs {columns} values")
+                chunks.append(values.reshape(-1, columns))
+        return np.concatenate(chunks) if chunks else np.zeros((0, columns))
+    
+    @classmethod
+    def from_grid(cls, astar):
+        """The 4-connected move graph of an AdvancedAStarSearch grid"""
+        masks = astar.neighbor_masks.reshape(-1)
+        costs = astar.move_costs.reshape(-1)
+        sources, targets = [], []
+        for bit, offset in astar._neighbor_steps():
+            cells = np.flatnonzero(masks & bit)
+            sources.append(cells)
+            targets.append(cells + offset)
+        sources, targets = np.concatenate(sources), np.concatenate(targets)
+        rows, cols = np.divmod(np.arange(astar.rows * astar.cols), astar.cols)
+        return cls.from_edges(np.stack([rows, cols], axis=1), sources, targets, costs[targets])
+    
+    def nearest_node(self, x, y):
+        """Id of the node closest to (x, y)"""
+        delta = self.coordinates - (x, y)
+        return int(np.argmin((delta ** 2).sum(axis=1)))
+
+
+class GraphAStarSearch:
+    """
+    A* directly over a RoadGraph's CSR arrays
+    
+    Same core as AdvancedAStarSearch._search_indexed: flat g-score and
+    parent arrays, a heapq open list with lazy deletion, and neighbor
+    scans that are slices of targets/weights instead of grid masks. The
+    'euclidean' heuristic scales straight-line distance by the smallest
+    cost per unit of length over all edges, so it is admissible for any
+    weights; 'dijkstra' uses h = 0.
+    """
+    
+    HEURISTICS = ('euclidean', 'dijkstra')
+    
+    def __init__(self, graph, heuristic_type='euclidean'):
+        if heuristic_type not in self.HEURISTICS:
+            raise ValueError(f"Unknown heuristic {heuristic_type!r}, expected one of {self.HEURISTICS}")
+        self.graph = graph
+        self.heuristic_type = heuristic_type
+        self.search_stats = {}
+        self._offsets = memoryview(graph.offsets)
+        self._targets = memoryview(graph.targets)
+        self._weights = memoryview(graph.weights)
+        self._xs = memoryview(np.ascontiguousarray(graph.coordinates[:, 0]))
+        self._ys = memoryview(np.ascontiguousarray(graph.coordinates[:, 1]))
+        self.cost_per_unit = self._cost_per_unit()
+    
+    def _cost_per_unit(self):
+        """Smallest weight / length over edges (0 if some edge is free)"""
+        graph = self.graph
+        if not graph.edge_count:
+            return 0.0
+        sources = np.repeat(np.arange(graph.node_count), np.diff(graph.offsets))
+        lengths = np.hypot(*(graph.coordinates[graph.targets] - graph.coordinates[sources]).T)
+        moving = lengths > 0
+        if not moving.any():
+            return 0.0
+        return float((graph.weights[moving] / lengths[moving]).min())
+    
+    def _heuristic(self, goal):
+        if self.heuristic_type == 'dijkstra' or self.cost_per_unit == 0:
+            return lambda node: 0.0
+        xs, ys, scale = self._xs, self._ys, self.cost_per_unit
+        goal_x, goal_y = xs[goal], ys[goal]
+        hypot = math.hypot
+        def h(node):
+            return hypot(xs[node] - goal_x, ys[node] - goal_y) * scale
+        return h
+    
+    def search(self, start, goal):
+        """
+        Cheapest route between two node ids
+        Returns: (path as node ids, cost, explored_count)
+        """
+        offsets, targets, weights = self._offsets, self._targets, self._weights
+        h = self._heuristic(goal)
+        heappush, heappop = heapq.heappush, heapq.heappop
+        
+        node_count = self.graph.node_count
+        g_scores = array('d', [math.inf]) * node_count
+        parents = array('i', [-1]) * node_count
+        closed = bytearray(node_count)
+        expanded = 0
+        
+        g_scores[start] = 0
+        open_heap = [(h(start), 0, start)]
+        counter = 1
+        
+        while open_heap:
+            _, _, current = heappop(open_heap)
+            if closed[current]:
+                continue
+            closed[current] = 1
+            expanded += 1
+            
+            if current == goal:
+                path = [current]
+                while parents[current] != -1:
+                    current = parents[current]
+                    path.append(current)
+                self.search_stats = {'expanded': expanded}
+                return path[::-1], g_scores[goal], expanded
+            
+            current_g = g_scores[current]
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
+                if closed[neighbor]:
+                    continue
+                tentative_g = current_g + weights[edge]
+                if tentative_g < g_scores[neighbor]:
+                    g_scores[neighbor] = tentative_g
+                    parents[neighbor] = current
+                    heappush(open_heap, (tentative_g + h(neighbor), counter, neighbor))
+                    counter += 1
+        
+        self.search_stats = {'expanded': expanded}
+        return None, float('inf'), expanded
+
+
+class ContractionHierarchy:
+    """
+    Contraction hierarchy over a RoadGraph (Geisberger et al., 2008)
+    
+    Preprocessing contracts nodes one by one, least important first
+    (edge difference plus contracted neighbors, updated lazily). Removing
+    a node adds a shortcut u -> w for each in/out neighbor pair unless a
+    bounded witness search finds a path at least as cheap without it.
+    A node's rank is its contraction order. A query is a bidirectional
+    Dijkstra that only climbs to higher ranks: forward over upward
+    edges from the start, backward over upward edges into the goal.
+    Shortcuts remember the node they bypass, so paths unpack into real
+    edges.
+    """
+    
+    def __init__(self, rank, upward, downward, shortcuts, fingerprint):
+        self.rank = np.asarray(rank, dtype=np.int32)
+        # (offsets, targets, weights) CSR triples; downward holds the
+        # reversed edges that enter a node from a higher rank
+        self.upward = tuple(np.asarray(a) for a in upward)
+        self.downward = tuple(np.asarray(a) for a in downward)
+        self.shortcuts = tuple(np.asarray(a) for a in shortcuts)   # (sources, targets, middles)
+        self.fingerprint = fingerprint
+        self.search_stats = {}
+        self._middle = dict(zip(zip(self.shortcuts[0].tolist(), self.shortcuts[1].tolist()),
+                                self.shortcuts[2].tolist()))
+        self._up = tuple(memoryview(a) for a in self.upward)
+        self._down = tuple(memoryview(a) for a in self.downward)
+    
+    @staticmethod
+    def graph_fingerprint(graph):
+        digest = hashlib.blake2b(digest_size=16)
+        for values in (graph.offsets, graph.targets, graph.weights):
+            digest.update(np.ascontiguousarray(values).tobytes())
+        return digest.hexdigest()
+    
+    @classmethod
+    def build(cls, graph, settle_limit=64):
+        """
+        Contract every node of graph
+        settle_limit caps each witness search; a capped search just adds
+        the shortcut, which is always safe.
+        """
+        node_count = graph.node_count
+        out_edges = [dict() for _ in range(node_count)]
+        in_edges = [dict() for _ in range(node_count)]
+        offsets = graph.offsets.tolist()
+        targets, weights = graph.targets.tolist(), graph.weights.tolist()
+        for source in range(node_count):
+            out = out_edges[source]
+            for edge in range(offsets[source], offsets[source + 1]):
+                target, weight = targets[edge], weights[edge]
+                if target != source and weight < out.get(target, math.inf):
+                    out[target] = weight
+                    in_edges[target][source] = weight
+        
+        contracted = bytearray(node_count)
+        deleted_neighbors = [0] * node_count
+        middle = {}
+        
+        def witness_costs(source, skip, limit):
+            """Bounded Dijkstra from source over remaining nodes except skip"""
+            costs = {source: 0.0}
+            heap = [(0.0, source)]
+            settled = 0
+            while heap and settled < settle_limit:
+                cost, node = heapq.heappop(heap)
+                if cost > costs[node]:
+                    continue
+                if cost > limit:
+                    break
+                settled += 1
+                for neighbor, weight in out_edges[node].items():
+                    if neighbor == skip or contracted[neighbor]:
+                        continue
+                    new_cost = cost + weight
+                    if new_cost < costs.get(neighbor, math.inf):
+                        costs[neighbor] = new_cost
+                        heapq.heappush(heap, (new_cost, neighbor))
+            return costs
+        
+        def contract(node, commit):
+            """Shortcuts needed to remove node (added if commit)"""
+            ins = [(u, w) for u, w in in_edges[node].items() if not contracted[u]]
+            outs = [(x, w) for x, w in out_edges[node].items() if not contracted[x]]
+            needed = 0
+            for u, in_weight in ins:
+                via = {x: in_weight + out_weight for x, out_weight in outs if x != u}
+                if not via:
+                    continue
+                costs = witness_costs(u, node, max(via.values()))
+                for x, through in via.items():
+                    if costs.get(x, math.inf) <= through:
+                        continue
+                    needed += 1
+                    if commit and through < out_edges[u].get(x, math.inf):
+                        out_edges[u][x] = through
+                        in_edges[x][u] = through
+                        middle[(u, x)] = node
+            return needed, len(ins) + len(outs)
+        
+        def priority(node):
+            needed, removed = contract(node, commit=False)
+            return needed - removed + deleted_neighbors[node]
+        
+        queue = [(priority(node), node) for node in range(node_count)]
+        heapq.heapify(queue)
+        rank = np.zeros(node_count, dtype=np.int32)
+        next_rank = 0
+        while queue:
+            _, node = heapq.heappop(queue)
+            # Lazy update: re-queue if it is no longer the least important
+            current = priority(node)
+            if queue and current > queue[0][0]:
+                heapq.heappush(queue, (current, node))
+                continue
+            contract(node, commit=True)
+            contracted[node] = 1
+            rank[node] = next_rank
+            next_rank += 1
+            for neighbor in set(in_edges[node]) | set(out_edges[node]):
+                deleted_neighbors[neighbor] += 1
+        
+        up_sources, up_targets, up_weights = [], [], []
+        down_sources, down_targets, down_weights = [], [], []
+        for source in range(node_count):
+            for target, weight in out_edges[source].items():
+                if rank[target] > rank[source]:
+                    up_sources.append(source)
+                    up_targets.append(target)
+                    up_weights.append(weight)
+                else:
+                    down_sources.append(target)   # Reversed: climb from target
+                    down_targets.append(source)
+                    down_weights.append(weight)
+        
+        def csr(sources, targets, weights):
+            built = RoadGraph.from_edges(np.zeros((node_count, 2)), sources, targets, weights)
+            return built.offsets, built.targets, built.weights
+        
+        pairs = list(middle.items())
+        shortcuts = (np.array([u for (u, _), _ in pairs], dtype=np.int64),
+                     np.array([x for (_, x), _ in pairs], dtype=np.int64),
+                     np.array([m for _, m in pairs], dtype=np.int64))
+        return cls(rank, csr(up_sources, up_targets, up_weights),
+                   csr(down_sources, down_targets, down_weights),
+                   shortcuts, cls.graph_fingerprint(graph))
+    
+    def save(self, path):
+        np.savez(path, rank=self.rank,
+                 up_offsets=self.upward[0], up_targets=self.upward[1], up_weights=self.upward[2],
+                 down_offsets=self.downward[0], down_targets=self.downward[1],
+                 down_weights=self.downward[2],
+                 shortcut_sources=self.shortcuts[0], shortcut_targets=self.shortcuts[1],
+                 shortcut_middles=self.shortcuts[2], fingerprint=np.array(self.fingerprint))
+    
+    @classmethod
+    def load(cls, path, graph=None):
+        """Load a saved hierarchy; with graph, check it was built for it"""
+        with np.load(path, allow_pickle=False) as data:
+            hierarchy = cls(
+                data['rank'],
+                (data['up_offsets'], data['up_targets'], data['up_weights']),
+                (data['down_offsets'], data['down_targets'], data['down_weights']),
+                (data['shortcut_sources'], data['shortcut_targets'], data['shortcut_middles']),
+                str(data['fingerprint']))
+        if graph is not None and hierarchy.fingerprint != cls.graph_fingerprint(graph):
+            raise ValueError(f"Contraction hierarchy in {path} was built for a different graph")
+        return hierarchy
+    
+    def _unpack(self, source, target):
+        """Real edges behind the (possibly shortcut) edge source -> target"""
+        nodes = [source]
+        stack = [(source, target)]
+        middle = self._middle
+        while stack:
+            u, x = stack.pop()
+            m = middle.get((u, x))
+            if m is None:
+                nodes.append(x)
+            else:
+                stack.append((m, x))
+                stack.append((u, m))
+        return nodes
+    
+    def search(self, start, goal):
+        """
+        Cheapest route between two node ids
+        Returns: (path as node ids, cost, explored_count)
+        """
+        heappush, heappop = heapq.heappush, heapq.heappop
+        sides = (
+            ({start: 0.0}, {start: -1}, [(0.0, start)], self._up),
+            ({goal: 0.0}, {goal: -1}, [(0.0, goal)], self._down),
+        )
+        best, meeting = (0.0, start) if start == goal else (math.inf, -1)
+        settled = 0
+        
+        # Alternate sides; a side stops once its top cannot beat best
+        while True:
+            active = [side for side in sides if side[2] and side[2][0][0] < best]
+            if not active:
+                break
+            for costs, parents, heap, (offsets, targets, weights) in active:
+                if not heap:
+                    continue
+                cost, node = heappop(heap)
+                if cost > costs[node]:
+                    continue
+                settled += 1
+                other = sides[1] if costs is sides[0][0] else sides[0]
+                through = cost + other[0].get(node, math.inf)
+                if through < best:
+                    best, meeting = through, node
+                for edge in range(offsets[node], offsets[node + 1]):
+                    neighbor = targets[edge]
+                    new_cost = cost + weights[edge]
+                    if new_cost < costs.get(neighbor, math.inf):
+                        costs[neighbor] = new_cost
+                        parents[neighbor] = node
+                        heappush(heap, (new_cost, neighbor))
+        
+        self.search_stats = {'expanded': settled, 'meeting_node': meeting}
+        if meeting == -1:
+            return None, float('inf'), settled
+        
+        # Upward chain start..meeting, then meeting..goal down the other side
+        chain = [meeting]
+        while sides[0][1][chain[-1]] != -1:
+            chain.append(sides[0][1][chain[-1]])
+        chain.reverse()
+        node = meeting
+        while sides[1][1][node] != -1:
+            node = sides[1][1][node]
+            chain.append(node)
+        path = [start]
+        for u, x in zip(chain, chain[1:]):
+            path.extend(self._unpack(u, x)[1:])
+        return path, best, settled
+
+
+class HierarchicalPathPlanner:
+    """
+    Hierarchical Path-Finding A* (HPA*) on an AdvancedAStarSearch grid
+    
+    The map is cut into cluster_size x cluster_size clusters. Entrances
+    sit on every open stretch of a shared cluster border (one in the
+    middle of a short stretch, one at each end of a long one), and the
+    cost between every pair of entrances inside a cluster is computed
+    once. A query links start and goal into this abstract graph, runs A*
+    over it, then refines only the clusters on the chosen route. Paths
+    are exact inside clusters and near-optimal overall.
+    
+    The shortest-path tree behind each entrance's intra-cluster costs is
+    kept as a compact array of local parent offsets, so refining a leg
+    is a walk up that tree rather than another Dijkstra. Query legs to
+    and from start and goal reuse the trees built to link them in.
+    
+    The abstraction can be saved with save() and restored with load();
+    update_cell() rebuilds only the clusters a terrain change touches.
+    """
+    
+    LONG_ENTRANCE = 6   # Open stretches this wide get an entrance at each end
+    
+    def __init__(self, astar, cluster_size=16, build=True):
+        self.astar = astar
+        self.cluster_size = cluster_size
+        self.cluster_rows = -(-astar.rows // cluster_size)
+        self.cluster_cols = -(-astar.cols // cluster_size)
+        self.transitions = {}                 # (cluster, cluster) -> [(cell, cell)]
+        self.entrances = defaultdict(set)     # cluster -> entrance cells
+        self.inter_edges = defaultdict(dict)  # cell -> {cell across border: cost}
+        self.intra_edges = {}                 # cluster -> {cell: [(cell, cost)]}
+        self.intra_trees = {}                 # cluster -> {entrance: local parents}
+        self._adjacency = {}                  # cell -> [(cell, cost)], intra + inter
+        self._stale = set()                   # Cells whose adjacency needs a refresh
+        self.search_stats = {}
+        if build:
+            self.build()
+    
+    # ---------------------------------------------------------------- layout
+    
+    def cluster_of(self, index):
+        """Cluster id of a flat cell index"""
+        row, col = divmod(index, self.astar.cols)
+        size = self.cluster_size
+        return (row // size) * self.cluster_cols + col // size
+    
+    def cluster_bounds(self, cluster):
+        """(row_start, row_end, col_start, col_end) of a cluster, ends exclusive"""
+        cluster_row, cluster_col = divmod(cluster, self.cluster_cols)
+        size = self.cluster_size
+        row_start, col_start = cluster_row * size, cluster_col * size
+        return (row_start, min(row_start + size, self.astar.rows),
+                col_start, min(col_start + size, self.astar.cols))
+    
+    def _borders_of(self, cluster):
+        """Border keys (lower cluster, higher cluster) around a cluster"""
+        cluster_row, cluster_col = divmod(cluster, self.cluster_cols)
+        borders = []
+        if cluster_col > 0:
+            borders.append((cluster - 1, cluster))
+        if cluster_col < self.cluster_cols - 1:
+            borders.append((cluster, cluster + 1))
+        if cluster_row > 0:
+            borders.append((cluster - self.cluster_cols, cluster))
+        if cluster_row < self.cluster_rows - 1:
+            borders.append((cluster, cluster + self.cluster_cols))
+        return borders
+    
+    def _find_transitions(self, border):
+        """Entrance cell pairs across one border, from its open stretches"""
+        first, second = border
+        cols = self.astar.cols
+        passable = self.astar._passable_view
+        row_start, row_end, col_start, col_end = self.cluster_bounds(first)
+        if first // self.cluster_cols == second // self.cluster_cols:  # Border to the right
+            pairs = [(row * cols + col_end - 1, row * cols + col_end)
+                     for row in range(row_start, row_end)]
+        else:  # Border below
+            pairs = [((row_end - 1) * cols + col, row_end * cols + col)
+                     for col in range(col_start, col_end)]
+        
+        transitions = []
+        stretch = []
+        for pair in pairs + [None]:
+            if pair is not None and passable[pair[0]] and passable[pair[1]]:
+                stretch.append(pair)
+                continue
+            if len(stretch) >= self.LONG_ENTRANCE:
+                transitions += [stretch[0], stretch[-1]]
+            elif stretch:
+                transitions.append(stretch[len(stretch) // 2])
+            stretch = []
+        return transitions
+    
+    def _set_transitions(self, border, transitions):
+        """Replace a border's transitions and their inter-cluster edges"""
+        cost_view = self.astar._cost_view
+        for a, b in self.transitions.get(border, ()):
+            self.inter_edges[a].pop(b, None)
+            self.inter_edges[b].pop(a, None)
+            self._stale.update((a, b))
+        self.transitions[border] = transitions
+        for a, b in transitions:
+            self.inter_edges[a][b] = cost_view[b]
+            self.inter_edges[b][a] = cost_view[a]
+            self._stale.update((a, b))
+    
+    def _refresh_entrances(self, cluster):
+        """Recollect a cluster's entrance cells from its borders"""
+        cells = set()
+        for border in self._borders_of(cluster):
+            for pair in self.transitions.get(border, ()):
+                cells.update(cell for cell in pair if self.cluster_of(cell) == cluster)
+        self.entrances[cluster] = cells
+    
+    # ---------------------------------------------------------------- building
+    
+    def _cluster_dijkstra(self, cluster, source, reverse=False, target=None):
+        """
+        Dijkstra confined to one cluster
+        reverse=True measures the cost from each cell *to* source.
+        Returns: (costs, parents, expansions) as dicts keyed by cell
+        """
+        cols = self.astar.cols
+        mask_view, cost_view = self.astar._mask_view, self.astar._cost_view
+        neighbor_steps = self.astar._neighbor_steps()
+        row_start, row_end, col_start, col_end = self.cluster_bounds(cluster)
+        heappush, heappop = heapq.heappush, heapq.heappop
+        
+        costs = {source: 0}
+        parents = {source: None}
+        closed = set()
+        open_heap = [(0, source)]
+        while open_heap:
+            current_cost, current = heappop(open_heap)
+            if current in closed:
+                continue
+            closed.add(current)
+            if current == target:
+                break
+            
+            mask = mask_view[current]
+            for bit, offset in neighbor_steps:
+                if not mask & bit:
+                    continue
+                neighbor = current + offset
+                row, col = divmod(neighbor, cols)
+                if not (row_start <= row < row_end and col_start <= col < col_end):
+                    continue
+                if neighbor in closed:
+                    continue
+                step = cost_view[current] if reverse else cost_view[neighbor]
+                new_cost = current_cost + step
+                if new_cost < costs.get(neighbor, math.inf):
+                    costs[neighbor] = new_cost
+                    parents[neighbor] = current
+                    heappush(open_heap, (new_cost, neighbor))
+        
+        return costs, parents, len(closed)
+    
+    def _build_cluster(self, cluster):
+        """Precompute entrance-to-entrance costs (and their trees) in one cluster"""
+        entrances = self.entrances[cluster]
+        edges = {}
+        trees = {}
+        for entrance in entrances:
+            costs, parents, _ = self._cluster_dijkstra(cluster, entrance)
+            edges[entrance] = [(other, costs[other]) for other in entrances
+                               if other != entrance and other in costs]
+            trees[entrance] = self._pack_tree(cluster, parents)
+        self._stale.update(self.intra_edges.get(cluster, ()))
+        self._stale.update(entrances)
+        self.intra_edges[cluster] = edges
+        self.intra_trees[cluster] = trees
+    
+    def _local(self, cluster):
+        """(row_start, col_start, width) for local offsets inside a cluster"""
+        row_start, _, col_start, col_end = self.cluster_bounds(cluster)
+        return row_start, col_start, col_end - col_start
+    
+    def _pack_tree(self, cluster, parents):
+        """Parents dict of a cluster Dijkstra -> array of local parent offsets"""
+        row_start, col_start, width = self._local(cluster)
+        cols = self.astar.cols
+        typecode = 'h' if self.cluster_size ** 2 < 2 ** 15 else 'i'
+        tree = array(typecode, [-1]) * (self.cluster_size * width)
+        for cell, parent in parents.items():
+            if parent is not None:
+                row, col = divmod(cell, cols)
+                parent_row, parent_col = divmod(parent, cols)
+                tree[(row - row_start) * width + col - col_start] = (
+                    (parent_row - row_start) * width + parent_col - col_start)
+        return tree
+    
+    def _tree_leg(self, cluster, tree, source, target):
+        """Cells after source up to target, walking a packed tree back from target"""
+        row_start, col_start, width = self._local(cluster)
+        cols = self.astar.cols
+        base = row_start * cols + col_start
+        row, col = divmod(target - base, cols)
+        local = row * width + col
+        row, col = divmod(source - base, cols)
+        source_local = row * width + col
+        leg = []
+        while local != source_local:
+            row, col = divmod(local, width)
+            leg.append(base + row * cols + col)
+            local = tree[local]
+        leg.reverse()
+        return leg
+    
+    def _refine_leg(self, a, b, forward_trees, reverse_trees):
+        """
+        Cells after a up to b inside one cluster, from whichever tree
+        priced the abstract edge a -> b (a Dijkstra only if none is kept)
+        Returns: (cells, expansions)
+        """
+        cluster = self.cluster_of(a)
+        if a in forward_trees:
+            parents = forward_trees[a]
+            leg = [b]
+            while parents[leg[-1]] != a:
+                leg.append(parents[leg[-1]])
+            return leg[::-1], 0
+        if b in reverse_trees:
+            toward = reverse_trees[b]
+            leg = [a]
+            while leg[-1] != b:
+                leg.append(toward[leg[-1]])
+            return leg[1:], 0
+        trees = self.intra_trees.setdefault(cluster, {})
+        expansions = 0
+        if a not in trees:
+            # Abstractions restored by load() build trees on first use
+            _, parents, expansions = self._cluster_dijkstra(cluster, a)
+            trees[a] = self._pack_tree(cluster, parents)
+        return self._tree_leg(cluster, trees[a], a, b), expansions
+    
+    def build(self):
+        """Build the whole abstraction: transitions, entrances, intra edges"""
+        cluster_count = self.cluster_rows * self.cluster_cols
+        for cluster in range(cluster_count):
+            for border in self._borders_of(cluster):
+                if border[0] == cluster:
+                    self._set_transitions(border, self._find_transitions(border))
+        for cluster in range(cluster_count):
+            self._refresh_entrances(cluster)
+            self._build_cluster(cluster)
+    
+    def update_cell(self, position, terrain):
+        """
+        Change one cell's terrain and rebuild only the affected clusters
+        Returns: sorted list of rebuilt cluster ids
+        """
+        self.astar.set_cell(position, terrain)
+        cluster = self.cluster_of(self.astar.to_index(position))
+        dirty = {cluster}
+        for border in self._borders_of(cluster):
+            transitions = self._find_transitions(border)
+            if transitions != self.transitions.get(border):
+                self._set_transitions(border, transitions)
+                dirty.update(border)
+            else:
+                # Same entrances, but the cost of stepping across may change
+                self._set_transitions(border, transitions)
+        for dirty_cluster in dirty:
+            self._refresh_entrances(dirty_cluster)
+            self._build_cluster(dirty_cluster)
+        return sorted(dirty)
+    
+    # ---------------------------------------------------------------- persistence
+    
+    def save(self, path):
+        """Write the abstraction to an .npz file for offline builds"""
+        pairs = [pair for transitions in self.transitions.values() for pair in transitions]
+        intra = [(a, b, cost) for edges in self.intra_edges.values()
+                 for a, targets in edges.items() for b, cost in targets]
+        np.savez_compressed(
+            path,
+            meta=np.array([self.cluster_size, self.astar.rows, self.astar.cols]),
+            fingerprint=np.array(self.astar.grid_fingerprint()),
+            transitions=np.array(pairs, dtype=np.int32).reshape(-1, 2),
+            intra=np.array([(a, b) for a, b, _ in intra], dtype=np.int32).reshape(-1, 2),
+            intra_cost=np.array([cost for _, _, cost in intra], dtype=np.float64),
+        )
+    
+    @classmethod
+    def load(cls, path, astar):
+        """Restore an abstraction saved by save() for the same grid"""
+        with np.load(path, allow_pickle=False) as data:
+            cluster_size, rows, cols = (int(value) for value in data['meta'])
+            if (rows, cols) != (astar.rows, astar.cols):
+                raise ValueError(f"Abstraction is for a {rows}x{cols} grid, "
+                                 f"not {astar.rows}x{astar.cols}")
+            if str(data['fingerprint']) != astar.grid_fingerprint():
+                raise ValueError("Abstraction was built for different terrain")
+            transitions = data['transitions'].tolist()
+            intra = data['intra'].tolist()
+            intra_cost = data['intra_cost'].tolist()
+        
+        planner = cls(astar, cluster_size, build=False)
+        borders = defaultdict(list)
+        for a, b in transitions:
+            borders[(planner.cluster_of(a), planner.cluster_of(b))].append((a, b))
+        for border, pairs in borders.items():
+            planner._set_transitions(border, pairs)
+        
+        for cluster in range(planner.cluster_rows * planner.cluster_cols):
+            planner._refresh_entrances(cluster)
+            planner.intra_edges[cluster] = {entrance: []
+                                            for entrance in planner.entrances[cluster]}
+        for (a, b), cost in zip(intra, intra_cost):
+            planner.intra_edges[planner.cluster_of(a)][a].append((b, cost))
+        for edges in planner.intra_edges.values():
+            planner._stale.update(edges)
+        return planner
+    
+    # ---------------------------------------------------------------- queries
+    
+    def search(self, start, goal):
+        """
+        Hierarchical query
+        Returns: (path, cost, explored_count)
+        """
+        astar = self.astar
+        source, target = astar.to_index(start), astar.to_index(goal)
+        self.search_stats = {}
+        if source == target:
+            return [start], 0, 0
+        
+        cost_view = astar._cost_view
+        target_cluster = self.cluster_of(target)
+        
+        # Link start and goal into the abstract graph for this query only.
+        # Cells just across a border are linked too, since the start or
+        # goal need not be an entrance.
+        explored = 0
+        query_edges = defaultdict(list)
+        forward_trees, reverse_trees = {}, {}
+        for node in [source] + self._cross_border_neighbors(source):
+            cluster = self.cluster_of(node)
+            costs, forward_trees[node], expansions = self._cluster_dijkstra(cluster, node)
+            explored += expansions
+            if node != source:
+                query_edges[source].append((node, cost_view[node]))
+            query_edges[node].extend((entrance, costs[entrance])
+                                     for entrance in self.entrances[cluster]
+                                     if entrance in costs and entrance != node)
+            if cluster == target_cluster and target in costs:
+                query_edges[node].append((target, costs[target]))
+        
+        if astar._passable_view[target]:
+            for node in [target] + self._cross_border_neighbors(target):
+                cluster = self.cluster_of(node)
+                costs, reverse_trees[node], expansions = self._cluster_dijkstra(
+                    cluster, node, reverse=True)
+                explored += expansions
+                if node != target:
+                    query_edges[node].append((target, cost_view[target]))
+                for entrance in self.entrances[cluster]:
+                    if entrance in costs and entrance != node:
+                        query_edges[entrance].append((node, costs[entrance]))
+        
+        abstract_path, abstract_explored = self._abstract_search(
+            source, target, query_edges)
+        explored += abstract_explored
+        self.search_stats['abstract_expanded'] = abstract_explored
+        if abstract_path is None:
+            return None, float('inf'), explored
+        
+        # Refine only the clusters the abstract route passes through
+        path = [source]
+        refined = set()
+        for a, b in zip(abstract_path, abstract_path[1:]):
+            cluster = self.cluster_of(a)
+            if cluster != self.cluster_of(b):
+                path.append(b)   # Adjacent cells across a border
+                continue
+            leg, leg_explored = self._refine_leg(a, b, forward_trees, reverse_trees)
+            explored += leg_explored
+            refined.add(cluster)
+            path.extend(leg)
+        
+        self.search_stats.update({
+            'abstract_path_length': len(abstract_path),
+            'clusters_refined': len(refined),
+            'expanded': explored,
+        })
+        cost = astar._path_cost(sum(cost_view[index] for index in path[1:]))
+        return [astar.to_position(index) for index in path], cost, explored
+    
+    def _cross_border_neighbors(self, index):
+        """Passable neighbors of a cell that lie in a different cluster"""
+        cluster = self.cluster_of(index)
+        mask = self.astar._mask_view[index]
+        return [index + offset for bit, offset in self.astar._neighbor_steps()
+                if mask & bit and self.cluster_of(index + offset) != cluster]
+    
+    def _refresh_adjacency(self):
+        """Merge intra- and inter-cluster edges of cells changed since last time"""
+        adjacency, intra_edges, inter_edges = self._adjacency, self.intra_edges, self.inter_edges
+        for cell in self._stale:
+            edges = list(intra_edges.get(self.cluster_of(cell), {}).get(cell, ()))
+            edges.extend(inter_edges.get(cell, {}).items())
+            if edges:
+                adjacency[cell] = edges
+            else:
+                adjacency.pop(cell, None)
+        self._stale.clear()
+    
+    def _abstract_search(self, source, target, query_edges):
+        """A* over entrance cells; returns (abstract path or None, expansions)"""
+        if self._stale:
+            self._refresh_adjacency()
+        adjacency = self._adjacency
+        h = self.astar._admissible_heuristic(target)
+        heappush, heappop = heapq.heappush, heapq.heappop
+        costs = {source: 0}
+        parents = {source: None}
+        closed = set()
+        open_heap = [(h(source), 0, source)]
+        counter = 1
+        
+        while open_heap:
+            _, _, current = heappop(open_heap)
+            if current in closed:
+                continue
+            closed.add(current)
+            if current == target:
+                path = [current]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                return path[::-1], len(closed)
+            
+            edges = adjacency.get(current, ())
+            if current in query_edges:
+                edges = list(edges) + query_edges[current]
+            
+            current_cost = costs[current]
+            for neighbor, edge_cost in edges:
+                if neighbor in closed:
+                    continue
+                new_cost = current_cost + edge_cost
+                if new_cost < costs.get(neighbor, math.inf):
+                    costs[neighbor] = new_cost
+                    parents[neighbor] = current
+                    heappush(open_heap, (new_cost + h(neighbor), counter, neighbor))
+                    counter += 1
+        
+        return None, len(closed)
+
+
+class DStarLitePlanner:
+    """
+    D* Lite incremental replanner (Koenig & Likhachev, 2002)
+    
+    Searches backward from the goal once, then keeps g/rhs values and the
+    priority queue between calls. As the van moves (move_to) and cells
+    change (update_cell), only the vertices whose costs actually changed
+    are re-expanded, so re-plan cost follows the affected area instead of
+    the whole map. Edge u -> v costs the move cost of entering v, as in
+    AdvancedAStarSearch, whose compiled grid the planner shares.
+    """
+    
+    def __init__(self, astar, start, goal):
+        self.astar = astar
+        self.start = astar.to_index(start)
+        self.goal = astar.to_index(goal)
+        self.last = self.start
+        self.km = 0.0
+        
+        # Cheapest possible step, so h stays admissible after cell updates
+        finite = astar._cost_lut[np.isfinite(astar._cost_lut)]
+        self.base = float(finite.min()) if finite.size else 1.0
+        
+        cell_count = astar.rows * astar.cols
+        self.g = array('d', [math.inf]) * cell_count
+        self.rhs = array('d', [math.inf]) * cell_count
+        self.rhs[self.goal] = 0
+        self.open_keys = {}   # cell -> key of its live heap entry
+        self.open_heap = []
+        self.total_expanded = 0
+        self.replans = 0
+        self.search_stats = {}
+        self._push(self.goal)
+    
+    def heuristic(self, index):
+        """Consistent Manhattan * base estimate from the start to a cell"""
+        cols = self.astar.cols
+        row, col = divmod(index, cols)
+        start_row, start_col = divmod(self.start, cols)
+        return (abs(row - start_row) + abs(col - start_col)) * self.base
+    
+    def calculate_key(self, index):
+        best = min(self.g[index], self.rhs[index])
+        return (best + self.heuristic(index) + self.km, best)
+    
+    def _push(self, index):
+        key = self.calculate_key(index)
+        self.open_keys[index] = key
+        heapq.heappush(self.open_heap, (key, index))
+    
+    def _neighbors(self, index):
+        """Passable neighbors: successors of index, and its predecessors"""
+        mask = self.astar._mask_view[index]
+        return [index + offset for bit, offset in self.astar._neighbor_steps()
+                if mask & bit]
+    
+    def _predecessors(self, index):
+        """
+        Cells with an edge into index: its passable neighbors, plus the
+        start when the van sits on a blocked cell next to it (it may
+        still step off, as in FlowField._entry)
+        """
+        predecessors = self._neighbors(index)
+        start, cols = self.start, self.astar.cols
+        if start != index and not self.astar._passable_view[start]:
+            # Adjacent, whether or not index is passable: once index is
+            # blocked too, the start's edge into it still needs repairing
+            (row, col), (start_row, start_col) = divmod(index, cols), divmod(start, cols)
+            if abs(row - start_row) + abs(col - start_col) == 1:
+                predecessors.append(start)
+        return predecessors
+    
+    def _best_successor_cost(self, index):
+        """min over successors s of c(index, s) + g(s)"""
+        cost_view, g = self.astar._cost_view, self.g
+        return min((cost_view[neighbor] + g[neighbor]
+                    for neighbor in self._neighbors(index)), default=math.inf)
+    
+    def _update_vertex(self, index):
+        if self.g[index] != self.rhs[index]:
+            self._push(index)
+        else:
+            self.open_keys.pop(index, None)
+    
+    def _top(self):
+        """Smallest live (key, cell) in the queue, dropping stale entries"""
+        open_heap, open_keys = self.open_heap, self.open_keys
+        while open_heap:
+            key, index = open_heap[0]
+            if open_keys.get(index) == key:
+                return key, index
+            heapq.heappop(open_heap)
+        return None, None
+    
+    def compute_shortest_path(self):
+        """Expand inconsistent cells until the start is consistent"""
+        g, rhs = self.g, self.rhs
+        cost_view = self.astar._cost_view
+        start, goal = self.start, self.goal
+        expanded = 0
+        
+        while True:
+            key, current = self._top()
+            if key is None:
+                break
+            if not (key < self.calculate_key(start) or rhs[start] > g[start]):
+                break
+            
+            new_key = self.calculate_key(current)
+            if key < new_key:
+                self._push(current)
+                continue
+            
+            heapq.heappop(self.open_heap)
+            del self.open_keys[current]
+            expanded += 1
+            entering_cost = cost_view[current]
+            
+            if g[current] > rhs[current]:
+                # Overconsistent: settle it and improve its predecessors
+                g[current] = rhs[current]
+                for predecessor in self._predecessors(current):
+                    if predecessor != goal:
+                        rhs[predecessor] = min(rhs[predecessor], entering_cost + g[current])
+                    self._update_vertex(predecessor)
+            else:
+                # Underconsistent: reset it and repair whoever relied on it
+                old_g = g[current]
+                g[current] = math.inf
+                for cell in self._predecessors(current) + [current]:
+                    if cell != goal and (cell == current or
+                                         rhs[cell] == entering_cost + old_g):
+                        rhs[cell] = self._best_successor_cost(cell)
+                    self._update_vertex(cell)
+        
+        self.total_expanded += expanded
+        return expanded
+    
+    def move_to(self, position):
+        """The van has moved; later keys account for it through km"""
+        self.start = self.astar.to_index(position)
+        if not self.astar._passable_view[self.start] and self.start != self.goal:
+            self.rhs[self.start] = self._best_successor_cost(self.start)
+            self._update_vertex(self.start)
+    
+    def update_cell(self, position, terrain):
+        """Change one cell's terrain and repair the affected g/rhs values"""
+        self.update_cells([(position, terrain)])
+    
+    def update_cells(self, changes):
+        """Apply [(position, terrain)] changes, as seen from the current start"""
+        astar = self.astar
+        g, rhs = self.g, self.rhs
+        cost_view = astar._cost_view
+        self.km += self.heuristic(self.last)
+        self.last = self.start
+        
+        for position, terrain in changes:
+            cell = astar.to_index(position)
+            old_cost = cost_view[cell]
+            was_passable = astar._passable_view[cell]
+            astar.set_cell(position, terrain)
+            new_cost = cost_view[cell]
+            
+            # Every passable neighbor has an edge into this cell
+            for neighbor in self._predecessors(cell):
+                if neighbor == self.goal:
+                    continue
+                if old_cost > new_cost:
+                    rhs[neighbor] = min(rhs[neighbor], new_cost + g[cell])
+                elif rhs[neighbor] == old_cost + g[cell]:
+                    rhs[neighbor] = self._best_successor_cost(neighbor)
+                self._update_vertex(neighbor)
+            
+            # A cell that just opened up can now be left, too
+            if not was_passable and astar._passable_view[cell] and cell != self.goal:
+                rhs[cell] = self._best_successor_cost(cell)
+                self._update_vertex(cell)
+    
+    def plan(self):
+        """
+        Repair the search and read off the current best route
+        Returns: (path, cost, explored_count) from the current start
+        """
+        expanded = self.compute_shortest_path()
+        self.replans += 1
+        self.search_stats = {
+            'expanded': expanded,
+            'total_expanded': self.total_expanded,
+            'replans': self.replans,
+            'queue_size': len(self.open_keys),
+        }
+        astar = self.astar
+        if self.rhs[self.start] == math.inf:
+            return None, float('inf'), expanded
+        
+        # Follow the cheapest successor; g strictly drops toward the goal
+        cost_view, g = astar._cost_view, self.g
+        path = [self.start]
+        cost = 0
+        current = self.start
+        while current != self.goal:
+            current = min(self._neighbors(current),
+                          key=lambda neighbor: cost_view[neighbor] + g[neighbor])
+            cost += cost_view[current]
+            path.append(current)
+        return [astar.to_position(index) for index in path], astar._path_cost(cost), expanded
+
+
+class MultiStopRoutePlanner:
+    """
+    Multi-stop delivery routing on top of AdvancedAStarSearch
+    
+    1. One multi-target Dijkstra per point gives the exact (asymmetric)
+       travel-cost matrix between the depot and every stop, through a
+       DistanceMatrixBuilder (parallel and file-backed for many stops).
+    2. A nearest-neighbor tour seeds the visiting order.
+    3. 2-opt (segment reversal) and Or-opt (moving runs of 1-3 stops)
+       improve it until no move helps; both use O(1) cost deltas.
+    4. Legs are searched once more with an admissible A* and stitched.
+    """
+    
+    def __init__(self, astar, matrices=None):
+        self.astar = astar
+        self.matrices = matrices if matrices is not None else DistanceMatrixBuilder(astar)
+        self.search_stats = {}
+    
+    def distance_matrix(self, points):
+        """
+        Travel costs between positions: matrix[i][j] is the cost i -> j
+        Returns: (matrix as a float64 array, total cells expanded)
+        """
+        matrix = self.matrices.build(points)
+        return np.asarray(matrix, dtype=np.float64), self.matrices.search_stats['expanded']
+    
+    @staticmethod
+    def tour_cost(matrix, tour):
+        return sum(matrix[a][b] for a, b in zip(tour, tour[1:]))
+    
+    @staticmethod
+    def nearest_neighbor_tour(matrix, end):
+        """Greedy tour from node 0 through every node but end, then end"""
+        unvisited = set(range(1, end))
+        tour = [0]
+        while unvisited:
+            last = matrix[tour[-1]]
+            nearest = min(unvisited, key=lambda node: last[node])
+            unvisited.remove(nearest)
+            tour.append(nearest)
+        return tour + [end]
+    
+    @staticmethod
+    def two_opt(matrix, tour):
+        """
+        Reverse segments while it helps. The matrix is asymmetric, so the
+        reversed segment's cost comes from prefix sums in both directions.
+        """
+        improved = True
+        while improved:
+            improved = False
+            length = len(tour)
+            forward = [0.0]
+            backward = [0.0]
+            for a, b in zip(tour, tour[1:]):
+                forward.append(forward[-1] + matrix[a][b])
+                backward.append(backward[-1] + matrix[b][a])
+            
+            for i in range(1, length - 2):
+                before = tour[i - 1]
+                for j in range(i + 1, length - 1):
+                    after = tour[j + 1]
+                    old = matrix[before][tour[i]] + (forward[j] - forward[i]) + matrix[tour[j]][after]
+                    new = matrix[before][tour[j]] + (backward[j] - backward[i]) + matrix[tour[i]][after]
+                    if new < old - 1e-9:
+                        tour[i:j + 1] = tour[i:j + 1][::-1]
+                        improved = True
+                        break
+                if improved:
+                    break
+        return tour
+    
+    @staticmethod
+    def or_opt(matrix, tour, max_segment=3):
+        """Move runs of 1..max_segment stops elsewhere while it helps"""
+        improved = True
+        while improved:
+            improved = False
+            length = len(tour)
+            for size in range(1, max_segment + 1):
+                for i in range(1, length - size):
+                    j = i + size - 1
+                    first, last = tour[i], tour[j]
+                    before, after = tour[i - 1], tour[j + 1]
+                    removal_gain = (matrix[before][first] + matrix[last][after]
+                                    - matrix[before][after])
+                    for k in range(0, length - 1):
+                        if i - 1 <= k <= j:
+                            continue
+                        a, b = tour[k], tour[k + 1]
+                        insert_cost = matrix[a][first] + matrix[last][b] - matrix[a][b]
+                        if insert_cost < removal_gain - 1e-9:
+                            segment = tour[i:j + 1]
+                            rest = tour[:i] + tour[j + 1:]
+                            at = k + 1 if k < i else k + 1 - size
+                            tour[:] = rest[:at] + segment + rest[at:]
+                            improved = True
+                            break
+                    if improved:
+                        break
+                if improved:
+                    break
+        return tour
+    
+    def plan(self, depot, stops, return_to_depot=True):
+        """
+        Plan one route from depot through every reachable stop
+        
+        Returns: dict with the visiting order, the stitched path, its
+        cost, per-leg costs, the cost of visiting stops in input order,
+        and any stops that cannot be reached
+        """
+        depot = tuple(depot)
+        stops = [tuple(stop) for stop in stops]
+        points = [depot] + stops
+        matrix, expanded = self.distance_matrix(points)
+        
+        reachable = [node for node in range(1, len(points))
+                     if np.isfinite(matrix[0][node]) and
+                     (not return_to_depot or np.isfinite(matrix[node][0]))]
+        unreachable = [points[node] for node in range(1, len(points))
+                       if node not in reachable]
+        
+        # Sub-matrix over depot + reachable stops, plus a fixed end node:
+        # the depot again, or a free end that costs nothing to reach
+        nodes = [0] + reachable
+        size = len(nodes)
+        sub = matrix[np.ix_(nodes, nodes)]
+        end_column = sub[:, 0] if return_to_depot else np.zeros(size)
+        costs = np.zeros((size + 1, size + 1))
+        costs[:size, :size] = sub
+        costs[:size, size] = end_column
+        costs = costs.tolist()
+        
+        input_cost = self.astar._path_cost(self.tour_cost(costs, list(range(size + 1))))
+        tour = self.nearest_neighbor_tour(costs, size)
+        seed_cost = self.astar._path_cost(self.tour_cost(costs, tour))
+        tour = self.or_opt(costs, self.two_opt(costs, tour))
+        # One more 2-opt pass can open up after Or-opt moves
+        tour = self.two_opt(costs, tour)
+        
+        order = [nodes[node] for node in tour[1:-1]]
+        visits = [0] + order + ([0] if return_to_depot else [])
+        
+        # Stitch the legs with exact A* searches
+        astar = self.astar
+        path = [astar.to_index(depot)]
+        legs = []
+        total = 0
+        for a, b in zip(visits, visits[1:]):
+            leg, leg_cost, leg_expanded = astar.optimal_path(
+                astar.to_index(points[a]), astar.to_index(points[b]))
+            expanded += leg_expanded
+            path.extend(leg[1:])
+            legs.append({'from': points[a], 'to': points[b], 'cost': leg_cost})
+            total += leg_cost
+        
+        self.search_stats = {
+            'stops': len(stops),
+            'expanded': expanded,
+            'nearest_neighbor_cost': seed_cost,
+        }
+        return {
+            'order': [points[node] for node in order],
+            'path': [astar.to_position(index) for index in path],
+            'cost': total,
+            'legs': legs,
+            'input_order_cost': input_cost,
+            'unreachable': unreachable,
+        }
+
+
+class VehicleRoutingPlanner:
+    """
+    Capacitated multi-vehicle routing with time windows
+    
+    Travel costs come from the DistanceMatrixBuilder given as matrices
+    (one multi-target Dijkstra per point, in parallel for many stops)
+    and double as travel times. Vans leave the depot, serve
+    stops whose demands fit their capacity, arrive at each stop before
+    its window closes (waiting if early) and get back before the depot
+    closes.
+    
+    1. Clarke-Wright savings merges single-stop routes end-to-start,
+       largest saving d(i,0) + d(0,j) - d(i,j) first, while load and
+       windows stay feasible.
+    2. Local search over each stop's nearest neighbors applies relocate,
+       swap and 2-opt* (tail exchange) moves while they lower total cost,
+       until none helps or the time limit runs out.
+    """
+    
+    def __init__(self, astar, neighbor_count=12, matrices=None):
+        self.astar = astar
+        self.neighbor_count = neighbor_count
+        self.matrices = matrices if matrices is not None else DistanceMatrixBuilder(astar)
+        self.search_stats = {}
+    
+    def _setup(self, matrix, demands, capacities, time_windows, service_times, depot_window):
+        """Flatten the instance into lists indexed by node (0 = depot)"""
+        count = len(matrix)
+        self.dist = matrix.tolist() if isinstance(matrix, np.ndarray) else [list(row) for row in matrix]
+        self.demand = [0] + [int(demand) for demand in demands]
+        if np.isscalar(service_times):
+            service_times = [service_times] * (count - 1)
+        self.service = [0.0] + [float(service) for service in service_times]
+        windows = time_windows if time_windows is not None else [None] * (count - 1)
+        windows = [depot_window] + list(windows)
+        self.early = [float(window[0]) if window is not None else 0.0 for window in windows]
+        self.late = [float(window[1]) if window is not None else math.inf for window in windows]
+        # A single capacity means as many identical vans as needed
+        if np.isscalar(capacities):
+            self.capacities = None
+            self.max_capacity = int(capacities)
+        else:
+            self.capacities = sorted((int(capacity) for capacity in capacities), reverse=True)
+            self.max_capacity = self.capacities[0] if self.capacities else 0
+    
+    def schedule(self, route):
+        """
+        Arrival time at each stop of route (waiting for windows to open)
+        Returns: (arrivals, depot return time), or None if a window is missed
+        """
+        dist, service, early, late = self.dist, self.service, self.early, self.late
+        time_now = early[0]
+        previous = 0
+        arrivals = []
+        for node in route:
+            time_now += service[previous] + dist[previous][node]
+            if time_now > late[node] or time_now == math.inf:
+                return None
+            if time_now < early[node]:
+                time_now = early[node]
+            arrivals.append(time_now)
+            previous = node
+        time_now += service[previous] + dist[previous][0]
+        if time_now > late[0] or time_now == math.inf:
+            return None
+        return arrivals, time_now
+    
+    def route_cost(self, route):
+        dist = self.dist
+        stops = [0] + route + [0]
+        return self.astar._path_cost(sum(dist[a][b] for a, b in zip(stops, stops[1:])))
+    
+    def _fleet_fits(self, loads):
+        """Loads fit the fleet if, sorted, each fits the matching van"""
+        if self.capacities is None:
+            return max(loads, default=0) <= self.max_capacity
+        if len(loads) > len(self.capacities):
+            return False
+        return all(load <= capacity for load, capacity
+                   in zip(sorted(loads, reverse=True), self.capacities))
+    
+    def savings_routes(self, nodes):
+        """Clarke-Wright savings construction over the given stop nodes"""
+        dist, demand = self.dist, self.demand
+        routes = {node: [node] for node in nodes}
+        loads = {node: demand[node] for node in nodes}
+        route_of = {node: node for node in nodes}
+        fleet = len(self.capacities) if self.capacities is not None else math.inf
+        
+        savings = [(dist[i][0] + dist[0][j] - dist[i][j], i, j)
+                   for i in nodes for j in nodes if i != j and dist[i][j] < math.inf]
+        savings.sort(reverse=True)
+        for saving, i, j in savings:
+            # Past the positive savings, only merge to fit a limited fleet
+            if saving <= 0 and len(routes) <= fleet:
+                break
+            first, second = route_of[i], route_of[j]
+            if first == second or routes[first][-1] != i or routes[second][0] != j:
+                continue
+            load = loads[first] + loads[second]
+            if load > self.max_capacity:
+                continue
+            merged = routes[first] + routes[second]
+            if self.schedule(merged) is None:
+                continue
+            routes[first] = merged
+            loads[first] = load
+            for node in routes.pop(second):
+                route_of[node] = first
+            del loads[second]
+        return list(routes.values())
+    
+    def local_search(self, routes, deadline):
+        """
+        Relocate, swap and 2-opt* moves between each stop and its nearest
+        neighbors, first improvement, until a full pass finds nothing
+        Returns: (routes, moves applied)
+        """
+        dist, demand = self.dist, self.demand
+        routes = [list(route) for route in routes]
+        loads = [sum(demand[node] for node in route) for route in routes]
+        costs = [self.route_cost(route) for route in routes]
+        nodes = [node for route in routes for node in route]
+        neighbors = {
+            node: sorted((other for other in nodes if other != node),
+                         key=lambda other: min(dist[node][other], dist[other][node])
+                         )[:self.neighbor_count]
+            for node in nodes
+        }
+        moves = 0
+        
+        def locate():
+            return {node: (r, position) for r, route in enumerate(routes)
+                    for position, node in enumerate(route)}
+        
+        def try_apply(changes):
+            """changes: {route index: new route}; apply if cheaper and feasible"""
+            new_costs = {r: self.route_cost(route) for r, route in changes.items()}
+            if sum(new_costs.values()) >= sum(costs[r] for r in changes) - 1e-9:
+                return False
+            new_loads = {r: sum(demand[node] for node in route) for r, route in changes.items()}
+            all_loads = [new_loads.get(r, load) for r, load in enumerate(loads)
+                         if changes.get(r, routes[r])]
+            if not self._fleet_fits(all_loads):
+                return False
+            if any(route and self.schedule(route) is None for route in changes.values()):
+                return False
+            for r, route in changes.items():
+                routes[r], costs[r], loads[r] = route, new_costs[r], new_loads[r]
+            return True
+        
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            where = locate()
+            for node in nodes:
+                if time.perf_counter() >= deadline:
+                    break
+                for other in neighbors[node]:
+                    r, p = where[node]
+                    s, q = where[other]
+                    route, other_route = routes[r], routes[s]
+                    candidates = []
+                    # Relocate node next to other (before or after it)
+                    without = route[:p] + route[p + 1:]
+                    if r == s:
+                        at = without.index(other)
+                        candidates.append({r: without[:at + 1] + [node] + without[at + 1:]})
+                        candidates.append({r: without[:at] + [node] + without[at:]})
+                    else:
+                        candidates.append({r: without, s: other_route[:q + 1] + [node] + other_route[q + 1:]})
+                        candidates.append({r: without, s: other_route[:q] + [node] + other_route[q:]})
+                        # Swap the two stops
+                        swapped, other_swapped = list(route), list(other_route)
+                        swapped[p], other_swapped[q] = other, node
+                        candidates.append({r: swapped, s: other_swapped})
+                        # 2-opt*: node continues with other's tail and vice versa
+                        candidates.append({r: route[:p + 1] + other_route[q:],
+                                           s: other_route[:q] + route[p + 1:]})
+                    for changes in candidates:
+                        if try_apply(changes):
+                            moves += 1
+                            improved = True
+                            where = locate()
+                            break
+            # Drop routes emptied by relocations
+            keep = [r for r, route in enumerate(routes) if route]
+            routes = [routes[r] for r in keep]
+            loads = [loads[r] for r in keep]
+            costs = [costs[r] for r in keep]
+        return routes, moves
+    
+    def plan(self, depot, stops, demands, capacities, time_windows=None,
+             service_times=0, depot_window=None, time_limit=2.0, matrix=None):
+        """
+        Route a fleet from depot through stops
+        
+        demands: packages per stop. capacities: one capacity per van, or
+        a single number for as many identical vans as needed.
+        time_windows: per-stop (earliest, latest) arrival or None.
+        depot_window: (leave no earlier than, return by).
+        matrix: optional precomputed travel costs over [depot] + stops.
+        
+        Returns: dict with one entry per route (stops, load, capacity,
+        cost, arrivals, return time), the total cost, the savings-only
+        cost, and the stops that cannot be served
+        """
+        started = time.perf_counter()
+        depot = tuple(depot)
+        stops = [tuple(stop) for stop in stops]
+        points = [depot] + stops
+        if len(demands) != len(stops):
+            raise ValueError("Need one demand per stop")
+        if time_windows is not None and len(time_windows) != len(stops):
+            raise ValueError("Need one time window per stop (or None)")
+        expanded = 0
+        if matrix is None:
+            matrix = np.asarray(self.matrices.build(points), dtype=np.float64)
+            expanded = self.matrices.search_stats['expanded']
+        self._setup(matrix, demands, capacities, time_windows, service_times, depot_window)
+        matrix_ms = (time.perf_counter() - started) * 1000
+        
+        # A stop no van can serve on its own is out of every route
+        servable = [node for node in range(1, len(points))
+                    if self.demand[node] <= self.max_capacity and self.schedule([node]) is not None]
+        unserved = set(range(1, len(points))) - set(servable)
+        
+        routes = self.savings_routes(servable)
+        # A limited fleet may not cover every savings route: drop the
+        # cheapest-to-skip routes (fewest packages) until the rest fit
+        if self.capacities is not None:
+            routes.sort(key=lambda route: sum(self.demand[node] for node in route), reverse=True)
+            while routes and not self._fleet_fits([sum(self.demand[node] for node in route)
+                                                   for route in routes]):
+                unserved.update(routes.pop())
+        savings_cost = sum(self.route_cost(route) for route in routes)
+        
+        deadline = started + time_limit
+        routes, moves = self.local_search(routes, deadline)
+        
+        # Biggest loads go in the biggest vans
+        routes.sort(key=lambda route: sum(self.demand[node] for node in route), reverse=True)
+        report = []
+        for vehicle, route in enumerate(routes):
+            arrivals, back = self.schedule(route)
+            report.append({
+                'vehicle': vehicle,
+                'stops': [points[node] for node in route],
+                'load': sum(self.demand[node] for node in route),
+                'capacity': self.capacities[vehicle] if self.capacities is not None else self.max_capacity,
+                'cost': self.route_cost(route),
+                'arrivals': arrivals,
+                'return_time': back,
+            })
+        
+        self.search_stats = {
+            'stops': len(stops),
+            'expanded': expanded,
+            'matrix_ms': matrix_ms,
+            'solve_ms': (time.perf_counter() - started) * 1000 - matrix_ms,
+            'local_search_moves': moves,
+        }
+        return {
+            'routes': report,
+            'cost': sum(route['cost'] for route in report),
+            'savings_cost': savings_cost,
+            'unserved': [points[node] for node in sorted(unserved)],
+        }
+
+
+class TimeDependentCosts:
+    """
+    Time-of-day travel-time profiles for entering cells
+    
+    profile is a 2-D array with one row per terrain code (per='terrain')
+    or per flat cell index (per='cell'), and one column per time bucket
+    of bucket_minutes; the day wraps around after the last bucket.
+    Column k is the travel time for departing at the *start* of bucket
+    k, with linear interpolation in between, so travel time changes
+    continuously.
+    
+    FIFO (leaving later never means arriving earlier) holds when no
+    profile drops faster than the clock: c[k+1] >= c[k] - bucket_minutes.
+    Under FIFO, waiting never helps and earliest-arrival A* stays
+    optimal. A violating profile is rejected, or with repair_fifo=True
+    raised just enough to comply.
+    """
+    
+    PER = ('terrain', 'cell')
+    
+    def __init__(self, profile, bucket_minutes=60, per='terrain', repair_fifo=False):
+        if per not in self.PER:
+            raise ValueError(f"Unknown per {per!r}, expected one of {self.PER}")
+        profile = np.array(profile, dtype=np.float32)
+        if profile.ndim != 2 or profile.shape[1] == 0:
+            raise ValueError("profile must be a 2-D (rows, time buckets) array")
+        if not np.isfinite(profile).all() or (profile < 0).any():
+            raise ValueError("profile travel times must be finite and non-negative")
+        if bucket_minutes <= 0:
+            raise ValueError("bucket_minutes must be positive")
+        self.per = per
+        self.bucket_minutes = float(bucket_minutes)
+        self.buckets = profile.shape[1]
+        self.period = self.bucket_minutes * self.buckets
+        
+        if repair_fifo:
+            self.repair_fifo(profile, self.bucket_minutes)
+        violations = self.fifo_violations(profile, self.bucket_minutes)
+        if len(violations):
+            row, bucket = violations[0]
+            raise ValueError(f"profile breaks FIFO at row {row}, bucket {bucket}: "
+                             f"travel time drops faster than the clock "
+                             f"(pass repair_fifo=True to fix)")
+        self.profile = profile
+        self._flat = profile.ravel().tolist()
+    
+    @classmethod
+    def from_multipliers(cls, terrain_costs, multipliers, bucket_minutes=60, repair_fifo=False):
+        """
+        Per-terrain profile: each static terrain cost scaled by a
+        time-of-day multiplier (e.g. 1.0 at night, 2.5 at rush hour).
+        Every terrain code gets a row; codes without a finite cost in
+        terrain_costs cost 1, as in the static search.
+        """
+        multipliers = np.asarray(multipliers, dtype=np.float32)
+        profile = np.tile(multipliers, (256, 1))
+        for terrain, cost in terrain_costs.items():
+            if 0 <= terrain < 256 and cost is not None and math.isfinite(cost):
+                profile[terrain] = cost * multipliers
+        return cls(profile, bucket_minutes, 'terrain', repair_fifo)
+    
+    @staticmethod
+    def fifo_violations(profile, bucket_minutes):
+        """(row, bucket) pairs where the next bucket drops too fast"""
+        drop = profile - np.roll(profile, -1, axis=1)
+        return np.argwhere(drop > bucket_minutes + 1e-6)
+    
+    @staticmethod
+    def repair_fifo(profile, bucket_minutes):
+        """Raise travel times in place until every drop is at most bucket_minutes"""
+        buckets = profile.shape[1]
+        # Two laps around the day settle the wrap-around
+        for _ in range(2):
+            for bucket in range(buckets):
+                following = (bucket + 1) % buckets
+                np.maximum(profile[:, following], profile[:, bucket] - bucket_minutes,
+                           out=profile[:, following])
+        return profile
+    
+    def row_minimum(self):
+        return self.profile.min(axis=1)
+    
+    def travel_time(self, row, departure):
+        """Time to enter a cell of this row, leaving at departure"""
+        position = (departure % self.period) / self.bucket_minutes
+        bucket = int(position)
+        if bucket >= self.buckets:   # Float rounding just below the period
+            bucket = self.buckets - 1
+        fraction = position - bucket
+        base = row * self.buckets
+        first = self._flat[base + bucket]
+        second = self._flat[base + (bucket + 1) % self.buckets]
+        return first + (second - first) * fraction
+
+
+class TimeDependentPlanner:
+    """
+    Rush-hour aware routing: A* where g is the arrival time
+    
+    Entering cell v at time t takes costs.travel_time(row(v), t). With
+    FIFO profiles the earliest arrival at a cell is also the best state
+    to continue from, so A* settles each cell once, as in the static
+    search. The heuristic is Manhattan distance times the smallest
+    travel time any passable cell ever has, so it never overestimates.
+    Both the terrain lookup and that minimum are refreshed whenever the
+    grid's grid_version moves on (set_cell, a new grid).
+    """
+    
+    def __init__(self, astar, costs):
+        self.astar = astar
+        self.costs = costs
+        self.search_stats = {}
+        self._grid_version = None
+        self._refresh()
+    
+    def _refresh(self):
+        """Recompute the terrain lookup and min_travel_time for the current grid"""
+        astar, costs = self.astar, self.costs
+        cells = astar.rows * astar.cols
+        if costs.per == 'cell':
+            if costs.profile.shape[0] != cells:
+                raise ValueError(f"Per-cell profile needs {cells} rows, "
+                                 f"got {costs.profile.shape[0]}")
+            self._row_of = None
+            minimum = costs.row_minimum()[astar.passable.reshape(-1)]
+        else:
+            used = np.unique(astar.grid[astar.passable])
+            if used.size and used.max() >= costs.profile.shape[0]:
+                raise ValueError(f"Per-terrain profile has no row for terrain {int(used.max())}")
+            self._row_of = memoryview(np.ascontiguousarray(astar.grid).reshape(-1))
+            minimum = costs.row_minimum()[used]
+        self.min_travel_time = float(minimum.min()) if minimum.size else 0.0
+        self._grid_version = astar.grid_version
+    
+    def search(self, start, goal, departure):
+        """
+        Earliest-arrival route leaving start at departure (minutes)
+        Returns: (path as positions, drive time, expanded count)
+        """
+        astar = self.astar
+        if self._grid_version != astar.grid_version:
+            self._refresh()
+        start_index, goal_index = astar.to_index(tuple(start)), astar.to_index(tuple(goal))
+        mask_view = astar._mask_view
+        neighbor_steps = astar._neighbor_steps()
+        travel_time = self.costs.travel_time
+        row_of = self._row_of
+        h = astar._admissible_heuristic(goal_index, self.min_travel_time)
+        heappush, heappop = heapq.heappush, heapq.heappop
+        
+        cell_count = astar.rows * astar.cols
+        arrival = array('d', [math.inf]) * cell_count
+        parents = array('i', [-1]) * cell_count
+        closed = bytearray(cell_count)
+        arrival[start_index] = departure
+        open_heap = [(departure + h(start_index), 0, start_index)]
+        counter = 1
+        expanded = 0
+        found = False
+        
+        while open_heap:
+            _, _, current = heappop(open_heap)
+            if closed[current]:
+                continue
+            closed[current] = 1
+            expanded += 1
+            if current == goal_index:
+                found = True
+                break
+            now = arrival[current]
+            mask = mask_view[current]
+            for bit, offset in neighbor_steps:
+                if not mask & bit:
+                    continue
+                neighbor = current + offset
+                if closed[neighbor]:
+                    continue
+                row = row_of[neighbor] if row_of is not None else neighbor
+                reached = now + travel_time(row, now)
+                if reached < arrival[neighbor]:
+                    arrival[neighbor] = reached
+                    parents[neighbor] = current
+                    heappush(open_heap, (reached + h(neighbor), counter, neighbor))
+                    counter += 1
+        
+        self.search_stats = {'departure': departure, 'expanded': expanded}
+        if not found:
+            self.search_stats['arrival'] = math.inf
+            return None, float('inf'), expanded
+        path = [goal_index]
+        while path[-1] != start_index:
+            path.append(parents[path[-1]])
+        path.reverse()
+        self.search_stats['arrival'] = arrival[goal_index]
+        return ([astar.to_position(index) for index in path],
+                arrival[goal_index] - departure, expanded)
+    
+    def best_departure(self, trips, earliest, latest, step=None):
+        """
+        Common dispatch time in [earliest, latest] that minimizes the
+        total drive time of trips, a list of (start, goal) pairs
+        
+        Departures are tried every step minutes (default: a quarter
+        bucket), plus latest itself.
+        
+        Returns: dict with the departure, total drive time, and per-trip
+        (path, drive time), plus every departure tried with its total
+        """
+        if latest < earliest:
+            raise ValueError("latest must not be before earliest")
+        if step is None:
+            step = self.costs.bucket_minutes / 4
+        count = int((latest - earliest) // step) + 1
+        departures = [earliest + step * number for number in range(count)]
+        if departures[-1] < latest:
+            departures.append(latest)
+        
+        best = None
+        tried = []
+        expanded = 0
+        for departure in departures:
+            routes = []
+            for start, goal in trips:
+                path, drive_time, trip_expanded = self.search(start, goal, departure)
+                expanded += trip_expanded
+                routes.append((path, drive_time))
+            total = sum(drive_time for _, drive_time in routes)
+            tried.append((departure, total))
+            if best is None or total < best['total_drive_time']:
+                best = {'departure': departure, 'total_drive_time': total, 'trips': routes}
+        self.search_stats = {'departures_tried': len(departures), 'expanded': expanded}
+        best['tried'] = tried
+        return best
+
+
+class ReverseResumableAStar:
+    """
+    True remaining cost to one goal, computed lazily (Silver, 2005)
+    
+    A reverse A* from the goal toward the agent's start, kept open
+    between calls: distance(cell) resumes it until that cell is closed.
+    With a consistent heuristic a closed cell's g-value is exact, so
+    every answer is the cost of the cheapest route from cell to the goal,
+    which makes it a perfect heuristic for a space-time search. Storage
+    is sparse (dicts), so many agents on a large grid stay cheap.
+    """
+    
+    def __init__(self, astar, goal, start):
+        self.goal = goal
+        self.closed = {}        # cell -> exact cost to goal
+        self.next_cell = {}     # cell -> next cell toward goal
+        self.steps = {goal: 0}  # cell -> fewest steps among its cheapest routes
+        self._g = {goal: 0.0}
+        self._h = astar._admissible_heuristic(start)
+        self._mask_view = astar._mask_view
+        self._cost_view = astar._cost_view
+        self._passable_view = astar._passable_view
+        self._steps = astar._neighbor_steps()
+        self.expanded = 0
+        
+        # Nothing can step into an obstacle goal
+        self._open = [(self._h(goal), goal)] if self._passable_view[goal] else []
+        if not self._open:
+            self.closed[goal] = 0.0
+    
+    def distance(self, cell):
+        """Cheapest cost from cell to the goal (inf if it cannot get there)"""
+        known = self.closed.get(cell)
+        if known is not None:
+            return known
+        if not self._passable_view[cell]:
+            # An obstacle start can still step out onto a passable neighbor
+            mask = self._mask_view[cell]
+            return min((self._cost_view[cell + offset] + self.distance(cell + offset)
+                        for bit, offset in self._steps if mask & bit), default=math.inf)
+        
+        g, closed, open_heap, steps = self._g, self.closed, self._open, self.steps
+        mask_view, cost_view, h = self._mask_view, self._cost_view, self._h
+        while open_heap:
+            _, current = heapq.heappop(open_heap)
+            if current in closed:
+                continue
+            current_g = closed[current] = g[current]
+            self.expanded += 1
+            
+            # Every passable neighbor can step into current at its cost
+            through = current_g + cost_view[current]
+            through_steps = steps[current] + 1
+            mask = mask_view[current]
+            for bit, offset in self._steps:
+                if mask & bit:
+                    neighbor = current + offset
+                    if neighbor in closed:
+                        continue
+                    known = g.get(neighbor, math.inf)
+                    if through < known or (through == known and through_steps < steps[neighbor]):
+                        g[neighbor] = through
+                        steps[neighbor] = through_steps
+                        self.next_cell[neighbor] = current
+                        heapq.heappush(open_heap, (through + h(neighbor), neighbor))
+            if current == cell:
+                return current_g
+        return math.inf
+
+
+class CooperativePathPlanner:
+    """
+    Cooperative A* for many agents sharing one grid (Silver, 2005)
+    
+    Agents are planned one at a time in priority order. Each one runs A*
+    in space-time: a state is (cell, t), and every step either moves to
+    a neighbor or waits in place (costing wait_cost). A hashed
+    reservation table of the (t, cell) pairs and (t, from, to) moves
+    already claimed keeps later agents out of earlier agents' way,
+    including head-on swaps. An agent parks at its goal once it arrives,
+    so it may only arrive once nobody else needs that cell any more. A
+    ReverseResumableAStar per agent gives the exact no-conflict cost to
+    go, which is the heuristic.
+    
+    An agent fails if it cannot arrive within max_delay steps of its
+    solo route, or only at more than max_delay waits' worth of extra cost.
+    A failed agent never leaves its start, so it is parked there for
+    good; agents already routed across that cell are planned again
+    around it.
+    """
+    
+    PRIORITIES = ('input', 'longest_first', 'shortest_first')
+    
+    def __init__(self, astar, wait_cost=None, max_delay=64):
+        self.astar = astar
+        self.wait_cost = astar.base_move_cost if wait_cost is None else wait_cost
+        self.max_delay = max_delay
+        self.search_stats = {}
+        self.reset()
+    
+    def reset(self):
+        """Drop all reservations"""
+        self.vertices = set()      # (t, cell)
+        self.moves = set()         # (t, from_cell, to_cell)
+        self.parked = {}           # cell -> time an agent parks there for good
+        self.last_use = {}         # cell -> latest reserved time
+    
+    def is_free(self, t, cell):
+        return (t, cell) not in self.vertices and self.parked.get(cell, math.inf) > t
+    
+    def reserve(self, cells):
+        """Claim a path given as one cell index per time step"""
+        for t, cell in enumerate(cells):
+            self.vertices.add((t, cell))
+            self.last_use[cell] = max(self.last_use.get(cell, -1), t)
+            if t:
+                self.moves.add((t - 1, cells[t - 1], cell))
+        self.parked[cells[-1]] = len(cells) - 1
+    
+    def release(self, cells):
+        """Drop the claims of a path reserved with reserve()"""
+        for t, cell in enumerate(cells):
+            self.vertices.discard((t, cell))
+            if t:
+                self.moves.discard((t - 1, cells[t - 1], cell))
+        if self.parked.get(cells[-1]) == len(cells) - 1:
+            del self.parked[cells[-1]]
+        # Other paths may still use these cells later than t = 0
+        latest = {}
+        for t, cell in self.vertices:
+            if t > latest.get(cell, -1):
+                latest[cell] = t
+        self.last_use = latest
+    
+    def _solo_route(self, distances, start):
+        """Step count of the conflict-free optimal route, or None"""
+        if distances.distance(start) == math.inf:
+            return None
+        if start in distances.steps:
+            return distances.steps[start]
+        # Obstacle start: one step out to its best neighbor first
+        astar = self.astar
+        mask = astar._mask_view[start]
+        first = min((start + offset for bit, offset in astar._neighbor_steps() if mask & bit),
+                    key=lambda cell: astar._cost_view[cell] + distances.distance(cell))
+        return 1 + distances.steps[first]
+    
+    def _space_time_search(self, start, goal, distances, max_time, max_cost):
+        """
+        A* over (cell, t) against the reservation table, pruning states
+        past max_time or whose f-cost exceeds max_cost
+        Returns: (cells per time step or None, cost, expanded)
+        """
+        astar = self.astar
+        mask_view, cost_view = astar._mask_view, astar._cost_view
+        neighbor_steps = astar._neighbor_steps()
+        cell_count = astar.rows * astar.cols
+        heappush, heappop = heapq.heappush, heapq.heappop
+        vertices, moves, parked = self.vertices, self.moves, self.parked
+        wait_cost = self.wait_cost
+        goal_free_after = self.last_use.get(goal, -1)
+        if goal_free_after >= max_time or goal in parked:
+            return None, math.inf, 0   # Others need the goal for too long
+        
+        # The agent cannot arrive before goal_free_after + 1, and every
+        # step until then costs at least the cheaper of a wait and a move
+        step_floor = min(wait_cost, astar.base_move_cost)
+        def heuristic(cell, t):
+            return max(distances.distance(cell), (goal_free_after + 1 - t) * step_floor)
+        
+        g_scores = {start: 0.0}       # key t * cell_count + cell
+        parents = {}
+        closed = set()
+        h_start = heuristic(start, 0)
+        # Ties on f go to the earliest possible arrival (so a conflict-free
+        # agent arrives exactly when its solo route would), then to the
+        # state closest to the goal
+        min_steps, earliest = distances.steps, goal_free_after + 1
+        open_heap = [(h_start, max(min_steps.get(start, 0), earliest), h_start, 0, 0, start)]
+        counter = 1
+        expanded = 0
+        
+        while open_heap:
+            _, _, _, _, t, cell = heappop(open_heap)
+            key = t * cell_count + cell
+            if key in closed:
+                continue
+            closed.add(key)
+            expanded += 1
+            
+            if cell == goal and t > goal_free_after:
+                path = [cell]
+                while key in parents:
+                    key = parents[key]
+                    path.append(key % cell_count)
+                return path[::-1], g_scores[t * cell_count + cell], expanded
+            if t >= max_time:
+                continue
+            
+            next_t = t + 1
+            current_g = g_scores[key]
+            mask = mask_view[cell]
+            options = [(cell, wait_cost)]
+            options.extend((cell + offset, cost_view[cell + offset])
+                           for bit, offset in neighbor_steps if mask & bit)
+            for neighbor, step_cost in options:
+                if (next_t, neighbor) in vertices or parked.get(neighbor, math.inf) <= next_t:
+                    continue
+                if neighbor != cell and (t, neighbor, cell) in moves:
+                    continue   # Head-on swap with an earlier agent
+                tentative_g = current_g + step_cost
+                h = heuristic(neighbor, next_t)
+                if tentative_g + h > max_cost:
+                    continue
+                next_key = next_t * cell_count + neighbor
+                if tentative_g < g_scores.get(next_key, math.inf):
+                    g_scores[next_key] = tentative_g
+                    parents[next_key] = key
+                    arrival = max(next_t + min_steps.get(neighbor, 0), earliest)
+                    heappush(open_heap, (tentative_g + h, arrival, h, counter, next_t, neighbor))
+                    counter += 1
+        return None, math.inf, expanded
+    
+    def plan(self, agents, priorities='input'):
+        """
+        Plan collision-free routes for a list of (start, goal) agents
+        
+        priorities: 'input' (list order), 'longest_first' or
+        'shortest_first' (by solo route cost), or one number per agent
+        (higher plans first, ties in list order).
+        
+        Returns: dict with per-agent paths (one position per time step,
+        None if the agent failed and stays on its start), costs, arrival_times, delays (how
+        many steps later than its solo route the agent arrives),
+        extra_costs (over the solo route, waits and detours included),
+        the planning order and the failed agent indices
+        """
+        astar = self.astar
+        agents = [(tuple(start), tuple(goal)) for start, goal in agents]
+        starts = [astar.to_index(start) for start, _ in agents]
+        goals = [astar.to_index(goal) for _, goal in agents]
+        if len(set(starts)) != len(starts):
+            raise ValueError("agents must start on distinct cells")
+        
+        distances = [ReverseResumableAStar(astar, goal, start)
+                     for start, goal in zip(starts, goals)]
+        solo_costs = [field.distance(start) for field, start in zip(distances, starts)]
+        
+        if isinstance(priorities, str):
+            if priorities not in self.PRIORITIES:
+                raise ValueError(f"Unknown priorities {priorities!r}, expected one of "
+                                 f"{self.PRIORITIES} or one number per agent")
+            order = list(range(len(agents)))
+            if priorities != 'input':
+                order.sort(key=lambda agent: solo_costs[agent],
+                           reverse=priorities == 'longest_first')
+        else:
+            if len(priorities) != len(agents):
+                raise ValueError("priorities needs one number per agent")
+            order = sorted(range(len(agents)), key=lambda agent: -priorities[agent])
+        
+        # Until it moves, every agent sits on its start cell
+        self.reset()
+        for agent, start in enumerate(starts):
+            self.vertices.add((0, start))
+        
+        count = len(agents)
+        paths, costs = [None] * count, [math.inf] * count
+        arrivals, delays, extra_costs = [None] * count, [None] * count, [None] * count
+        reserved = {}   # agent -> reserved cells, one per time step
+        failed = []
+        replanned = []
+        # Agents still to plan, next one last
+        solo_steps = [self._solo_route(field, start) for field, start in zip(distances, starts)]
+        pending = [agent for agent in reversed(order) if solo_steps[agent] is not None]
+        expanded = 0
+        
+        def fail(agent):
+            """Park a stuck agent on its start for good"""
+            start = starts[agent]
+            failed.append(agent)
+            self.vertices.add((0, start))
+            self.parked[start] = 0
+            # Whoever was routed across that cell has to go around it
+            for other, cells in list(reserved.items()):
+                if start in cells[1:]:
+                    self.release(cells)
+                    self.vertices.add((0, starts[other]))
+                    del reserved[other]
+                    paths[other], costs[other] = None, math.inf
+                    arrivals[other] = delays[other] = extra_costs[other] = None
+                    replanned.append(other)
+                    pending.append(other)
+        
+        # Agents that cannot reach their goal at all stay put from the start
+        for agent in order:
+            if solo_steps[agent] is None:
+                fail(agent)
+        
+        while pending:
+            agent = pending.pop()
+            start, goal, field = starts[agent], goals[agent], distances[agent]
+            self.vertices.discard((0, start))
+            slack = self.max_delay * self.wait_cost
+            cells, cost, agent_expanded = self._space_time_search(
+                start, goal, field, solo_steps[agent] + self.max_delay,
+                solo_costs[agent] + slack + 1e-9)
+            expanded += agent_expanded
+            if cells is None:
+                fail(agent)
+                continue
+            self.reserve(cells)
+            reserved[agent] = cells
+            paths[agent] = [astar.to_position(cell) for cell in cells]
+            costs[agent] = astar._path_cost(cost)
+            arrivals[agent] = len(cells) - 1
+            delays[agent] = max(0, len(cells) - 1 - solo_steps[agent])
+            extra_costs[agent] = astar._path_cost(cost - solo_costs[agent])
+        
+        planned = [delay for delay in delays if delay is not None]
+        self.search_stats = {
+            'agents': count,
+            'planned': len(planned),
+            'failed': len(failed),
+            'replanned': len(replanned),
+            'expanded': expanded,
+            'heuristic_expanded': sum(field.expanded for field in distances),
+            'reservations': len(self.vertices),
+            'total_delay': sum(planned),
+            'max_delay': max(planned, default=0),
+        }
+        return {
+            'paths': paths,
+            'costs': costs,
+            'arrival_times': arrivals,
+            'delays': delays,
+            'extra_costs': extra_costs,
+            'order': order,
+            'failed': failed,
+        }
+
+
 def run_astar_demo():
     """Run comprehensive A* Search demonstration"""
     print("\n" + "="*70)
@@ -267,15 +5137,24 @@ def run_astar_demo():
     print(f"\n📍 Start: Tzu Chi Center {start}")
     print(f"🎯 Goal: Food Pantry {goal}\n")
     
-    # Test different heuristics
-    heuristics = ['manhattan', 'euclidean', 'manhattan_safe']
+    # Test different heuristics, then Jump Point Search
+    configurations = [
+        ('manhattan', 'astar'),
+        ('euclidean', 'astar'),
+        ('manhattan_safe', 'astar'),
+        ('alt', 'astar'),
+        ('manhattan', 'jps'),
+    ]
     
-    for h_type in heuristics:
+    for h_type, algorithm in configurations:
         print(f"\n{'─'*70}")
-        print(f"Testing with {h_type} heuristic:")
+        if algorithm == 'jps':
+            print(f"Testing Jump Point Search ({h_type} heuristic):")
+        else:
+            print(f"Testing with {h_type} heuristic:")
         print(f"{'─'*70}")
         
-        astar = AdvancedAStarSearch(grid, heuristic_type=h_type)
+        astar = AdvancedAStarSearch(grid, heuristic_type=h_type, algorithm=algorithm)
         path, cost, explored = astar.search(start, goal)
         
         if path:
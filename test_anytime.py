@@ -0,0 +1,55 @@
+"""
+Anytime ARA* search: every path it reports honours its suboptimality
+bound against a plain Dijkstra, and enough time makes it optimal
+"""
+
+import pytest
+
+from main import AdvancedAStarSearch
+
+
+def random_query(rng, rows, cols):
+    return ((rng.randrange(rows), rng.randrange(cols)),
+            (rng.randrange(rows), rng.randrange(cols)))
+
+
+@pytest.mark.parametrize('heuristic_type', ['manhattan', 'alt'])
+def test_anytime_converges_to_optimal(reference, rng, heuristic_type):
+    for _ in range(30):
+        rows, cols = rng.randint(1, 12), rng.randint(1, 12)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid, heuristic_type)
+        start, goal = random_query(rng, rows, cols)
+        improvements = []
+        path, cost, _ = astar.search_anytime(
+            start, goal, time_budget_ms=10_000,
+            on_improve=lambda path, cost, bound: improvements.append((path, cost, bound)))
+        optimal = reference.dijkstra(grid, start).get(goal)
+        if optimal is None:
+            assert path is None and not improvements
+            continue
+        assert cost == optimal
+        assert reference.path_cost(grid, path) == cost
+        assert astar.search_stats['bound'] == 1.0
+
+        for found, found_cost, bound in improvements:
+            assert reference.path_cost(grid, found) == found_cost <= bound * optimal + 1e-9
+        assert [c for _, c, _ in improvements] == sorted(
+            (c for _, c, _ in improvements), reverse=True)
+        assert [entry['cost'] for entry in astar.search_stats['improvements']] == [
+            c for _, c, _ in improvements]
+
+
+def test_zero_budget_still_returns_a_bounded_path(reference, rng):
+    for _ in range(30):
+        rows, cols = rng.randint(2, 12), rng.randint(2, 12)
+        grid = reference.make_grid(rng, rows, cols)
+        start, goal = random_query(rng, rows, cols)
+        path, cost, _ = AdvancedAStarSearch(grid, 'manhattan').search_anytime(
+            start, goal, time_budget_ms=0, initial_weight=2.5)
+        optimal = reference.dijkstra(grid, start).get(goal)
+        if optimal is None:
+            assert path is None
+            continue
+        assert path[0] == start and path[-1] == goal
+        assert optimal <= reference.path_cost(grid, path) == cost <= 2.5 * optimal
@@ -0,0 +1,59 @@
+"""
+AdvancedAStarSearch's flat-index A* core against a plain Dijkstra
+"""
+
+import math
+
+import pytest
+
+from main import AdvancedAStarSearch
+
+
+@pytest.mark.parametrize('heuristic_type', ['manhattan', 'euclidean'])
+def test_astar_cost_is_optimal(reference, rng, heuristic_type):
+    for _ in range(60):
+        rows, cols = rng.randint(1, 9), rng.randint(1, 9)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid, heuristic_type)
+        start = (rng.randrange(rows), rng.randrange(cols))
+        costs = reference.dijkstra(grid, start)
+        for goal in [(rng.randrange(rows), rng.randrange(cols)) for _ in range(4)]:
+            path, cost, explored = astar.search(start, goal)
+            if goal not in costs:
+                assert path is None and cost == math.inf
+                continue
+            assert cost == costs[goal]
+            assert path[0] == start and path[-1] == goal
+            assert reference.path_cost(grid, path) == cost
+            assert explored >= 1 or start == goal
+
+
+def test_manhattan_safe_returns_valid_routes(reference, rng):
+    for _ in range(40):
+        rows, cols = rng.randint(2, 9), rng.randint(2, 9)
+        grid = reference.make_grid(rng, rows, cols)
+        start, goal = (0, 0), (rows - 1, cols - 1)
+        path, cost, _ = AdvancedAStarSearch(grid).search(start, goal)
+        reachable = reference.dijkstra(grid, start)
+        assert (path is not None) == (goal in reachable)
+        if path is not None:
+            assert cost == reference.path_cost(grid, path) >= reachable[goal]
+
+
+def test_costs_are_integers_for_integer_terrain():
+    grid = [[0, 2, 0],
+            [0, 3, 0]]
+    astar = AdvancedAStarSearch(grid, 'manhattan')
+    _, cost, _ = astar.search((0, 0), (0, 2))
+    assert cost == 3 and isinstance(cost, int)
+
+    astar.terrain_costs[2] = 1.5
+    _, cost, _ = astar.search((0, 0), (0, 2))
+    assert cost == 2.5 and isinstance(cost, float)
+
+
+def test_start_on_obstacle_steps_off(reference):
+    grid = [[1, 0, 0],
+            [0, 0, 0]]
+    path, cost, _ = AdvancedAStarSearch(grid, 'manhattan').search((0, 0), (1, 2))
+    assert cost == 3 == reference.path_cost(grid, path)
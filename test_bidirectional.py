@@ -0,0 +1,34 @@
+"""
+Bidirectional A* mode against a plain Dijkstra
+"""
+
+import pytest
+
+from main import AdvancedAStarSearch
+
+
+@pytest.mark.parametrize('heuristic_type', ['manhattan', 'manhattan_safe'])
+def test_bidirectional_cost_is_optimal(reference, rng, heuristic_type):
+    for _ in range(60):
+        rows, cols = rng.randint(1, 12), rng.randint(1, 12)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid, heuristic_type, algorithm='bidirectional')
+        for _ in range(4):
+            start = (rng.randrange(rows), rng.randrange(cols))
+            goal = (rng.randrange(rows), rng.randrange(cols))
+            path, cost, _ = astar.search(start, goal)
+            expected = reference.dijkstra(grid, start).get(goal)
+            if expected is None:
+                assert path is None
+                continue
+            assert cost == expected
+            assert path[0] == start and path[-1] == goal
+            assert reference.path_cost(grid, path) == cost
+
+
+def test_bidirectional_blocked_goal_is_unreachable():
+    # The backward side starts on the obstacle, but nothing can enter it
+    grid = [[0, 0, 1],
+            [0, 0, 0]]
+    path, cost, _ = AdvancedAStarSearch(grid, algorithm='bidirectional').search((1, 0), (0, 2))
+    assert path is None and cost == float('inf')
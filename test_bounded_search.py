@@ -0,0 +1,45 @@
+"""
+The memory-bounded 'bounded' mode: optimal against a plain Dijkstra,
+both within node_budget and once a tiny budget forces the IDA* fallback
+"""
+
+import pytest
+
+from main import AdvancedAStarSearch
+
+
+def assert_optimal(reference, astar, grid, start, goal):
+    path, cost, _ = astar.search(start, goal)
+    expected = reference.dijkstra(grid, start).get(goal)
+    if expected is None:
+        assert path is None
+        return
+    assert cost == expected, f"{start} -> {goal}"
+    assert path[0] == start and path[-1] == goal
+    assert reference.path_cost(grid, path) == cost
+
+
+@pytest.mark.parametrize('heuristic_type', ['manhattan', 'manhattan_safe'])
+def test_bounded_search_is_optimal(reference, rng, heuristic_type):
+    for _ in range(40):
+        rows, cols = rng.randint(1, 12), rng.randint(1, 12)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid, heuristic_type, algorithm='bounded')
+        for _ in range(4):
+            start = (rng.randrange(rows), rng.randrange(cols))
+            goal = (rng.randrange(rows), rng.randrange(cols))
+            assert_optimal(reference, astar, grid, start, goal)
+            assert astar.search_stats.get('fallback') is None
+
+
+def test_tiny_budget_falls_back_to_ida(reference, rng):
+    fallbacks = 0
+    for _ in range(40):
+        rows, cols = rng.randint(2, 7), rng.randint(2, 7)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid, 'manhattan', algorithm='bounded', node_budget=2)
+        start = (rng.randrange(rows), rng.randrange(cols))
+        goal = (rng.randrange(rows), rng.randrange(cols))
+        assert_optimal(reference, astar, grid, start, goal)
+        fallbacks += astar.search_stats.get('fallback') == 'ida'
+    assert fallbacks > 10
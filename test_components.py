@@ -0,0 +1,42 @@
+"""
+ComponentIndex: reachable() agrees with a plain Dijkstra, before and
+after set_cell opens and closes cells
+"""
+
+from main import AdvancedAStarSearch
+
+
+def assert_matches_reference(reference, astar, grid):
+    rows, cols = len(grid), len(grid[0])
+    components = astar.components
+    seen = set()
+    count = 0
+    for start in ((row, col) for row in range(rows) for col in range(cols)):
+        costs = reference.dijkstra(grid, start)
+        for goal in ((row, col) for row in range(rows) for col in range(cols)):
+            assert components.reachable(astar.to_index(start), astar.to_index(goal)) == (
+                goal in costs), f"{start} -> {goal}"
+        if grid[start[0]][start[1]] != reference.OBSTACLE and start not in seen:
+            count += 1
+            seen.update(costs)
+    assert components.component_count() == count
+
+
+def test_reachable_matches_dijkstra(reference, rng):
+    for _ in range(30):
+        rows, cols = rng.randint(1, 8), rng.randint(1, 8)
+        grid = reference.make_grid(rng, rows, cols, (0, 0, 1, 1, 2))
+        assert_matches_reference(reference, AdvancedAStarSearch(grid), grid)
+
+
+def test_reachable_after_set_cell(reference, rng):
+    for _ in range(15):
+        rows, cols = rng.randint(2, 7), rng.randint(2, 7)
+        grid = reference.make_grid(rng, rows, cols, (0, 0, 1, 1, 2))
+        astar = AdvancedAStarSearch(grid)
+        astar.components   # build it, so set_cell has to patch it
+        for _ in range(10):
+            row, col = rng.randrange(rows), rng.randrange(cols)
+            grid[row][col] = rng.choice((0, 1))
+            astar.set_cell((row, col), grid[row][col])
+            assert_matches_reference(reference, astar, grid)
@@ -0,0 +1,71 @@
+"""
+Contraction hierarchies: queries match GraphAStarSearch and a plain
+Dijkstra, also after a save/load round trip
+"""
+
+import pytest
+
+from main import AdvancedAStarSearch, ContractionHierarchy, GraphAStarSearch, RoadGraph
+
+
+def build(coordinates, edges, undirected=False):
+    sources, targets, weights = zip(*edges) if edges else ((), (), ())
+    return RoadGraph.from_edges(coordinates, sources, targets, weights, undirected)
+
+
+def assert_matches_references(reference, hierarchy, graph, edges, rng, queries=8):
+    search = GraphAStarSearch(graph)
+    for _ in range(queries):
+        start, goal = rng.randrange(graph.node_count), rng.randrange(graph.node_count)
+        path, cost, _ = hierarchy.search(start, goal)
+        expected = reference.graph_dijkstra(edges, start).get(goal)
+        assert cost == search.search(start, goal)[1]
+        if expected is None:
+            assert path is None
+            continue
+        assert cost == expected
+        assert path[0] == start and path[-1] == goal
+        assert reference.graph_path_cost(edges, path) == cost
+
+
+@pytest.mark.parametrize('settle_limit', [1, 64])
+@pytest.mark.parametrize('undirected', [False, True])
+def test_ch_after_save_load_matches_graph_search(reference, rng, tmp_path,
+                                                 settle_limit, undirected):
+    for trial in range(15):
+        node_count = rng.randint(1, 16)
+        coordinates, edges = reference.make_graph(rng, node_count, rng.randint(0, 50))
+        graph = build(coordinates, edges, undirected)
+        if undirected:
+            edges = edges + [(b, a, weight) for a, b, weight in edges]
+
+        built = ContractionHierarchy.build(graph, settle_limit)
+        assert_matches_references(reference, built, graph, edges, rng)
+
+        path = tmp_path / f"ch-{trial}.npz"
+        built.save(path)
+        loaded = ContractionHierarchy.load(path, graph)
+        assert_matches_references(reference, loaded, graph, edges, rng)
+
+
+def test_ch_on_a_grid_graph(reference, rng, tmp_path):
+    grid = reference.make_grid(rng, 7, 9)
+    graph = RoadGraph.from_grid(AdvancedAStarSearch(grid))
+    ContractionHierarchy.build(graph).save(tmp_path / 'grid.npz')
+    hierarchy = ContractionHierarchy.load(tmp_path / 'grid.npz', graph)
+    for _ in range(20):
+        start = (rng.randrange(7), rng.randrange(9))
+        goal = (rng.randrange(7), rng.randrange(9))
+        path, cost, _ = hierarchy.search(start[0] * 9 + start[1], goal[0] * 9 + goal[1])
+        assert cost == reference.dijkstra(grid, start).get(goal, float('inf'))
+        if path is not None:
+            cells = [tuple(graph.coordinates[node].astype(int)) for node in path]
+            assert reference.path_cost(grid, cells) == cost
+
+
+def test_loading_for_another_graph_fails(reference, rng, tmp_path):
+    coordinates, edges = reference.make_graph(rng, 8, 20)
+    ContractionHierarchy.build(build(coordinates, edges)).save(tmp_path / 'ch.npz')
+    changed = [(a, b, weight + 1) for a, b, weight in edges]
+    with pytest.raises(ValueError):
+        ContractionHierarchy.load(tmp_path / 'ch.npz', build(coordinates, changed))
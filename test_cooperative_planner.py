@@ -0,0 +1,55 @@
+"""
+Regression checks for CooperativePathPlanner (main.py)
+Run with pytest, or directly: python test_cooperative_planner.py
+"""
+
+from main import AdvancedAStarSearch, CooperativePathPlanner
+
+
+def occupancy(agents, result, horizon):
+    """(t, cell) -> agent, with failed agents parked on their start"""
+    cells = {}
+    for agent in result['failed']:
+        for t in range(horizon):
+            assert (t, agents[agent][0]) not in cells
+            cells[(t, agents[agent][0])] = agent
+    for agent, path in enumerate(result['paths']):
+        if path is None:
+            continue
+        for t in range(horizon):
+            cell = path[min(t, len(path) - 1)]
+            assert (t, cell) not in cells, f"agent {agent} collides at t={t}, {cell}"
+            cells[(t, cell)] = agent
+    return cells
+
+
+def test_failed_agent_stays_parked_on_its_start():
+    # Agent 0 is walled off from its goal, so it never leaves (0, 2);
+    # agent 1 must not drive through it
+    grid = [[0, 0, 0, 0, 0],
+            [1, 1, 1, 1, 1],
+            [0, 0, 0, 0, 0]]
+    agents = [((0, 2), (2, 2)), ((0, 0), (0, 4))]
+    result = CooperativePathPlanner(AdvancedAStarSearch(grid)).plan(agents)
+    assert result['failed'] == [0, 1]
+    assert result['paths'] == [None, None]
+    occupancy(agents, result, 10)
+
+
+def test_earlier_agent_is_replanned_around_a_failed_one():
+    # Agent 0 is planned first across (1, 2); agent 1 starts there but is
+    # boxed in by agent 0's goal, so agent 0 has to go around it
+    grid = [[0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0]]
+    agents = [((1, 0), (1, 4)), ((1, 2), (1, 4))]
+    result = CooperativePathPlanner(AdvancedAStarSearch(grid)).plan(agents)
+    assert result['failed'] == [1]
+    assert (1, 2) not in result['paths'][0]
+    occupancy(agents, result, 12)
+
+
+if __name__ == '__main__':
+    test_failed_agent_stays_parked_on_its_start()
+    test_earlier_agent_is_replanned_around_a_failed_one()
+    print("ok")
@@ -0,0 +1,76 @@
+"""
+DistanceMatrixBuilder: serial, parallel and cached matrices all match a
+plain Dijkstra, and cached ones are dropped once the grid changes
+"""
+
+import math
+import os
+
+import numpy as np
+
+from main import AdvancedAStarSearch, DistanceMatrixBuilder
+
+
+def expected_matrix(reference, grid, points):
+    return np.array([[reference.dijkstra(grid, source).get(target, math.inf)
+                      for target in points] for source in points], dtype=np.float32)
+
+
+def random_points(rng, rows, cols, count):
+    return [(rng.randrange(rows), rng.randrange(cols)) for _ in range(count)]
+
+
+def test_serial_matrix_matches_dijkstra(reference, rng):
+    for _ in range(15):
+        rows, cols = rng.randint(1, 9), rng.randint(1, 9)
+        grid = reference.make_grid(rng, rows, cols)
+        points = random_points(rng, rows, cols, rng.randint(1, 8))
+        with DistanceMatrixBuilder(AdvancedAStarSearch(grid)) as builder:
+            matrix = builder.build(points)
+            assert builder.search_stats['source'] == 'serial'
+            np.testing.assert_array_equal(matrix, expected_matrix(reference, grid, points))
+            assert builder.build(points) is matrix
+            assert builder.search_stats['source'] == 'memory'
+
+
+def test_parallel_matrix_matches_dijkstra(reference, rng):
+    rows, cols = 10, 12
+    grid = reference.make_grid(rng, rows, cols)
+    points = random_points(rng, rows, cols, 12)
+    with DistanceMatrixBuilder(AdvancedAStarSearch(grid), max_workers=2,
+                               parallel_threshold=4) as builder:
+        matrix = builder.build(points)
+        assert builder.search_stats['source'] == 'built'
+        np.testing.assert_array_equal(matrix, expected_matrix(reference, grid, points))
+
+
+def test_cache_dir_reuse_and_invalidation(reference, rng, tmp_path):
+    rows, cols = 7, 8
+    grid = reference.make_grid(rng, rows, cols)
+    points = random_points(rng, rows, cols, 6)
+    astar = AdvancedAStarSearch(grid)
+
+    first = DistanceMatrixBuilder(astar, cache_dir=tmp_path, max_workers=1)
+    np.testing.assert_array_equal(first.build(points), expected_matrix(reference, grid, points))
+    assert first.search_stats['source'] == 'built'
+
+    second = DistanceMatrixBuilder(astar, cache_dir=tmp_path)
+    np.testing.assert_array_equal(second.build(points), expected_matrix(reference, grid, points))
+    assert second.search_stats['source'] == 'disk'
+
+    # A terrain edit changes the fingerprint: neither memory nor disk is reused
+    row, col = points[0]
+    grid[row][col] = 3 if grid[row][col] != 3 else 0
+    astar.set_cell((row, col), grid[row][col])
+    np.testing.assert_array_equal(second.build(points), expected_matrix(reference, grid, points))
+    assert second.search_stats['source'] == 'built'
+
+
+def test_close_removes_the_scratch_directory(reference, rng):
+    grid = reference.make_grid(rng, 6, 6)
+    builder = DistanceMatrixBuilder(AdvancedAStarSearch(grid), parallel_threshold=2,
+                                    max_workers=1)
+    builder.build(random_points(rng, 6, 6, 3))
+    directory = os.path.dirname(builder.search_stats['path'])
+    builder.close()
+    assert not os.path.exists(directory)
@@ -0,0 +1,70 @@
+"""
+Regression checks for DStarLitePlanner (main.py), and its replans
+against a plain Dijkstra after set_cell updates
+Run with pytest, or directly: python test_dstar_lite.py
+"""
+
+import pytest
+
+from main import AdvancedAStarSearch, DStarLitePlanner
+
+
+def test_blocked_start_steps_off_like_search():
+    # The van sits on an obstacle; like search(), it may still step off
+    grid = [[1, 0, 0],
+            [0, 0, 0]]
+    path, cost, _ = DStarLitePlanner(AdvancedAStarSearch(grid), (0, 0), (1, 2)).plan()
+    reference_path, reference_cost, _ = AdvancedAStarSearch(grid).search((0, 0), (1, 2))
+    assert cost == reference_cost == 3
+    assert path[0] == (0, 0) and path[-1] == (1, 2)
+    assert len(path) == len(reference_path)
+
+
+def assert_plan_is_optimal(reference, planner, grid, start, goal):
+    path, cost, _ = planner.plan()
+    expected = reference.dijkstra(grid, start).get(goal)
+    if expected is None:
+        assert path is None
+        return
+    assert cost == expected
+    assert path[0] == start and path[-1] == goal
+    assert reference.path_cost(grid, path) == cost
+
+
+def test_replans_match_dijkstra_after_updates(reference, rng):
+    for _ in range(30):
+        rows, cols = rng.randint(2, 10), rng.randint(2, 10)
+        grid = reference.make_grid(rng, rows, cols)
+        start = (rng.randrange(rows), rng.randrange(cols))
+        goal = (rng.randrange(rows), rng.randrange(cols))
+        planner = DStarLitePlanner(AdvancedAStarSearch(grid), start, goal)
+        assert_plan_is_optimal(reference, planner, grid, start, goal)
+        for _ in range(8):
+            changes = []
+            for _ in range(rng.randint(1, 3)):
+                row, col = rng.randrange(rows), rng.randrange(cols)
+                grid[row][col] = rng.choice((0, 1, 2, 3))
+                changes.append(((row, col), grid[row][col]))
+            planner.update_cells(changes)
+            assert_plan_is_optimal(reference, planner, grid, start, goal)
+
+
+def test_replans_match_dijkstra_while_driving(reference, rng):
+    for _ in range(30):
+        rows, cols = rng.randint(3, 10), rng.randint(3, 10)
+        grid = reference.make_grid(rng, rows, cols, (0, 0, 0, 0, 1, 2))
+        start, goal = (0, 0), (rows - 1, cols - 1)
+        planner = DStarLitePlanner(AdvancedAStarSearch(grid), start, goal)
+        path, _, _ = planner.plan()
+        while path is not None and len(path) > 1:
+            start = path[1]
+            planner.move_to(start)
+            row, col = rng.randrange(rows), rng.randrange(cols)
+            grid[row][col] = rng.choice((0, 1, 2))
+            planner.update_cell((row, col), grid[row][col])
+            assert_plan_is_optimal(reference, planner, grid, start, goal)
+            path, _, _ = planner.plan()
+
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__]))
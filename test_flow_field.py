@@ -0,0 +1,43 @@
+"""
+Flow fields: every start's field_search route is optimal against a plain
+Dijkstra, including after set_cell edits reach cached fields
+"""
+
+from main import AdvancedAStarSearch
+
+
+def assert_field_matches_reference(reference, astar, grid, goal):
+    rows, cols = len(grid), len(grid[0])
+    for start in ((row, col) for row in range(rows) for col in range(cols)):
+        path, cost, _ = astar.field_search(start, goal)
+        expected = reference.dijkstra(grid, start).get(goal)
+        if expected is None:
+            assert path is None, f"{start} -> {goal}"
+            continue
+        assert cost == expected, f"{start} -> {goal}"
+        assert path[0] == start and path[-1] == goal
+        assert reference.path_cost(grid, path) == cost
+
+
+def test_field_routes_are_optimal(reference, rng):
+    for _ in range(20):
+        rows, cols = rng.randint(1, 8), rng.randint(2, 8)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid)
+        goal = (rng.randrange(rows), rng.randrange(cols))
+        assert_field_matches_reference(reference, astar, grid, goal)
+        assert astar.search_stats['field_built'] is False   # Built once, then walked
+
+
+def test_cached_fields_follow_set_cell(reference, rng):
+    for _ in range(10):
+        rows, cols = rng.randint(2, 7), rng.randint(2, 7)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid)
+        goals = [(rng.randrange(rows), rng.randrange(cols)) for _ in range(3)]
+        for _ in range(8):
+            for goal in goals:
+                assert_field_matches_reference(reference, astar, grid, goal)
+            row, col = rng.randrange(rows), rng.randrange(cols)
+            grid[row][col] = rng.choice((0, 1, 2, 3))
+            astar.set_cell((row, col), grid[row][col])
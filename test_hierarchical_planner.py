@@ -0,0 +1,71 @@
+"""
+HierarchicalPathPlanner (HPA*): finds a valid route whenever one exists,
+never cheaper than the Dijkstra optimum, and stays correct through
+update_cell and a save/load round trip
+"""
+
+import pytest
+
+from main import AdvancedAStarSearch, HierarchicalPathPlanner
+
+
+def assert_valid_route(reference, planner, grid, start, goal):
+    path, cost, _ = planner.search(start, goal)
+    optimal = reference.dijkstra(grid, start).get(goal)
+    if optimal is None:
+        assert path is None
+        return
+    assert path is not None, f"{start} -> {goal} is reachable"
+    assert path[0] == start and path[-1] == goal
+    assert reference.path_cost(grid, path) == cost >= optimal
+
+
+def random_cells(rng, rows, cols, count):
+    return [((rng.randrange(rows), rng.randrange(cols)),
+             (rng.randrange(rows), rng.randrange(cols))) for _ in range(count)]
+
+
+@pytest.mark.parametrize('cluster_size', [3, 4, 7])
+def test_hpa_routes_are_valid(reference, rng, cluster_size):
+    for _ in range(25):
+        rows, cols = rng.randint(2, 16), rng.randint(2, 16)
+        grid = reference.make_grid(rng, rows, cols)
+        planner = HierarchicalPathPlanner(AdvancedAStarSearch(grid), cluster_size)
+        for start, goal in random_cells(rng, rows, cols, 5):
+            assert_valid_route(reference, planner, grid, start, goal)
+
+
+def test_hpa_is_exact_within_an_open_cluster():
+    grid = [[0] * 8 for _ in range(8)]
+    planner = HierarchicalPathPlanner(AdvancedAStarSearch(grid), 8)
+    path, cost, _ = planner.search((0, 0), (7, 7))
+    assert cost == 14 and len(path) == 15
+
+
+def test_hpa_after_update_cell(reference, rng):
+    for _ in range(10):
+        rows, cols = rng.randint(4, 14), rng.randint(4, 14)
+        grid = reference.make_grid(rng, rows, cols)
+        planner = HierarchicalPathPlanner(AdvancedAStarSearch(grid), 4)
+        for _ in range(10):
+            row, col = rng.randrange(rows), rng.randrange(cols)
+            grid[row][col] = rng.choice((0, 1, 2, 3))
+            planner.update_cell((row, col), grid[row][col])
+            for start, goal in random_cells(rng, rows, cols, 2):
+                assert_valid_route(reference, planner, grid, start, goal)
+
+
+def test_hpa_save_load_round_trip(reference, rng, tmp_path):
+    rows, cols = 13, 11
+    grid = reference.make_grid(rng, rows, cols)
+    astar = AdvancedAStarSearch(grid)
+    built = HierarchicalPathPlanner(astar, 4)
+    built.save(tmp_path / 'hpa.npz')
+    loaded = HierarchicalPathPlanner.load(tmp_path / 'hpa.npz', astar)
+    for start, goal in random_cells(rng, rows, cols, 20):
+        assert loaded.search(start, goal)[1] == built.search(start, goal)[1]
+        assert_valid_route(reference, loaded, grid, start, goal)
+
+    astar.set_cell((0, 0), 1 if grid[0][0] != 1 else 0)
+    with pytest.raises(ValueError):
+        HierarchicalPathPlanner.load(tmp_path / 'hpa.npz', astar)
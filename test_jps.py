@@ -0,0 +1,48 @@
+"""
+Jump Point Search mode: optimal against a plain Dijkstra, before and
+after set_cell edits patch its jump tables
+"""
+
+import pytest
+
+from main import AdvancedAStarSearch
+
+
+def assert_matches_reference(reference, astar, grid, start, goal):
+    path, cost, _ = astar.search(start, goal)
+    expected = reference.dijkstra(grid, start).get(goal)
+    if expected is None:
+        assert path is None
+        return
+    assert cost == expected
+    assert path[0] == start and path[-1] == goal
+    assert reference.path_cost(grid, path) == cost
+
+
+@pytest.mark.parametrize('terrains', [(0, 0, 0, 0, 0, 0, 1),
+                                      (0, 0, 0, 0, 1, 2, 3)],
+                         ids=['open', 'mixed'])
+def test_jps_cost_is_optimal(reference, rng, terrains):
+    for _ in range(40):
+        rows, cols = rng.randint(1, 12), rng.randint(1, 12)
+        grid = reference.make_grid(rng, rows, cols, terrains)
+        astar = AdvancedAStarSearch(grid, algorithm='jps')
+        for _ in range(4):
+            start = (rng.randrange(rows), rng.randrange(cols))
+            goal = (rng.randrange(rows), rng.randrange(cols))
+            assert_matches_reference(reference, astar, grid, start, goal)
+
+
+def test_jps_after_set_cell(reference, rng):
+    for _ in range(15):
+        rows, cols = rng.randint(3, 12), rng.randint(3, 12)
+        grid = reference.make_grid(rng, rows, cols, (0, 0, 0, 0, 0, 1))
+        astar = AdvancedAStarSearch(grid, algorithm='jps')
+        astar.search((0, 0), (rows - 1, cols - 1))   # build the jump tables
+        for _ in range(12):
+            row, col = rng.randrange(rows), rng.randrange(cols)
+            grid[row][col] = rng.choice((0, 0, 1, 2))
+            astar.set_cell((row, col), grid[row][col])
+            start = (rng.randrange(rows), rng.randrange(cols))
+            goal = (rng.randrange(rows), rng.randrange(cols))
+            assert_matches_reference(reference, astar, grid, start, goal)
@@ -0,0 +1,82 @@
+"""
+k_shortest_paths (Yen) against brute-force enumeration of every simple
+path on tiny grids
+"""
+
+from collections import Counter
+
+from main import AdvancedAStarSearch
+
+
+def all_simple_path_costs(reference, grid, start, goal):
+    """Cost of every loopless start -> goal path, by depth-first search"""
+    costs = []
+    path = [start]
+    on_path = {start}
+
+    def extend(cell, cost):
+        if cell == goal:
+            costs.append(cost)
+            return
+        for neighbor in reference.neighbors(grid, cell):
+            step = reference.entry_cost(grid, neighbor)
+            if step is None or neighbor in on_path:
+                continue
+            path.append(neighbor)
+            on_path.add(neighbor)
+            extend(neighbor, cost + step)
+            on_path.discard(path.pop())
+
+    extend(start, 0)
+    return sorted(costs)
+
+
+def assert_routes_are_valid(reference, grid, routes, start, goal):
+    assert len({tuple(route['path']) for route in routes}) == len(routes)
+    for route in routes:
+        path = route['path']
+        assert path[0] == start and path[-1] == goal
+        assert len(set(path)) == len(path)
+        assert reference.path_cost(grid, path) == route['cost']
+        entered = Counter(grid[row][col] for row, col in path[1:])
+        assert {terrain: entry['cells'] for terrain, entry in route['breakdown'].items()} == entered
+        assert sum(entry['cost'] for entry in route['breakdown'].values()) == route['cost']
+
+
+def test_k_shortest_costs_match_brute_force(reference, rng):
+    for _ in range(40):
+        rows, cols = rng.randint(1, 3), rng.randint(1, 4)
+        grid = reference.make_grid(rng, rows, cols, (0, 0, 0, 1, 2, 3))
+        start = (rng.randrange(rows), rng.randrange(cols))
+        goal = (rng.randrange(rows), rng.randrange(cols))
+        if start == goal:
+            continue
+        expected = all_simple_path_costs(reference, grid, start, goal)
+        k = rng.randint(1, 8)
+        routes = AdvancedAStarSearch(grid).k_shortest_paths(start, goal, k)
+        assert [route['cost'] for route in routes] == expected[:k]
+        assert_routes_are_valid(reference, grid, routes, start, goal)
+
+
+def test_asking_for_more_resumes_the_enumeration(reference, rng):
+    for _ in range(15):
+        grid = reference.make_grid(rng, 3, 4, (0, 0, 0, 0, 2, 3))
+        start, goal = (0, 0), (2, 3)
+        expected = all_simple_path_costs(reference, grid, start, goal)
+        astar = AdvancedAStarSearch(grid)
+        first = astar.k_shortest_paths(start, goal, 3)
+        more = astar.k_shortest_paths(start, goal, 9)
+        assert [route['path'] for route in more[:3]] == [route['path'] for route in first]
+        assert [route['cost'] for route in more] == expected[:9]
+        assert_routes_are_valid(reference, grid, more, start, goal)
+
+
+def test_edits_restart_the_enumeration(reference, rng):
+    grid = reference.make_grid(rng, 3, 4, (0, 0, 0, 2))
+    astar = AdvancedAStarSearch(grid)
+    astar.k_shortest_paths((0, 0), (2, 3), 4)
+    grid[1][1] = 3
+    astar.set_cell((1, 1), 3)
+    routes = astar.k_shortest_paths((0, 0), (2, 3), 6)
+    assert [route['cost'] for route in routes] == all_simple_path_costs(
+        reference, grid, (0, 0), (2, 3))[:6]
@@ -0,0 +1,92 @@
+"""
+ALT landmark heuristic: admissible against a plain Dijkstra, optimal
+searches, and tables that survive save/load and cost increases
+"""
+
+import pytest
+
+from main import AdvancedAStarSearch, LandmarkTables
+
+
+def test_alt_heuristic_is_admissible(reference, rng):
+    for _ in range(20):
+        rows, cols = rng.randint(1, 9), rng.randint(1, 9)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid, 'alt')
+        astar.build_landmarks(rng.randint(1, 4))
+        goal = (rng.randrange(rows), rng.randrange(cols))
+        h = astar.landmarks.heuristic(astar.to_index(goal))
+        for row in range(rows):
+            for col in range(cols):
+                to_goal = reference.dijkstra(grid, (row, col)).get(goal)
+                if to_goal is not None:
+                    assert h(astar.to_index((row, col))) <= to_goal + 1e-6
+
+
+@pytest.mark.parametrize('algorithm', ['astar', 'bidirectional', 'bounded'])
+def test_alt_search_is_optimal(reference, rng, algorithm):
+    for _ in range(30):
+        rows, cols = rng.randint(1, 10), rng.randint(1, 10)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid, 'alt', algorithm=algorithm)
+        for _ in range(4):
+            start = (rng.randrange(rows), rng.randrange(cols))
+            goal = (rng.randrange(rows), rng.randrange(cols))
+            path, cost, _ = astar.search(start, goal)
+            expected = reference.dijkstra(grid, start).get(goal)
+            if expected is None:
+                assert path is None
+            else:
+                assert cost == expected
+                assert reference.path_cost(grid, path) == cost
+
+
+def test_tables_kept_after_cost_increase_stay_optimal(reference, rng):
+    for _ in range(10):
+        rows, cols = rng.randint(3, 10), rng.randint(3, 10)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid, 'alt')
+        tables = astar.build_landmarks(4)
+        for _ in range(6):
+            row, col = rng.randrange(rows), rng.randrange(cols)
+            if grid[row][col] in (0, 2):
+                grid[row][col] = {0: 2, 2: 3}[grid[row][col]]   # Only ever dearer
+                astar.set_cell((row, col), grid[row][col])
+            start = (rng.randrange(rows), rng.randrange(cols))
+            goal = (rng.randrange(rows), rng.randrange(cols))
+            assert astar.search(start, goal)[1] == reference.dijkstra(grid, start).get(
+                goal, float('inf'))
+        assert astar.landmarks is tables
+
+
+def test_save_load_round_trip(reference, rng, tmp_path):
+    grid = reference.make_grid(rng, 8, 9)
+    astar = AdvancedAStarSearch(grid, 'alt')
+    built = astar.build_landmarks(3)
+    built.save(tmp_path / 'tables')   # .npz is appended
+
+    loaded = AdvancedAStarSearch(grid, 'alt').load_landmarks(tmp_path / 'tables.npz')
+    assert loaded.landmarks == built.landmarks
+    assert (loaded.from_landmark == built.from_landmark).all()
+    assert (loaded.to_landmark == built.to_landmark).all()
+
+    other = [row[:] for row in grid]
+    other[0][0] = 3 if grid[0][0] != 3 else 0
+    with pytest.raises(ValueError):
+        AdvancedAStarSearch(other, 'alt').load_landmarks(tmp_path / 'tables.npz')
+
+
+def test_landmark_path_reuses_fresh_tables(reference, rng, tmp_path, monkeypatch):
+    grid = reference.make_grid(rng, 6, 6)
+    astar = AdvancedAStarSearch(grid, 'alt')
+    astar.landmark_path = str(tmp_path / 'grid.alt.npz')
+    astar.search((0, 0), (5, 5))
+    assert (tmp_path / 'grid.alt.npz').exists()
+
+    def rebuild(*args):
+        raise AssertionError("fresh tables on disk were rebuilt")
+    monkeypatch.setattr(LandmarkTables, 'build', rebuild)
+    again = AdvancedAStarSearch(grid, 'alt')
+    again.landmark_path = astar.landmark_path
+    again.search((0, 0), (5, 5))
+    assert again.landmarks.landmarks == astar.landmarks.landmarks
@@ -0,0 +1,75 @@
+"""
+Map-image ingestion: nearest-color terrain, the .npy cache, and searches
+over a decoded map against a plain Dijkstra
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from main import (MAP_COLOR_TERRAIN, AdvancedAStarSearch, load_map_image,
+                  terrain_cache_path, terrain_from_rgb)
+
+
+def nearest_terrain(color):
+    return min(MAP_COLOR_TERRAIN.items(),
+               key=lambda entry: sum((a - b) ** 2 for a, b in zip(entry[0], color)))[1]
+
+
+def test_terrain_from_rgb_picks_the_nearest_color(rng):
+    pixels = np.array([[[rng.randrange(256) for _ in range(3)] for _ in range(7)]
+                       for _ in range(5)], dtype=np.uint8)
+    terrain = terrain_from_rgb(pixels)
+    assert terrain.dtype == np.uint8 and terrain.shape == (5, 7)
+    for row in range(5):
+        for col in range(7):
+            assert terrain[row, col] == nearest_terrain(pixels[row, col].tolist())
+    with pytest.raises(ValueError):
+        terrain_from_rgb(pixels[..., :2])
+
+
+def write_map(rng, path, rows, cols):
+    """PNG of exact palette colors; returns the terrain it encodes"""
+    Image = pytest.importorskip('PIL.Image')
+    colors = list(MAP_COLOR_TERRAIN)
+    picks = [[rng.choice(colors) for _ in range(cols)] for _ in range(rows)]
+    Image.fromarray(np.array(picks, dtype=np.uint8)).save(path)
+    return [[MAP_COLOR_TERRAIN[color] for color in row] for row in picks]
+
+
+def test_map_image_is_cached_and_searchable(reference, rng, tmp_path, monkeypatch):
+    image_path = str(tmp_path / 'map.png')
+    grid = write_map(rng, image_path, 9, 11)
+
+    astar = AdvancedAStarSearch.from_map_image(image_path, heuristic_type='manhattan')
+    np.testing.assert_array_equal(astar.grid, grid)
+    assert os.path.exists(terrain_cache_path(image_path))
+    assert astar.landmark_path == str(tmp_path / 'map.alt.npz')
+    for _ in range(10):
+        start = (rng.randrange(9), rng.randrange(11))
+        goal = (rng.randrange(9), rng.randrange(11))
+        assert astar.search(start, goal)[1] == reference.dijkstra(grid, start).get(
+            goal, float('inf'))
+
+    # Later loads come from the cache, without Pillow, memory-mapped
+    monkeypatch.setitem(sys.modules, 'PIL', None)
+    cached = load_map_image(image_path)
+    assert isinstance(cached, np.memmap)
+    np.testing.assert_array_equal(cached, grid)
+
+    # Edits stay in memory; the cache file is untouched
+    edited = AdvancedAStarSearch(load_map_image(image_path))
+    edited.set_cell((0, 0), 1 if grid[0][0] != 1 else 0)
+    np.testing.assert_array_equal(load_map_image(image_path), grid)
+
+
+def test_stale_cache_is_rebuilt(rng, tmp_path):
+    image_path = str(tmp_path / 'map.png')
+    write_map(rng, image_path, 4, 4)
+    load_map_image(image_path)
+    grid = write_map(rng, image_path, 5, 3)
+    cache = terrain_cache_path(image_path)
+    os.utime(cache, (0, 0))   # Older than the new image
+    np.testing.assert_array_equal(load_map_image(image_path), grid)
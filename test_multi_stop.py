@@ -0,0 +1,59 @@
+"""
+MultiStopRoutePlanner: its distance matrix matches a plain Dijkstra, and
+its tours visit every reachable stop once along a valid, stitched path
+"""
+
+import itertools
+import math
+
+import pytest
+
+from main import AdvancedAStarSearch, MultiStopRoutePlanner
+
+
+def random_points(rng, rows, cols, count):
+    return [(rng.randrange(rows), rng.randrange(cols)) for _ in range(count)]
+
+
+def test_distance_matrix_matches_dijkstra(reference, rng):
+    for _ in range(15):
+        rows, cols = rng.randint(2, 9), rng.randint(2, 9)
+        grid = reference.make_grid(rng, rows, cols)
+        points = random_points(rng, rows, cols, rng.randint(1, 6))
+        matrix, _ = MultiStopRoutePlanner(AdvancedAStarSearch(grid)).distance_matrix(points)
+        for i, source in enumerate(points):
+            costs = reference.dijkstra(grid, source)
+            for j, target in enumerate(points):
+                assert matrix[i][j] == costs.get(target, math.inf)
+
+
+@pytest.mark.parametrize('return_to_depot', [True, False])
+def test_tour_is_valid_and_no_worse_than_input_order(reference, rng, return_to_depot):
+    for _ in range(20):
+        rows, cols = rng.randint(3, 9), rng.randint(3, 9)
+        grid = reference.make_grid(rng, rows, cols)
+        depot, *stops = random_points(rng, rows, cols, rng.randint(2, 6))
+        result = MultiStopRoutePlanner(AdvancedAStarSearch(grid)).plan(
+            depot, stops, return_to_depot)
+
+        from_depot = reference.dijkstra(grid, depot)
+        reachable = [stop for stop in stops if stop in from_depot and
+                     (not return_to_depot or depot in reference.dijkstra(grid, stop))]
+        assert sorted(result['order']) == sorted(reachable)
+        assert sorted(result['unreachable']) == sorted(stop for stop in stops
+                                                       if stop not in reachable)
+
+        path = result['path']
+        assert path[0] == depot
+        assert path[-1] == (depot if return_to_depot else (result['order'] or [depot])[-1])
+        assert reference.path_cost(grid, path) == result['cost']
+        assert result['cost'] == sum(leg['cost'] for leg in result['legs'])
+
+        # Never worse than the order given, nor better than any order at all
+        if not result['unreachable']:
+            assert result['cost'] <= result['input_order_cost']
+        tail = [depot] if return_to_depot else []
+        best = min(sum(reference.dijkstra(grid, a)[b] for a, b in zip(visits, visits[1:]))
+                   for visits in ([depot, *order, *tail]
+                                  for order in itertools.permutations(reachable)))
+        assert result['cost'] >= best
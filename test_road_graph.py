@@ -0,0 +1,86 @@
+"""
+RoadGraph CSR construction and GraphAStarSearch against a plain Dijkstra
+over the same edge list
+"""
+
+import numpy as np
+import pytest
+
+from main import AdvancedAStarSearch, GraphAStarSearch, RoadGraph
+
+
+def build(coordinates, edges, undirected=False):
+    sources, targets, weights = zip(*edges) if edges else ((), (), ())
+    return RoadGraph.from_edges(coordinates, sources, targets, weights, undirected)
+
+
+def test_csr_holds_every_edge(reference, rng):
+    for _ in range(20):
+        coordinates, edges = reference.make_graph(rng, rng.randint(1, 12), rng.randint(0, 40))
+        graph = build(coordinates, edges)
+        assert graph.node_count == len(coordinates) and graph.edge_count == len(edges)
+        rebuilt = sorted((node, int(target), int(weight))
+                         for node in range(graph.node_count)
+                         for target, weight in zip(
+                             graph.targets[graph.offsets[node]:graph.offsets[node + 1]],
+                             graph.weights[graph.offsets[node]:graph.offsets[node + 1]]))
+        assert rebuilt == sorted(edges)
+
+
+def test_bad_edges_are_rejected():
+    with pytest.raises(ValueError):
+        RoadGraph.from_edges([(0, 0), (1, 0)], [0], [2], [1.0])
+    with pytest.raises(ValueError):
+        RoadGraph.from_edges([(0, 0), (1, 0)], [0], [1], [-1.0])
+
+
+@pytest.mark.parametrize('heuristic_type', GraphAStarSearch.HEURISTICS)
+@pytest.mark.parametrize('undirected', [False, True])
+def test_graph_search_is_optimal(reference, rng, heuristic_type, undirected):
+    for _ in range(30):
+        node_count = rng.randint(1, 15)
+        coordinates, edges = reference.make_graph(rng, node_count, rng.randint(0, 45))
+        search = GraphAStarSearch(build(coordinates, edges, undirected), heuristic_type)
+        if undirected:
+            edges = edges + [(b, a, weight) for a, b, weight in edges]
+        for _ in range(5):
+            start, goal = rng.randrange(node_count), rng.randrange(node_count)
+            path, cost, _ = search.search(start, goal)
+            expected = reference.graph_dijkstra(edges, start).get(goal)
+            if expected is None:
+                assert path is None
+                continue
+            assert cost == expected
+            assert path[0] == start and path[-1] == goal
+            assert reference.graph_path_cost(edges, path) == cost
+
+
+def test_grid_graph_matches_grid_search(reference, rng):
+    for _ in range(10):
+        rows, cols = rng.randint(1, 8), rng.randint(1, 8)
+        grid = reference.make_grid(rng, rows, cols)
+        graph = RoadGraph.from_grid(AdvancedAStarSearch(grid))
+        search = GraphAStarSearch(graph)
+        for _ in range(5):
+            start = (rng.randrange(rows), rng.randrange(cols))
+            goal = (rng.randrange(rows), rng.randrange(cols))
+            path, cost, _ = search.search(start[0] * cols + start[1], goal[0] * cols + goal[1])
+            assert cost == reference.dijkstra(grid, start).get(goal, float('inf'))
+            if path is not None:
+                cells = [tuple(graph.coordinates[node].astype(int)) for node in path]
+                assert reference.path_cost(grid, cells) == cost
+
+
+def test_edge_list_files_round_trip(reference, rng, tmp_path):
+    coordinates, edges = reference.make_graph(rng, 10, 30)
+    (tmp_path / 'nodes.txt').write_text(
+        '# id x y\n' + ''.join(f"{node} {x} {y}\n" for node, (x, y) in enumerate(coordinates)))
+    (tmp_path / 'edges.txt').write_text(
+        '# source target weight\n' + ''.join(f"{a} {b} {w}\n" for a, b, w in edges))
+    loaded = RoadGraph.load_edge_list(tmp_path / 'edges.txt', tmp_path / 'nodes.txt',
+                                      chunk_lines=4)
+    built = build(coordinates, edges)
+    np.testing.assert_array_equal(loaded.coordinates, built.coordinates)
+    np.testing.assert_array_equal(loaded.offsets, built.offsets)
+    np.testing.assert_array_equal(loaded.targets, built.targets)
+    np.testing.assert_array_equal(loaded.weights, built.weights)
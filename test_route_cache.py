@@ -0,0 +1,50 @@
+"""
+The versioned route cache: cached answers stay optimal through grid
+edits, and the LRU bound holds
+"""
+
+from main import AdvancedAStarSearch
+
+
+def test_cached_answers_survive_edits_correctly(reference, rng):
+    for _ in range(10):
+        rows, cols = rng.randint(3, 9), rng.randint(3, 9)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid, 'manhattan', cache_size=64)
+        queries = [((rng.randrange(rows), rng.randrange(cols)),
+                    (rng.randrange(rows), rng.randrange(cols))) for _ in range(6)]
+        for _ in range(15):
+            if rng.random() < 0.5:
+                row, col = rng.randrange(rows), rng.randrange(cols)
+                grid[row][col] = rng.choice((0, 1, 2, 3))
+                astar.set_cell((row, col), grid[row][col])
+            for start, goal in queries:
+                path, cost, _ = astar.search(start, goal)
+                assert cost == reference.dijkstra(grid, start).get(goal, float('inf'))
+                if path is not None:
+                    assert reference.path_cost(grid, path) == cost
+        assert astar.route_cache.stats()['hits'] > 0
+
+
+def test_terrain_cost_edit_invalidates(reference):
+    grid = [[0, 2, 0],
+            [0, 0, 0]]
+    astar = AdvancedAStarSearch(grid, 'manhattan', cache_size=8)
+    assert astar.search((0, 0), (0, 2))[1] == 3
+    astar.terrain_costs[0] = 4
+    costs = {**reference.DEFAULT_COSTS, 0: 4}
+    assert astar.search((0, 0), (0, 2))[1] == reference.dijkstra(grid, (0, 0), costs)[(0, 2)] == 6
+
+
+def test_lru_eviction():
+    astar = AdvancedAStarSearch([[0] * 5], 'manhattan', cache_size=2)
+    astar.search((0, 0), (0, 1))
+    astar.search((0, 0), (0, 2))
+    astar.search((0, 0), (0, 1))   # refreshes (0, 1)
+    astar.search((0, 0), (0, 3))   # evicts (0, 2)
+    stats = astar.route_cache.stats()
+    assert stats['size'] == 2 and stats['evictions'] == 1 and stats['hits'] == 1
+    astar.search((0, 0), (0, 1))
+    assert astar.search_stats.get('cache_hit')
+    astar.search((0, 0), (0, 2))
+    assert not astar.search_stats.get('cache_hit')
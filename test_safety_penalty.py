@@ -0,0 +1,50 @@
+"""
+The manhattan_safe penalty field against a direct 3x3 obstacle count
+"""
+
+import numpy as np
+
+from main import AdvancedAStarSearch
+
+
+def naive_penalty(grid, obstacle):
+    rows, cols = len(grid), len(grid[0])
+    penalty = np.zeros((rows, cols))
+    for row in range(rows):
+        for col in range(cols):
+            penalty[row, col] = 0.5 * sum(
+                grid[r][c] == obstacle
+                for r in range(max(row - 1, 0), min(row + 2, rows))
+                for c in range(max(col - 1, 0), min(col + 2, cols)))
+    return penalty
+
+
+def test_penalty_counts_obstacles_in_3x3(reference, rng):
+    for _ in range(30):
+        rows, cols = rng.randint(1, 9), rng.randint(1, 9)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid)
+        np.testing.assert_array_equal(astar.safety_penalty,
+                                      naive_penalty(grid, reference.OBSTACLE))
+
+
+def test_penalty_follows_set_cell(reference, rng):
+    for _ in range(10):
+        rows, cols = rng.randint(2, 8), rng.randint(2, 8)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid)
+        astar.safety_penalty  # build it, so set_cell has to patch it
+        for _ in range(15):
+            row, col = rng.randrange(rows), rng.randrange(cols)
+            grid[row][col] = rng.choice((0, 1, 2))
+            astar.set_cell((row, col), grid[row][col])
+            np.testing.assert_array_equal(astar.safety_penalty,
+                                          naive_penalty(grid, reference.OBSTACLE))
+
+
+def test_heuristic_adds_penalty_to_manhattan():
+    grid = [[0, 1, 0],
+            [0, 0, 0]]
+    astar = AdvancedAStarSearch(grid)
+    assert astar.get_heuristic((1, 0), (1, 2)) == 2 + 0.5
+    assert astar.get_heuristic((0, 2), (1, 2)) == 1 + 0.5
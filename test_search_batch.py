@@ -0,0 +1,40 @@
+"""
+search_batch: worker processes return the same answers as serial searches
+"""
+
+import main
+from main import AdvancedAStarSearch
+
+
+def random_queries(rng, rows, cols, count):
+    return [((rng.randrange(rows), rng.randrange(cols)),
+             (rng.randrange(rows), rng.randrange(cols))) for _ in range(count)]
+
+
+def test_parallel_batch_matches_serial(reference, rng):
+    rows, cols = 12, 15
+    grid = reference.make_grid(rng, rows, cols)
+    grid[0][0] = 3   # a terrain cost the workers must receive
+    astar = AdvancedAStarSearch(grid, 'manhattan')
+    queries = random_queries(rng, rows, cols, 40)
+
+    serial = astar.search_batch(queries, max_workers=1)
+    parallel = astar.search_batch(queries, max_workers=2, chunksize=3)
+    assert len(parallel) == len(queries)
+    for query, one, other in zip(queries, serial, parallel):
+        assert (one['start'], one['goal']) == (other['start'], other['goal']) == query
+        assert one['cost'] == other['cost']
+        assert one['cost'] == reference.dijkstra(grid, query[0]).get(query[1], float('inf'))
+        if one['path'] is not None:
+            assert reference.path_cost(grid, other['path']) == other['cost']
+
+
+def test_batch_runs_serially_without_worker_processes(reference, rng, monkeypatch):
+    # As under Pyodide, where multiprocessing.shared_memory is missing
+    monkeypatch.setattr(main, '_worker_processes_available', lambda: False)
+    grid = reference.make_grid(rng, 8, 8)
+    astar = AdvancedAStarSearch(grid, 'manhattan')
+    queries = random_queries(rng, 8, 8, 10)
+    results = astar.search_batch(queries, max_workers=4)
+    assert [result['cost'] for result in results] == [
+        astar.search(start, goal)[1] for start, goal in queries]
@@ -0,0 +1,85 @@
+"""
+Search-trace files: varints, and binary and JSON round trips of real
+searches, ring traces and queries answered without searching
+"""
+
+import numpy as np
+import pytest
+
+from main import AdvancedAStarSearch, decode_varints, encode_varints, read_search_trace
+
+FORMATS = ['binary', 'json']
+
+
+def test_varints_round_trip(rng):
+    for _ in range(50):
+        magnitude = rng.choice((1, 100, 1 << 20, 1 << 62))
+        values = [rng.randint(-magnitude, magnitude) for _ in range(rng.randint(0, 40))]
+        encoded = encode_varints(values)
+        assert decode_varints(encoded).tolist() == values
+    assert len(encode_varints([0, 1, -1, 63, -64])) == 5   # One byte each
+    assert len(encode_varints([64, -65])) == 4
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_search_round_trip(reference, rng, tmp_path, fmt):
+    for trial in range(15):
+        rows, cols = rng.randint(1, 10), rng.randint(1, 10)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid, 'manhattan', trace_level='full')
+        start = (rng.randrange(rows), rng.randrange(cols))
+        goal = (rng.randrange(rows), rng.randrange(cols))
+        path, cost, _ = astar.search(start, goal)
+        file_path = tmp_path / f"trace-{trial}.{'json' if fmt == 'json' else 'bin'}"
+        astar.export_trace(file_path, path=path)
+        run = read_search_trace(file_path)
+
+        assert (run['rows'], run['cols']) == (rows, cols)
+        np.testing.assert_array_equal(run['grid'], grid)
+        if astar.trace.status == 'unreachable':
+            assert run['status'] == 'unreachable' and len(run['expanded']) == 0
+            assert run['cost'] == float('inf') and len(run['path']) == 0
+            continue
+        assert run['status'] is None and run['first_order'] == 0
+        assert run['cost'] == cost == reference.path_cost(grid, path)
+        assert [astar.to_position(index) for index in run['path'].tolist()] == path
+        np.testing.assert_array_equal(run['expanded'], astar.trace.indices())
+        np.testing.assert_array_equal(run['push_counts'], astar.trace.push_counts())
+        np.testing.assert_array_equal(run['pushes'],
+                                      np.frombuffer(astar.trace.pushes, dtype=np.int32))
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_ring_trace_round_trip(reference, rng, tmp_path, fmt):
+    grid = reference.make_grid(rng, 12, 12, (0, 0, 0, 2))
+    astar = AdvancedAStarSearch(grid, 'manhattan', trace_level='full', trace_capacity=10)
+    path, _, explored = astar.search((0, 0), (11, 11))
+    astar.export_trace(tmp_path / 'ring', path=path, include_grid=False, fmt=fmt)
+    run = read_search_trace(tmp_path / 'ring')
+    assert 'grid' not in run
+    assert run['first_order'] == explored - 10
+    np.testing.assert_array_equal(run['expanded'], astar.trace.indices())
+    assert len(run['pushes']) == len(run['push_counts']) == 0
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_answered_queries_export_flagged_empty_traces(tmp_path, fmt):
+    grid = [[0, 1, 0],
+            [0, 1, 0]]
+    astar = AdvancedAStarSearch(grid, trace_level='full', cache_size=4)
+    astar.search((0, 0), (0, 2))
+    astar.export_trace(tmp_path / 'unreachable', fmt=fmt)
+    assert read_search_trace(tmp_path / 'unreachable')['status'] == 'unreachable'
+
+    path, cost, _ = astar.search((0, 0), (1, 0))
+    astar.search((0, 0), (1, 0))
+    astar.export_trace(tmp_path / 'cached', path=path, fmt=fmt)
+    run = read_search_trace(tmp_path / 'cached')
+    assert run['status'] == 'cached' and len(run['expanded']) == 0
+    assert run['cost'] == cost and run['path'].tolist() == [0, 3]
+
+
+def test_not_a_trace_is_rejected(tmp_path):
+    (tmp_path / 'other.json').write_text('{"format": "something-else"}')
+    with pytest.raises(ValueError):
+        read_search_trace(tmp_path / 'other.json')
@@ -0,0 +1,62 @@
+"""
+The NumPy terrain grid: compiled arrays stay in step with set_cell and
+terrain_costs edits, and searches on the edited grid stay optimal
+"""
+
+import numpy as np
+import pytest
+
+from main import AdvancedAStarSearch
+
+
+def assert_compiled_like_fresh(astar, grid, terrain_costs=None):
+    fresh = AdvancedAStarSearch(grid)
+    if terrain_costs is not None:
+        fresh.terrain_costs = terrain_costs
+    np.testing.assert_array_equal(astar.grid, fresh.grid)
+    np.testing.assert_array_equal(astar.move_costs, fresh.move_costs)
+    np.testing.assert_array_equal(astar.passable, fresh.passable)
+    np.testing.assert_array_equal(astar.neighbor_masks, fresh.neighbor_masks)
+
+
+def test_grid_is_uint8_and_rejects_bad_input():
+    astar = AdvancedAStarSearch([[0, 2], [3, 1]])
+    assert astar.grid.dtype == np.uint8 and astar.grid.shape == (2, 2)
+    with pytest.raises(ValueError):
+        AdvancedAStarSearch([[0, 256]])
+    with pytest.raises(ValueError):
+        AdvancedAStarSearch([])
+
+
+def test_set_cell_matches_a_fresh_grid(reference, rng):
+    for _ in range(20):
+        rows, cols = rng.randint(2, 8), rng.randint(2, 8)
+        grid = reference.make_grid(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid, 'manhattan')
+        for _ in range(10):
+            cell = (rng.randrange(rows), rng.randrange(cols))
+            grid[cell[0]][cell[1]] = rng.choice((0, 1, 2, 3))
+            astar.set_cell(cell, grid[cell[0]][cell[1]])
+            start = (rng.randrange(rows), rng.randrange(cols))
+            goal = (rng.randrange(rows), rng.randrange(cols))
+            costs = reference.dijkstra(grid, start)
+            _, cost, _ = astar.search(start, goal)
+            assert cost == costs.get(goal, float('inf'))
+        assert_compiled_like_fresh(astar, grid)
+
+
+def test_terrain_cost_edits_recompile(reference, rng):
+    for _ in range(20):
+        rows, cols = rng.randint(2, 8), rng.randint(2, 8)
+        grid = reference.make_grid(rng, rows, cols, terrains=(0, 0, 1, 2, 3, 7))
+        astar = AdvancedAStarSearch(grid, 'manhattan')
+        terrain_costs = dict(reference.DEFAULT_COSTS)
+        start, goal = (0, 0), (rows - 1, cols - 1)
+        for _ in range(4):
+            terrain, cost = rng.choice((0, 2, 3, 7)), rng.choice((1, 2, 4, 9))
+            terrain_costs[terrain] = cost
+            astar.terrain_costs[terrain] = cost
+            costs = reference.dijkstra(grid, start, terrain_costs)
+            _, found, _ = astar.search(start, goal)
+            assert found == costs.get(goal, float('inf'))
+        assert_compiled_like_fresh(astar, grid, terrain_costs)
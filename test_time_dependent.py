@@ -0,0 +1,134 @@
+"""
+Time-dependent routing: earliest arrivals match a plain time-dependent
+Dijkstra, FIFO repair holds, and best_departure picks the best start
+"""
+
+import heapq
+import math
+
+import numpy as np
+import pytest
+
+from main import AdvancedAStarSearch, TimeDependentCosts, TimeDependentPlanner
+
+
+def travel_time(profile, bucket_minutes, row, departure):
+    """Linear interpolation between bucket starts, wrapping at midnight"""
+    buckets = len(profile[row])
+    position = (departure % (bucket_minutes * buckets)) / bucket_minutes
+    bucket = min(int(position), buckets - 1)
+    first, second = profile[row][bucket], profile[row][(bucket + 1) % buckets]
+    return first + (second - first) * (position - bucket)
+
+
+def earliest_arrivals(reference, grid, profile, bucket_minutes, source, departure, per):
+    """{cell: earliest arrival} by Dijkstra on arrival times (exact under FIFO)"""
+    cols = len(grid[0])
+    arrivals = {source: departure}
+    heap = [(departure, source)]
+    while heap:
+        now, cell = heapq.heappop(heap)
+        if now > arrivals[cell]:
+            continue
+        for neighbor in reference.neighbors(grid, cell):
+            terrain = grid[neighbor[0]][neighbor[1]]
+            if terrain == reference.OBSTACLE:
+                continue
+            row = terrain if per == 'terrain' else neighbor[0] * cols + neighbor[1]
+            reached = now + travel_time(profile, bucket_minutes, row, now)
+            if reached < arrivals.get(neighbor, math.inf):
+                arrivals[neighbor] = reached
+                heapq.heappush(heap, (reached, neighbor))
+    return arrivals
+
+
+def drive_time(reference, grid, profile, bucket_minutes, path, departure, per):
+    cols = len(grid[0])
+    now = departure
+    for a, b in zip(path, path[1:]):
+        assert b in list(reference.neighbors(grid, a))
+        assert grid[b[0]][b[1]] != reference.OBSTACLE
+        row = grid[b[0]][b[1]] if per == 'terrain' else b[0] * cols + b[1]
+        now += travel_time(profile, bucket_minutes, row, now)
+    return now - departure
+
+
+def random_profile(rng, rows, buckets, bucket_minutes):
+    return TimeDependentCosts(
+        [[rng.uniform(0.5, 20) for _ in range(buckets)] for _ in range(rows)],
+        bucket_minutes, repair_fifo=True).profile
+
+
+@pytest.mark.parametrize('per', TimeDependentCosts.PER)
+def test_earliest_arrival_matches_reference(reference, rng, per):
+    for _ in range(20):
+        rows, cols = rng.randint(1, 8), rng.randint(1, 8)
+        grid = reference.make_grid(rng, rows, cols)
+        bucket_minutes = rng.choice((5, 15, 60))
+        profile_rows = 4 if per == 'terrain' else rows * cols
+        profile = random_profile(rng, profile_rows, rng.randint(1, 6), bucket_minutes)
+        planner = TimeDependentPlanner(AdvancedAStarSearch(grid),
+                                       TimeDependentCosts(profile, bucket_minutes, per))
+        table = profile.astype(np.float64).tolist()
+        for _ in range(4):
+            start = (rng.randrange(rows), rng.randrange(cols))
+            goal = (rng.randrange(rows), rng.randrange(cols))
+            departure = rng.uniform(0, 24 * 60)
+            path, drive, _ = planner.search(start, goal, departure)
+            arrivals = earliest_arrivals(reference, grid, table, bucket_minutes,
+                                         start, departure, per)
+            if goal not in arrivals:
+                assert path is None and drive == math.inf
+                continue
+            assert drive == pytest.approx(arrivals[goal] - departure, rel=1e-6, abs=1e-6)
+            assert path[0] == start and path[-1] == goal
+            assert drive_time(reference, grid, table, bucket_minutes, path,
+                              departure, per) == pytest.approx(drive, rel=1e-6, abs=1e-6)
+
+
+def test_repaired_profiles_are_fifo(rng):
+    for _ in range(30):
+        bucket_minutes = rng.choice((1, 10, 60))
+        buckets = rng.randint(1, 8)
+        raw = [[rng.uniform(0, 200) for _ in range(buckets)] for _ in range(3)]
+        costs = TimeDependentCosts(raw, bucket_minutes, repair_fifo=True)
+        assert (costs.profile >= np.array(raw, dtype=np.float32)).all()
+        # Leaving later never arrives earlier
+        for row in range(3):
+            times = np.linspace(0, costs.period * 2, 400)
+            arrive = [t + costs.travel_time(row, t) for t in times]
+            assert all(b >= a - 1e-3 for a, b in zip(arrive, arrive[1:]))
+
+
+def test_fifo_violation_is_rejected():
+    with pytest.raises(ValueError):
+        TimeDependentCosts([[100, 1]], bucket_minutes=10)
+
+
+def test_search_follows_set_cell(reference, rng):
+    grid = reference.make_grid(rng, 6, 7)
+    astar = AdvancedAStarSearch(grid)
+    profile = random_profile(rng, 4, 4, 30)
+    planner = TimeDependentPlanner(astar, TimeDependentCosts(profile, 30))
+    table = profile.astype(np.float64).tolist()
+    for _ in range(10):
+        row, col = rng.randrange(6), rng.randrange(7)
+        grid[row][col] = rng.choice((0, 1, 2, 3))
+        astar.set_cell((row, col), grid[row][col])
+        _, drive, _ = planner.search((0, 0), (5, 6), 480)
+        arrival = earliest_arrivals(reference, grid, table, 30, (0, 0), 480,
+                                    'terrain').get((5, 6), math.inf)
+        assert drive == pytest.approx(arrival - 480, rel=1e-6, abs=1e-6)
+
+
+def test_best_departure_is_the_cheapest_tried(reference, rng):
+    grid = reference.make_grid(rng, 6, 6, (0, 0, 0, 2, 3))
+    costs = TimeDependentCosts.from_multipliers(reference.DEFAULT_COSTS,
+                                                [1.0, 2.5, 1.5, 1.0], bucket_minutes=60)
+    planner = TimeDependentPlanner(AdvancedAStarSearch(grid), costs)
+    trips = [((0, 0), (5, 5)), ((5, 0), (0, 5))]
+    best = planner.best_departure(trips, 0, 240, step=20)
+    totals = {departure: sum(planner.search(start, goal, departure)[1] for start, goal in trips)
+              for departure in range(0, 241, 20)}
+    assert best['total_drive_time'] == pytest.approx(min(totals.values()))
+    assert [departure for departure, _ in best['tried']] == list(totals)
@@ -0,0 +1,76 @@
+"""
+Exploration tracing: trace levels never change the answer, and full
+traces (and bounded ring traces) record what the search actually did
+"""
+
+import numpy as np
+import pytest
+
+from main import AdvancedAStarSearch
+
+
+def random_query(rng, rows, cols):
+    return ((rng.randrange(rows), rng.randrange(cols)),
+            (rng.randrange(rows), rng.randrange(cols)))
+
+
+@pytest.mark.parametrize('algorithm', ['astar', 'jps', 'bidirectional', 'bounded'])
+def test_trace_levels_agree(reference, rng, algorithm):
+    for _ in range(20):
+        rows, cols = rng.randint(1, 10), rng.randint(1, 10)
+        grid = reference.make_grid(rng, rows, cols)
+        start, goal = random_query(rng, rows, cols)
+        expected = reference.dijkstra(grid, start).get(goal, float('inf'))
+        results = []
+        for level in ('off', 'counters', 'full'):
+            astar = AdvancedAStarSearch(grid, 'manhattan', algorithm, trace_level=level)
+            path, cost, explored = astar.search(start, goal)
+            assert cost == expected
+            results.append((path, cost, explored))
+            if level == 'off':
+                assert astar.search_stats == {} and astar.trace is None
+        assert results[0] == results[1] == results[2]
+
+
+def test_full_trace_records_each_expansion(reference, rng):
+    for _ in range(20):
+        rows, cols = rng.randint(1, 10), rng.randint(1, 10)
+        grid = reference.make_grid(rng, rows, cols)
+        start, goal = random_query(rng, rows, cols)
+        astar = AdvancedAStarSearch(grid, 'manhattan', trace_level='full')
+        _, _, explored = astar.search(start, goal)
+        if astar.trace.status is not None:
+            assert len(astar.trace) == 0
+            continue
+        cells = astar.trace.indices()
+        assert len(cells) == astar.trace.count == explored
+        assert cells[0] == astar.to_index(start)
+        assert len(set(cells.tolist())) == len(cells)   # Consistent h: no re-expansions
+
+        # Every push is a passable neighbor of the cell that pushed it
+        pushes = np.frombuffer(astar.trace.pushes, dtype=np.int32)
+        counts = astar.trace.push_counts()
+        assert counts.sum() == len(pushes)
+        ends = np.cumsum(counts)
+        for cell, end, count in zip(cells.tolist(), ends.tolist(), counts.tolist()):
+            for pushed in pushes[end - count:end].tolist():
+                pushed_cell = astar.to_position(pushed)
+                assert pushed_cell in reference.neighbors(grid, astar.to_position(cell))
+                assert grid[pushed_cell[0]][pushed_cell[1]] != reference.OBSTACLE
+
+
+def test_ring_trace_keeps_the_latest_expansions(reference, rng):
+    for capacity in (1, 3, 7, 50):
+        rows, cols = 9, 9
+        grid = reference.make_grid(rng, rows, cols, (0, 0, 0, 2))
+        full = AdvancedAStarSearch(grid, 'manhattan', trace_level='full')
+        ring = AdvancedAStarSearch(grid, 'manhattan', trace_level='full',
+                                   trace_capacity=capacity)
+        full.search((0, 0), (8, 8))
+        ring.search((0, 0), (8, 8))
+        everything = full.trace.indices()
+        assert ring.trace.count == len(everything)
+        np.testing.assert_array_equal(ring.trace.indices(), everything[-capacity:])
+        np.testing.assert_array_equal(ring.trace.orders(),
+                                      np.arange(len(everything))[-capacity:])
+        assert not ring.trace.has_pushes
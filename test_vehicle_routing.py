@@ -0,0 +1,109 @@
+"""
+VehicleRoutingPlanner: every plan is re-checked from scratch against
+plain Dijkstra travel costs for capacity limits, time windows and route
+costs
+"""
+
+from collections import Counter
+
+import pytest
+
+from main import AdvancedAStarSearch, VehicleRoutingPlanner
+
+
+def random_instance(reference, rng, stop_count):
+    rows, cols = rng.randint(3, 9), rng.randint(3, 9)
+    grid = reference.make_grid(rng, rows, cols, (0, 0, 0, 0, 1, 2, 3))
+    cells = rng.sample([(row, col) for row in range(rows) for col in range(cols)],
+                       min(stop_count + 1, rows * cols))
+    return grid, cells[0], cells[1:]
+
+
+def check_plan(reference, grid, depot, stops, demands, capacities, result,
+               time_windows=None, service_time=0, depot_window=None):
+    demand_of = dict(zip(stops, demands))
+    window_of = dict(zip(stops, time_windows or [None] * len(stops)))
+    distances = {point: reference.dijkstra(grid, point) for point in [depot] + stops}
+
+    def travel(a, b):
+        return distances[a].get(b, float('inf'))
+
+    served = [stop for route in result['routes'] for stop in route['stops']]
+    assert Counter(served + result['unserved']) == Counter(stops)
+
+    if isinstance(capacities, int):
+        fleet = None
+    else:
+        fleet = sorted(capacities, reverse=True)
+        assert len(result['routes']) <= len(fleet)
+
+    for vehicle, route in enumerate(result['routes']):
+        load = sum(demand_of[stop] for stop in route['stops'])
+        capacity = capacities if fleet is None else fleet[vehicle]
+        assert route['load'] == load <= capacity == route['capacity']
+
+        visits = [depot] + route['stops'] + [depot]
+        assert route['cost'] == sum(travel(a, b) for a, b in zip(visits, visits[1:]))
+
+        clock = depot_window[0] if depot_window else 0
+        previous = depot
+        for stop, arrival in zip(route['stops'], route['arrivals']):
+            clock += (service_time if previous != depot else 0) + travel(previous, stop)
+            window = window_of[stop]
+            if window is not None:
+                assert clock <= window[1]
+                clock = max(clock, window[0])
+            assert arrival == pytest.approx(clock)
+            previous = stop
+        clock += service_time + travel(previous, depot)
+        assert route['return_time'] == pytest.approx(clock)
+        if depot_window:
+            assert clock <= depot_window[1]
+
+    assert result['cost'] == sum(route['cost'] for route in result['routes'])
+    assert result['cost'] <= result['savings_cost']
+
+    # Without windows or a fleet limit, only stops no van can take are left
+    if fleet is None and time_windows is None and depot_window is None:
+        assert sorted(result['unserved']) == sorted(
+            stop for stop in stops
+            if demand_of[stop] > capacities
+            or travel(depot, stop) == float('inf') or travel(stop, depot) == float('inf'))
+
+
+@pytest.mark.parametrize('capacities', [6, 12, [10, 6, 4]])
+def test_capacity_limits(reference, rng, capacities):
+    for _ in range(15):
+        grid, depot, stops = random_instance(reference, rng, rng.randint(1, 9))
+        demands = [rng.randint(1, 7) for _ in stops]
+        result = VehicleRoutingPlanner(AdvancedAStarSearch(grid)).plan(
+            depot, stops, demands, capacities, time_limit=0.5)
+        check_plan(reference, grid, depot, stops, demands, capacities, result)
+
+
+def test_oversized_demand_is_unserved():
+    grid = [[0] * 5 for _ in range(3)]
+    result = VehicleRoutingPlanner(AdvancedAStarSearch(grid)).plan(
+        (0, 0), [(2, 4), (1, 2)], [9, 2], capacities=5)
+    assert result['unserved'] == [(2, 4)]
+    assert [route['stops'] for route in result['routes']] == [[(1, 2)]]
+
+
+def test_time_windows_and_service_times(reference, rng):
+    for _ in range(20):
+        grid, depot, stops = random_instance(reference, rng, rng.randint(1, 8))
+        demands = [rng.randint(1, 4) for _ in stops]
+        windows = []
+        for _ in stops:
+            if rng.random() < 0.3:
+                windows.append(None)
+            else:
+                opens = rng.randint(0, 30)
+                windows.append((opens, opens + rng.randint(0, 25)))
+        service_time = rng.choice((0, 2))
+        depot_window = rng.choice((None, (0, 80)))
+        result = VehicleRoutingPlanner(AdvancedAStarSearch(grid)).plan(
+            depot, stops, demands, 8, time_windows=windows, service_times=service_time,
+            depot_window=depot_window, time_limit=0.5)
+        check_plan(reference, grid, depot, stops, demands, 8, result,
+                   windows, service_time, depot_window)